@@ -0,0 +1,211 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : bench_startup.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : Cold and warm startup benchmark for the python profile scripts (bootstrap.py, userChrome.py, environ.py, show_sysconfig.py)
+#             Every sample runs in a fresh interpreter.
+#             cold: empty bytecode (pycache) and bootstrap cache directories, so everything is compiled and probed from scratch
+#             warm: pycache and bootstrap cache directories shared with a discarded priming run
+#             Each script also runs once with -X importtime, to attribute its (warm) import cost per module.
+#             Results can be saved as a JSON baseline; later runs fail (exit 1) when a script regresses past --threshold,
+#             and refuse to compare against a baseline recorded with another python.
+#             A script that exits non-zero fails its target (exit 1): its timings are not samples.
+#             Scripts run with HOME (and USERPROFILE / APPDATA) pointed at a scratch directory, seeded with a minimal Firefox
+#             profile (profiles.ini and an empty profile folder), so no real Firefox profile or user cache is touched.
+# ===================================== #
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bootstrap import IsMacOS
+from bootstrap import IsWindows
+from bootstrap import cache_dir
+
+IsVerbose = False # True
+
+ScriptRoot = Path(__file__).resolve().parent
+
+# name: python arguments, run from ScriptRoot
+BenchTargets = dict({
+    'bootstrap (import)': ['-c', 'from bootstrap import HOME, hostOSCaption'],
+    'bootstrap.py': ['bootstrap.py'],
+    'userChrome.py': ['userChrome.py'],
+    'environ.py': ['environ.py'],
+    'show_sysconfig.py': ['show_sysconfig.py'],
+})
+
+# -- print_var prints a label and a variable's value, if IsVerbose
+def print_var(label, varname):
+    if IsVerbose:
+        print('< {} = \'{}\' >'.format(label, varname))
+
+# -- seed_home creates a scratch HOME with the minimal Firefox profile userChrome.py needs (where userChrome.firefox_root
+#    looks for this OS, APPDATA being HOME on Windows): profiles.ini naming one empty default profile folder
+def seed_home(home):
+    if IsWindows:
+        firefoxRoot, profilePath = home.joinpath('Mozilla', 'Firefox'), 'Profiles/bench.default'
+    elif IsMacOS:
+        firefoxRoot, profilePath = home.joinpath('Library', 'Application Support', 'Firefox'), 'Profiles/bench.default'
+    else:
+        firefoxRoot, profilePath = home.joinpath('.mozilla', 'firefox'), 'bench.default'
+    firefoxRoot.joinpath(*profilePath.split('/')).mkdir(parents=True)
+    firefoxRoot.joinpath('profiles.ini').write_text('[Profile0]\nName=default\nIsRelative=1\nPath={}\nDefault=1\n'.format(profilePath), encoding='utf-8')
+    return home
+
+# -- sandbox_env returns an environment whose HOME, bootstrap cache and pycache all live under scratch
+def sandbox_env(home, pycache, factsCache):
+    env = dict(os.environ)
+    for name in ('HOME', 'USERPROFILE', 'APPDATA', 'LOCALAPPDATA'):
+        env[name] = str(home)
+    env['BOOTSTRAP_CACHE_DIR'] = str(factsCache)
+    env['PYTHONPYCACHEPREFIX'] = str(pycache)
+    for name in ('PYTHONDONTWRITEBYTECODE', 'PYPROFILE_TRACE', 'BOOTSTRAP_REFRESH'):
+        env.pop(name, None)
+    return env
+
+# -- run_once runs a target in a fresh interpreter and returns (elapsed ms, return code, stderr)
+def run_once(args, env, extra=()):
+    command = [sys.executable] + list(extra) + args
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=str(ScriptRoot), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    return (time.perf_counter() - started) * 1000.0, result.returncode, result.stderr
+
+# -- parse_importtime attributes -X importtime output to modules: {module: (self us, cumulative us)}
+def parse_importtime(stderr):
+    modules = dict()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        modules[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return modules
+
+# -- failure returns the result of a target whose run exited non-zero: the exit code and the last line of its stderr
+def failure(mode, returnCode, stderr):
+    lines = stderr.strip().splitlines()
+    return dict({'error': '{} run exited {}{}'.format(mode, returnCode, ': ' + lines[-1] if lines else '')})
+
+# -- bench_target collects cold and warm samples, plus the per-module import times, for one target; or returns
+#    dict(error) as soon as a run exits non-zero
+def bench_target(args, repeat, topModules):
+    samples = dict({'cold': [], 'warm': []})
+    with tempfile.TemporaryDirectory(prefix='bench_startup.') as scratch:
+        scratch = Path(scratch)
+        for index in range(repeat):
+            # a fresh HOME too, so each cold run builds the chrome files again
+            coldEnv = sandbox_env(seed_home(scratch.joinpath('home-cold-{}'.format(index))), scratch.joinpath('pycache-cold-{}'.format(index)),
+                                  scratch.joinpath('facts-cold-{}'.format(index)))
+            elapsed, returnCode, stderr = run_once(args, coldEnv)
+            if returnCode != 0:
+                return failure('cold', returnCode, stderr)
+            samples['cold'].append(elapsed)
+
+        warmEnv = sandbox_env(seed_home(scratch.joinpath('home-warm')), scratch.joinpath('pycache-warm'), scratch.joinpath('facts-warm'))
+        run_once(args, warmEnv)
+        for index in range(repeat):
+            elapsed, returnCode, stderr = run_once(args, warmEnv)
+            if returnCode != 0:
+                return failure('warm', returnCode, stderr)
+            samples['warm'].append(elapsed)
+
+        elapsed, returnCode, stderr = run_once(args, warmEnv, extra=['-X', 'importtime'])
+        modules = parse_importtime(stderr)
+
+    result = dict()
+    for mode, values in samples.items():
+        result[mode] = dict({'median_ms': statistics.median(values), 'min_ms': min(values), 'max_ms': max(values), 'samples': len(values)})
+    slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[0:topModules]
+    result['imports'] = dict({'total_us': sum(value[0] for value in modules.values()),
+                              'modules': [dict({'module': name, 'self_us': value[0], 'cumulative_us': value[1]}) for name, value in slowest]})
+    return result
+
+# -- baseline_mismatch returns the differences ('python: old -> new') between the interpreter a baseline was recorded with
+#    and this one; timings of different interpreters are not comparable
+def baseline_mismatch(baseline, report):
+    return ['{}: {} -> {}'.format(name, baseline.get(name), report[name]) for name in ('python', 'executable') if baseline.get(name) != report[name]]
+
+# -- compare_baseline lists (target, mode, baseline ms, current ms) for every median that regressed past the threshold
+def compare_baseline(results, baseline, threshold, floor):
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get('targets', dict()).get(name)
+        if not previous or 'error' in previous or 'error' in result:
+            continue
+        for mode in ('cold', 'warm'):
+            before = previous[mode]['median_ms']
+            after = result[mode]['median_ms']
+            if after > before * (1.0 + threshold) and after - before > floor:
+                regressions.append((name, mode, before, after))
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark cold and warm startup of the python profile scripts')
+    parser.add_argument('targets', nargs='*', metavar='TARGET', help='targets to benchmark (default: all of {})'.format(', '.join(BenchTargets)))
+    parser.add_argument('--repeat', type=int, default=5, help='samples per target and mode (default: 5)')
+    parser.add_argument('--top', type=int, default=8, help='slowest imported modules to report per target (default: 8)')
+    parser.add_argument('--baseline', type=Path, default=cache_dir().joinpath('bench_startup.json'), help='JSON baseline file (default: %(default)s)')
+    parser.add_argument('--save', action='store_true', help='save these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed median slowdown versus the baseline, as a fraction (default: 0.25)')
+    parser.add_argument('--floor', type=float, default=2.0, help='ignore slowdowns smaller than this many ms (default: 2.0)')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON instead of a table')
+    args = parser.parse_args()
+    for name in args.targets:
+        if name not in BenchTargets:
+            parser.error('unknown target {!r} (choose from {})'.format(name, ', '.join(BenchTargets)))
+
+    results = dict()
+    for name in args.targets or list(BenchTargets):
+        print_var('bench', name)
+        results[name] = bench_target(BenchTargets[name], max(1, args.repeat), args.top)
+
+    report = dict({'python': sys.version, 'executable': sys.executable, 'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'targets': results})
+
+    if args.json:
+        print(json.dumps(report, indent=1))
+    else:
+        print(' {:<20} {:>11} {:>11} {:>11} {:>11}  {}'.format('target', 'cold ms', 'cold min', 'warm ms', 'warm min', 'slowest imports (self ms)'))
+        for name, result in results.items():
+            if 'error' in result:
+                print(' {:<20} FAILED: {}'.format(name, result['error']))
+                continue
+            slowest = ', '.join('{} {:.1f}'.format(module['module'], module['self_us'] / 1000.0) for module in result['imports']['modules'][0:3])
+            print(' {:<20} {:>11.1f} {:>11.1f} {:>11.1f} {:>11.1f}  {}'.format(name, result['cold']['median_ms'], result['cold']['min_ms'],
+                                                                            result['warm']['median_ms'], result['warm']['min_ms'], slowest))
+
+    failed = [name for name, result in results.items() if 'error' in result]
+    for name in failed:
+        print(' FAILED: {} {}'.format(name, results[name]['error']), file=sys.stderr)
+
+    regressions = []
+    mismatch = []
+    if args.baseline.exists() and not args.save:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        mismatch = baseline_mismatch(baseline, report)
+        if mismatch:
+            print(' Not compared: the baseline {} was recorded with another python ({}); --save a new one'.format(args.baseline, '; '.join(mismatch)),
+                  file=sys.stderr)
+        else:
+            regressions = compare_baseline(results, baseline, args.threshold, args.floor)
+        for name, mode, before, after in regressions:
+            print(' REGRESSION: {} {} median {:.1f} ms -> {:.1f} ms (+{:.0f}%)'.format(name, mode, before, after, 100.0 * (after - before) / before), file=sys.stderr)
+
+    if args.save and failed:
+        print(' Not saved: a baseline needs every target to run', file=sys.stderr)
+    elif args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=1), encoding='utf-8')
+        print(' Saved baseline: {}'.format(args.baseline))
+
+    sys.exit(1 if regressions or failed or mismatch else 0)
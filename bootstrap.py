@@ -4,19 +4,20 @@
 # LANGUAGE  : Python
 # VERSION   : 3
 # AUTHOR    : Bryan Dady
-# UPDATED   : 11/4/2019 - Enhance IsVerbose behavior with print_var function
+# UPDATED   : 10/18/2026 - Add facts_for_root, to derive the host facts of a mounted OS image or rootfs tree
 # INTRO     : To be loaded / dot-sourced from a python profile script, to establish (bootstrap) baseline consistent environment variables,
 #             regardless of version, or operating system
 # ===================================== #
 
-import argparse
+# platform, sysconfig, tempfile and argparse are imported where they are used, as they account for most of the import time
+import json
 import os
-import platform
 import sys
-import sysconfig
 import time
 from pathlib import Path
 
+from startup_trace import span
+
 # setup global variables to export
 global HOME
 global COMPUTERNAME
@@ -33,10 +34,6 @@ SleepTime = 3
 MyCommandPath = sys.argv[0]
 MyCommandName = Path(MyCommandPath).name # requires 'from pathlib import Path'
 
-# Only print Start and Stop Header/Footer when called directly, so as to not confuse use of argv[0]
-if MyCommandName == 'bootstrap.py':
-    print('\n Start {}: {}'.format(MyCommandName, time.strftime('%Y %m %d %H:%M:%S %Z', time.localtime())))
-
 # http://www.effbot.org/librarybook/os.htm : where are we?
 # pwd = os.getcwd()
 #print('')
@@ -44,10 +41,8 @@ if MyCommandName == 'bootstrap.py':
 
 # Region HostOS
 # Setup common variables for the shell/host environment
-
-IsWindows = False
-IsLinux = False
-IsMacOS = False
+# HOME, COMPUTERNAME, hostOS, hostOSCaption, IsWindows, IsLinux and IsMacOS are not assigned here; each is resolved by the
+# module __getattr__ (below) the first time it is imported or read, and then memoized as an ordinary module global.
 #IsAdmin = False
 #IsServer = False
 
@@ -58,100 +53,551 @@ def print_var(label, varname):
 
 # -- RFE!: create a similar function for dev/test, which takes 1 arg of a dictionary, and prints the keys and values
 
-# add blank line, only when IsVerbose
-if IsVerbose: print('')
-
-# Setup OS and version variables
-COMPUTERNAME=platform.node()
-
-hostOS = platform.system()
-print_var('Platform: hostOS', hostOS)
-
-hostOSCaption = platform.platform(aliased=1, terse=1)
-print_var('Platform: hostOSCaption', hostOSCaption)
-
-if sys.platform == "win32":
-    # hostOS = 'Windows'
-    IsWindows = True
-
-    #if hostOSCaption -like '*Windows Server*':
-    #    IsServer = True
-
-    #if 'HOME' in os.environ:
-    HOME = os.environ['USERPROFILE']
-    # else:
-    #     print('HOME does not exist')
-    #     # derive it from sysconfig 'userbase' with help from os path dirname
-    #     HOME = os.path.abspath(os.path.dirname(sysconfig.get_config_var('userbase')))
-
-    # Check admin rights / role; same approach as Test-LocalAdmin function in Sperry module
-    #IsAdmin = (([security.principal.windowsprincipal] [security.principal.windowsidentity]::GetCurrent()).isinrole([Security.Principal.WindowsBuiltInRole] 'Administrator'))
-
-elif sys.platform == "mac" or sys.platform == "macos" or sys.platform == "darwin":
-    IsMacOS = True
-    hostOS = 'macOS'
-
-    #if platform.mac_ver()[0].__len__():
-    # Get the macOS major and minor version numbers (first 5 characters of first item in mac_ver dictionary)
-    macOS_ver = platform.mac_ver()[0][0:5]
-    # https://en.m.wikipedia.org/wiki/List_of_Apple_operating_systems#macOS
-    macOS_names = dict({'10.15': 'Catalina', '10.14': 'Mojave', '10.13': "High Sierra", '10.12': 'Sierra', '10.11': 'El Capitan', '10.10': 'Yosemite'})
-    hostOSCaption = 'Mac OS X {} {}'.format(macOS_ver, macOS_names[macOS_ver])
-
-    HOME = os.environ['HOME']
-
-    # Check root or sudo
-    #IsAdmin =~ ?
-
-else:
-    IsLinux = True
-    #hostOS = 'Linux'
-    hostOSCaption = '{} {}'.format(platform.linux_distribution()[0], platform.linux_distribution()[1])
-
-    HOME = os.environ['HOME']
-
-    # Check root or sudo
-    #IsAdmin =~ ?
-
-print_var('HOME', HOME)
-
-# if we ever need to confirm that the path is available on the filesystem, use: path.exists(HOME)
-py_version =sysconfig.get_config_var('py_version')
-print(' # Python {} on {} - {} #'.format(py_version[0:3], hostOSCaption, COMPUTERNAME))
-
-# Save what we've determined here in shell/system environment variables, so they can be easily referenced from other py scripts/functions
-# # 
-# Verbose:
-# print('\n Here are the persistent variables to import into the next script: ... ')
-# print('from bootstrap import HOME')
-# print('from bootstrap import COMPUTERNAME')
-# print('from bootstrap import hostOS')
-# print('from bootstrap import hostOSCaption')
-# print('from bootstrap import IsWindows')
-# print('from bootstrap import IsLinux')
-# print('from bootstrap import IsMacOS')
-#print('\n # # Python Environment Bootstrap Complete #\n')
-# #
-
-print_var('global variables','HOME, COMPUTERNAME, hostOS, hostOSCaption, IsWindows, IsLinux, IsMacOS')
+# Region HostFacts cache
+# Deriving the host facts (platform, distro and sysconfig lookups) is the slowest part of loading this script, so the
+# results are kept in a small JSON snapshot. The snapshot is only trusted while the interpreter, hostname and HOME it was
+# derived with still match, and none of the FactSources files have been modified since.
+CacheVersion = 1
+FactNames = ('COMPUTERNAME', 'hostOS', 'hostOSCaption', 'IsWindows', 'IsLinux', 'IsMacOS', 'HOME', 'py_version')
+FactSources = ('/etc/os-release', '/usr/lib/os-release', '/etc/hostname', '/etc/lsb-release', '/System/Library/CoreServices/SystemVersion.plist')
+
+# -- cache_dir returns the per-user directory for bootstrap's cached files (override with $BOOTSTRAP_CACHE_DIR)
+def cache_dir():
+    if 'BOOTSTRAP_CACHE_DIR' in os.environ:
+        return Path(os.environ['BOOTSTRAP_CACHE_DIR'])
+    if sys.platform == "win32":
+        return Path(os.environ.get('LOCALAPPDATA', Path.home().joinpath('AppData', 'Local'))).joinpath('bootstrap')
+    return Path(os.environ.get('XDG_CACHE_HOME', Path.home().joinpath('.cache'))).joinpath('bootstrap')
+
+# -- write_atomic replaces path with data, via a temp file in the same directory, so readers never see a partial file
+#    mode (e.g. 0o644) and owner (uid, gid) are applied to the temp file, before it is renamed into place
+def write_atomic(path, data, mode=None, owner=None):
+    import tempfile
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmpName = tempfile.mkstemp(dir=str(path.parent), prefix='.' + path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb' if isinstance(data, bytes) else 'w') as tmpFile:
+            tmpFile.write(data)
+        if mode is not None:
+            os.chmod(tmpName, mode)
+        if owner is not None:
+            os.chown(tmpName, owner[0], owner[1])
+        os.replace(tmpName, str(path))
+    except BaseException:
+        os.unlink(tmpName)
+        raise
+
+# -- read_os_release parses an os-release file (under root) into a dictionary; see os-release(5)
+def read_os_release(root='/'):
+    for candidate in ('etc/os-release', 'usr/lib/os-release'):
+        try:
+            with open(os.path.join(root, candidate) if root == '/' else root_path(root, candidate), encoding='utf-8') as osRelease:
+                lines = osRelease.read().splitlines()
+        except OSError:
+            continue
+        info = dict()
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            if len(value) > 1 and value[0] == value[-1] and value[0] in ('"', "'"):
+                value = value[1:-1]
+            info[key] = value
+        return info
+    return dict()
+
+# -- node_name returns this host's name as gethostname() has it: uname -n, or on Windows socket.gethostname(); the
+#    PowerShell snapshot compares it with [System.Net.Dns]::GetHostName(), the same call (Environment.MachineName is cut
+#    at the first dot on Unix, and is the NetBIOS name on Windows)
+def node_name():
+    if hasattr(os, 'uname'):
+        return os.uname().nodename
+    import socket
+    return socket.gethostname()
+
+# -- facts_key identifies the interpreter and session the cached facts were derived with
+def facts_key():
+    nodeName = node_name()
+    homeVar = os.environ.get('USERPROFILE' if sys.platform == "win32" else 'HOME', '')
+    return dict({'version': CacheVersion, 'executable': sys.executable, 'python': sys.version, 'node': nodeName, 'home': homeVar})
+
+# -- facts_stamp records the mtime of each FactSources file (None when absent), for cache invalidation
+def facts_stamp():
+    stamp = dict()
+    for source in FactSources:
+        try:
+            stamp[source] = os.stat(source).st_mtime_ns
+        except OSError:
+            stamp[source] = None
+    return stamp
+
+# -- probe_host_facts derives the host facts from the platform and sysconfig modules (the slow path)
+def probe_host_facts():
+    with span('bootstrap: host detection'):
+        facts = probe_platform()
+
+    # if we ever need to confirm that the path is available on the filesystem, use: path.exists(HOME)
+    with span('bootstrap: python version'):
+        import sysconfig
+        facts['py_version'] = sysconfig.get_config_var('py_version')
+    return facts
+
+# https://en.m.wikipedia.org/wiki/List_of_Apple_operating_systems#macOS
+MacOSNames = dict({'10.15': 'Catalina', '10.14': 'Mojave', '10.13': "High Sierra", '10.12': 'Sierra', '10.11': 'El Capitan', '10.10': 'Yosemite'})
+
+# -- probe_platform derives the OS facts, which on Linux includes the distro lookup
+def probe_platform():
+    import platform
+    facts = dict({'IsWindows': False, 'IsLinux': False, 'IsMacOS': False})
+
+    # Setup OS and version variables
+    facts['COMPUTERNAME'] = platform.node()
+    facts['hostOS'] = platform.system()
+    facts['hostOSCaption'] = platform.platform(aliased=1, terse=1)
+
+    if sys.platform == "win32":
+        # hostOS = 'Windows'
+        facts['IsWindows'] = True
+
+        #if hostOSCaption -like '*Windows Server*':
+        #    IsServer = True
+
+        facts['HOME'] = os.environ['USERPROFILE']
+
+        # Check admin rights / role; same approach as Test-LocalAdmin function in Sperry module
+        #IsAdmin = (([security.principal.windowsprincipal] [security.principal.windowsidentity]::GetCurrent()).isinrole([Security.Principal.WindowsBuiltInRole] 'Administrator'))
+
+    elif sys.platform == "mac" or sys.platform == "macos" or sys.platform == "darwin":
+        facts['IsMacOS'] = True
+        facts['hostOS'] = 'macOS'
+
+        # Get the macOS major and minor version numbers (first 5 characters of first item in mac_ver dictionary)
+        macOS_ver = platform.mac_ver()[0][0:5]
+        facts['hostOSCaption'] = 'Mac OS X {} {}'.format(macOS_ver, MacOSNames.get(macOS_ver, '')).rstrip()
+
+        facts['HOME'] = os.environ['HOME']
+
+        # Check root or sudo
+        #IsAdmin =~ ?
+
+    else:
+        facts['IsLinux'] = True
+        #hostOS = 'Linux'
+        # platform.linux_distribution() was removed in Python 3.8; read the same name and version from os-release
+        with span('bootstrap: distro lookup'):
+            osRelease = read_os_release()
+        if osRelease:
+            facts['hostOSCaption'] = '{} {}'.format(osRelease.get('NAME', 'Linux'), osRelease.get('VERSION_ID', '')).rstrip()
+
+        facts['HOME'] = os.environ['HOME']
+
+        # Check root or sudo
+        #IsAdmin =~ ?
+
+    return facts
+
+# -- get_host_facts returns the host facts from the on-disk snapshot when it is still valid, otherwise probes and re-caches them
+def get_host_facts(refresh=False):
+    cacheFile = cache_dir().joinpath('hostfacts.json')
+    key = facts_key()
+    stamp = facts_stamp()
+    if not refresh:
+        try:
+            with span('bootstrap: host facts cache'):
+                with open(cacheFile, encoding='utf-8') as cached:
+                    snapshot = json.load(cached)
+            if snapshot.get('key') == key and snapshot.get('stamp') == stamp:
+                return snapshot['facts']
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    facts = probe_host_facts()
+    try:
+        write_atomic(cacheFile, json.dumps(dict({'key': key, 'stamp': stamp, 'facts': facts}), indent=1))
+    except OSError:
+        # a read-only or missing cache location only costs us the warm start
+        pass
+    return facts
+
+#End Region
+
+# Region Root facts
+# facts_for_root derives the host facts of an OS image or container rootfs tree mounted at root, from its files only
+# (os-release, hostname, SystemVersion.plist, and the python standard libraries installed), without running anything in it.
+PythonLibDirs = ('usr/lib', 'usr/local/lib', 'lib', 'opt/homebrew/lib')
+
+# -- root_path returns the path of relative (e.g. 'etc/os-release') inside root, resolving symlinks as if root were /, so an
+#    absolute link in an image (e.g. etc/os-release -> /usr/lib/os-release) does not lead out to the host's own files
+def root_path(root, relative):
+    parts = [part for part in relative.split('/') if part]
+    resolved = []
+    hops = 0
+    while parts:
+        part = parts.pop(0)
+        if part == '.':
+            continue
+        if part == '..':
+            resolved = resolved[0:-1]
+            continue
+        candidate = os.path.join(root, *(resolved + [part]))
+        if not os.path.islink(candidate):
+            resolved.append(part)
+            continue
+        hops += 1
+        if hops > 40:
+            raise OSError('too many levels of symbolic links: {}'.format(os.path.join(root, relative)))
+        target = os.readlink(candidate)
+        if target.startswith('/'):
+            resolved = []
+        parts = [item for item in target.split('/') if item] + parts
+    return os.path.join(root, *resolved)
+
+# -- read_root_file returns the text of a file inside root, or None when it is absent or unreadable
+def read_root_file(root, relative):
+    try:
+        with open(root_path(root, relative), encoding='utf-8', errors='replace') as rootFile:
+            return rootFile.read()
+    except OSError:
+        return None
+
+# -- root_python_versions returns the versions of the python standard libraries installed in root, newest first: the full
+#    version where root records it (in the C headers' patchlevel.h, or the dpkg package database), otherwise major.minor
+def root_python_versions(root):
+    import re
+    versions = dict()
+    packages = None
+    for libDir in PythonLibDirs:
+        try:
+            names = os.listdir(root_path(root, libDir))
+        except OSError:
+            continue
+        for name in names:
+            match = re.fullmatch(r'python(\d+)\.(\d+)', name)
+            if not match or not os.path.isfile(root_path(root, '{}/{}/os.py'.format(libDir, name))):
+                continue
+            key = (int(match.group(1)), int(match.group(2)))
+            version = '{}.{}'.format(*key)
+            prefix = libDir[0:-len('lib')]
+            found = re.search(r'#define PY_VERSION\s+"([^"]+)"', read_root_file(root, '{}include/{}/patchlevel.h'.format(prefix, name)) or '')
+            if not found and prefix == 'usr/':
+                if packages is None:
+                    packages = read_root_file(root, 'var/lib/dpkg/status') or ''
+                found = re.search(r'^Package: {}(?:-minimal)?\n(?:[^\n]+\n)*?Version: (?:\d+:)?({}\.\d+)'.format(re.escape(name), re.escape(version)), packages, re.MULTILINE)
+            if found:
+                version = found.group(1)
+            if len(version) > len(versions.get(key, '')):
+                versions[key] = version
+    return [versions[key] for key in sorted(versions, reverse=True)]
+
+# -- facts_for_root returns the facts of the OS tree at root: those of FactNames (but HOME, which belongs to a session, and
+#    with py_version the newest python installed), plus root, distro, distroVersion and py_versions (all the pythons installed)
+def facts_for_root(root):
+    import plistlib
+    if not os.path.isdir(root):
+        raise NotADirectoryError('not a directory: {}'.format(root))
+    facts = dict({'root': os.path.abspath(root), 'COMPUTERNAME': '', 'hostOS': '', 'hostOSCaption': '', 'IsWindows': False, 'IsLinux': False,
+                  'IsMacOS': False, 'distro': '', 'distroVersion': '', 'py_version': '', 'py_versions': []})
+    systemVersion = None
+    try:
+        with open(root_path(root, 'System/Library/CoreServices/SystemVersion.plist'), 'rb') as plistFile:
+            systemVersion = plistlib.load(plistFile)
+    except (OSError, ValueError):
+        pass
+    osRelease = read_os_release(root)
+
+    if systemVersion:
+        facts['IsMacOS'] = True
+        facts['hostOS'] = 'macOS'
+        macOS_ver = systemVersion.get('ProductVersion', '')[0:5]
+        facts['hostOSCaption'] = 'Mac OS X {} {}'.format(macOS_ver, MacOSNames.get(macOS_ver, '')).rstrip()
+        facts['distro'] = 'macos'
+        facts['distroVersion'] = systemVersion.get('ProductVersion', '')
+    elif os.path.isdir(root_path(root, 'Windows/System32')):
+        facts['IsWindows'] = True
+        facts['hostOS'] = 'Windows'
+        facts['hostOSCaption'] = 'Windows'
+    else:
+        # anything else with an os-release file, or none, is taken as Linux
+        facts['IsLinux'] = True
+        facts['hostOS'] = 'Linux'
+        facts['hostOSCaption'] = '{} {}'.format(osRelease.get('NAME', 'Linux'), osRelease.get('VERSION_ID', '')).rstrip()
+        facts['distro'] = osRelease.get('ID', '')
+        facts['distroVersion'] = osRelease.get('VERSION_ID', '')
+
+    hostName = read_root_file(root, 'etc/hostname') or read_root_file(root, 'etc/HOSTNAME') or ''
+    facts['COMPUTERNAME'] = (hostName.strip().splitlines() or [''])[0]
+    facts['py_versions'] = root_python_versions(root)
+    facts['py_version'] = facts['py_versions'][0] if facts['py_versions'] else ''
+    return facts
+
+#End Region
+
+# Region Compiled snapshot
+# `bootstrap.py --compile` writes the host facts into files that shells source directly (hostfacts.sh, hostfacts.ps1), so a
+# new shell learns them without starting python. Each file carries its own staleness check: when it was compiled on another
+# host (a HOME shared between hosts), or any CompiledSources file (FactSources, and the interpreter itself) is newer than
+# the file, it re-runs `bootstrap.py --compile` and sources the result.
+CompiledFacts = ('COMPUTERNAME', 'hostOS', 'hostOSCaption', 'IsWindows', 'IsLinux', 'IsMacOS', 'py_version')
+
+# -- compiled_sources lists the existing files whose modification makes a compiled snapshot stale
+def compiled_sources():
+    sources = [source for source in FactSources if os.path.exists(source)]
+    sources.append(os.path.realpath(sys.executable))
+    return sources
+
+# -- sh_quote and ps_quote return a value as a single-quoted POSIX sh or PowerShell string literal
+def sh_quote(value):
+    return "'" + str(value).replace("'", "'\\''") + "'"
+
+def ps_quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+# -- compile_sh renders the POSIX sh snapshot
+def compile_sh(facts, snapshot, sources, python, script):
+    lines = ['# {} - generated by {} --compile on {}; source it from a shell profile'.format(os.path.basename(snapshot), script, time.strftime('%Y-%m-%d %H:%M:%S')),
+             '_bs_snapshot={}'.format(sh_quote(snapshot)),
+             '_bs_node={}'.format(sh_quote(node_name())),
+             '_bs_stale=',
+             '[ "${HOSTNAME:-$(uname -n)}" = "$_bs_node" ] || _bs_stale=1',
+             'for _bs_source in {}; do'.format(' '.join(sh_quote(source) for source in sources)),
+             '    [ "$_bs_source" -nt "$_bs_snapshot" ] && _bs_stale=1',
+             'done',
+             'if [ -z "$_bs_stale" ]; then']
+    for name in CompiledFacts:
+        lines.append('    export {}={}'.format(name, sh_quote(facts[name])))
+    lines += ['    [ -n "$HOME" ] || export HOME={}'.format(sh_quote(facts['HOME'])),
+              '    export BOOTSTRAP_PYTHON={}'.format(sh_quote(python)),
+              '    export BOOTSTRAP_FACTS="$_bs_snapshot"',
+              '    export BOOTSTRAP_NODE="$_bs_node"',
+              'elif [ -z "$_bs_recompiled" ]; then',
+              '    _bs_recompiled=1',
+              '    {} {} --compile --quiet && . "$_bs_snapshot"'.format(sh_quote(python), sh_quote(script)),
+              '    unset _bs_recompiled',
+              'fi',
+              'unset _bs_snapshot _bs_node _bs_stale _bs_source',
+              '']
+    return '\n'.join(lines)
+
+# -- compile_ps renders the PowerShell snapshot
+def compile_ps(facts, snapshot, sources, python, script):
+    lines = ['# {} - generated by {} --compile on {}; dot-source it from a PowerShell profile'.format(os.path.basename(snapshot), script, time.strftime('%Y-%m-%d %H:%M:%S')),
+             '$bsSnapshot = {}'.format(ps_quote(snapshot)),
+             '$bsNode = {}'.format(ps_quote(node_name())),
+             '$bsStale = [System.Net.Dns]::GetHostName() -ne $bsNode',
+             '$bsStamp = (Get-Item -LiteralPath $bsSnapshot).LastWriteTimeUtc',
+             'foreach ($bsSource in @({})) {{'.format(', '.join(ps_quote(source) for source in sources)),
+             '    if ((Test-Path -LiteralPath $bsSource) -and ((Get-Item -LiteralPath $bsSource).LastWriteTimeUtc -gt $bsStamp)) { $bsStale = $true }',
+             '}',
+             'if (-not $bsStale) {']
+    for name in CompiledFacts:
+        lines.append('    $env:{} = {}'.format(name, ps_quote(facts[name])))
+    lines += ['    if (-not $env:HOME) {{ $env:HOME = {} }}'.format(ps_quote(facts['HOME'])),
+              '    $env:BOOTSTRAP_PYTHON = {}'.format(ps_quote(python)),
+              '    $env:BOOTSTRAP_FACTS = $bsSnapshot',
+              '    $env:BOOTSTRAP_NODE = $bsNode',
+              '} elseif (-not $bsRecompiled) {',
+              '    $bsRecompiled = $true',
+              '    & {} {} --compile --quiet'.format(ps_quote(python), ps_quote(script)),
+              '    if ($?) { . $bsSnapshot }',
+              '    Remove-Variable -Name bsRecompiled -ErrorAction SilentlyContinue',
+              '}',
+              'Remove-Variable -Name bsSnapshot, bsNode, bsStale, bsStamp, bsSource -ErrorAction SilentlyContinue',
+              '']
+    return '\n'.join(lines)
+
+# -- compile_snapshot writes hostfacts.sh and hostfacts.ps1 into directory (default: cache_dir()), and returns their paths
+def compile_snapshot(facts, directory=None):
+    directory = Path(directory or cache_dir())
+    python = os.path.realpath(sys.executable)
+    script = os.path.abspath(__file__)
+    sources = compiled_sources()
+    written = []
+    for fileName, render in (('hostfacts.sh', compile_sh), ('hostfacts.ps1', compile_ps)):
+        snapshot = str(directory.joinpath(fileName))
+        write_atomic(snapshot, render(facts, snapshot, sources, python, script))
+        written.append(snapshot)
+    return written
+
+# -- compiled_fresh tells whether a compiled snapshot file exists, was compiled on this host, and is newer than every
+#    CompiledSources file
+def compiled_fresh(snapshot):
+    snapshot = str(snapshot)
+    nodeLine = '$bsNode = {}\n'.format(ps_quote(node_name())) if snapshot.endswith('.ps1') else '_bs_node={}\n'.format(sh_quote(node_name()))
+    try:
+        stamp = os.stat(snapshot).st_mtime_ns
+        with open(snapshot, encoding='utf-8') as snapshotFile:
+            if nodeLine not in snapshotFile.read(4096):
+                return False
+        return all(os.stat(source).st_mtime_ns <= stamp for source in compiled_sources())
+    except OSError:
+        return False
+
+# -- compiled_facts returns the host facts exported by a sourced compiled snapshot, or None when absent, stale, or
+#    compiled by a different interpreter or on another host; HOME is always taken from the current environment
+def compiled_facts():
+    snapshot = os.environ.get('BOOTSTRAP_FACTS')
+    if not snapshot or os.environ.get('BOOTSTRAP_PYTHON') != os.path.realpath(sys.executable):
+        return None
+    if os.environ.get('BOOTSTRAP_NODE') != node_name():
+        return None
+    try:
+        stamp = os.stat(snapshot).st_mtime_ns
+    except OSError:
+        return None
+    for source in compiled_sources():
+        try:
+            if os.stat(source).st_mtime_ns > stamp:
+                return None
+        except OSError:
+            pass
+    facts = dict()
+    for name in CompiledFacts:
+        if name not in os.environ:
+            return None
+        value = os.environ[name]
+        facts[name] = (value == 'True') if name.startswith('Is') else value
+    facts['HOME'] = os.environ['USERPROFILE' if facts['IsWindows'] else 'HOME']
+    return facts
+
+#End Region
+
+# Region Lazy facts
+# Facts that need no probing are derived directly; the rest come from the (cached) HostFacts snapshot.
+RefreshFacts = os.environ.get('BOOTSTRAP_REFRESH', '') not in ('', '0')
+
+def _is_windows():
+    return sys.platform == "win32"
+
+def _is_macos():
+    return sys.platform == "mac" or sys.platform == "macos" or sys.platform == "darwin"
+
+FactResolvers = dict({
+    'HostFacts': lambda: get_host_facts(refresh=RefreshFacts),
+    'IsWindows': _is_windows,
+    'IsMacOS': _is_macos,
+    'IsLinux': lambda: not (_is_windows() or _is_macos()),
+    'HOME': lambda: os.environ['USERPROFILE' if _is_windows() else 'HOME'],
+    'COMPUTERNAME': lambda: get_fact('HostFacts')['COMPUTERNAME'],
+    'hostOS': lambda: get_fact('HostFacts')['hostOS'],
+    'hostOSCaption': lambda: get_fact('HostFacts')['hostOSCaption'],
+    'py_version': lambda: get_fact('HostFacts')['py_version'],
+})
+
+# -- get_fact resolves a fact by name, and memoizes it as a module global, so later reads bypass __getattr__ entirely
+def get_fact(name):
+    moduleGlobals = globals()
+    if name not in moduleGlobals:
+        moduleGlobals[name] = FactResolvers[name]()
+    return moduleGlobals[name]
+
+# -- resolved_facts lists the facts resolved so far; it stays empty until a fact is first requested
+def resolved_facts():
+    return [name for name in FactResolvers if name in globals()]
+
+# PEP 562: called for `from bootstrap import HOME` or `bootstrap.HOME`, only when HOME is not (yet) a module global
+def __getattr__(name):
+    if name in FactResolvers:
+        return get_fact(name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(FactResolvers))
+
+#End Region
+
+# Region CheckLazy
+# Imports bootstrap in a fresh interpreter with an audit hook (PEP 578) installed, and reports any file, process or socket
+# activity during the import, beyond loading module code. A lazy import must report no events and no resolved facts.
+CheckLazyScript = '''
+import sys
+events = []
+def hook(event, args):
+    if event == 'open':
+        path = str(args[0])
+        if path.endswith(('.py', '.pyc', '.so', '.pyd')) or '__pycache__' in path:
+            return
+        events.append('open ' + path)
+    elif event.startswith(('subprocess.', 'os.system', 'os.exec', 'os.posix_spawn', 'socket.')):
+        events.append(event)
+sys.addaudithook(hook)
+sys.path.insert(0, sys.argv[1])
+import bootstrap
+resolved = bootstrap.resolved_facts()
+sys.stdout.write(repr((events, resolved)))
+'''
+
+# -- check_lazy returns the (events, resolved facts) observed while importing bootstrap in a fresh interpreter
+def check_lazy():
+    import ast
+    import subprocess
+    scriptDir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, '-c', CheckLazyScript, scriptDir], stdout=subprocess.PIPE, check=True, universal_newlines=True)
+    return ast.literal_eval(result.stdout)
+
+#End Region
+
+# Only parse arguments, print the Start and Stop Header/Footer and report facts when called directly,
+# so as to not confuse use of argv[0], nor to do any work while being imported
+if MyCommandName == 'bootstrap.py':
+    import argparse
+    parser = argparse.ArgumentParser(description='Establish baseline consistent environment variables')
+    parser.add_argument('--refresh', action='store_true', help='ignore the cached host facts and probe the platform again')
+    parser.add_argument('--check-lazy', action='store_true', help='confirm that importing bootstrap does no I/O until a fact is requested')
+    parser.add_argument('--compile', action='store_true', help='write the host facts as sourceable sh and PowerShell snapshots, into the cache directory')
+    parser.add_argument('--quiet', action='store_true', help='do not print the Start / End banner')
+    args = parser.parse_args()
+    RefreshFacts = args.refresh or RefreshFacts
+
+    if args.compile:
+        for snapshot in compile_snapshot(get_fact('HostFacts')):
+            if not args.quiet:
+                print(' Compiled: {}'.format(snapshot))
+        sys.exit(0)
 
-"""
-    # Get the current locals().items() into a variable, as otherwise it changes during the subsequent for loop
-    varList = dict(locals())
-    # but remove varList as a key from itself
-    #del varList['varList']
+    print('\n Start {}: {}'.format(MyCommandName, time.strftime('%Y %m %d %H:%M:%S %Z', time.localtime())))
 
-    print('List of final variables (locals()):')
-    for k, v in varList.items():
-        print(f'{k}={v}')
- """
+    if args.check_lazy:
+        events, resolved = check_lazy()
+        for event in events:
+            print(' I/O during import: {}'.format(event))
+        print(' Facts resolved during import: {}'.format(', '.join(resolved) or 'none'))
+        if events or resolved:
+            sys.exit(1)
+        print(' OK: importing bootstrap is lazy')
+        sys.exit(0)
+
+    # add blank line, only when IsVerbose
+    if IsVerbose: print('')
+
+    print_var('Platform: hostOS', get_fact('hostOS'))
+    print_var('Platform: hostOSCaption', get_fact('hostOSCaption'))
+    print_var('HOME', get_fact('HOME'))
+
+    print(' # Python {} on {} - {} #'.format('.'.join(get_fact('py_version').split('.')[0:2]), get_fact('hostOSCaption'), get_fact('COMPUTERNAME')))
+
+    # Save what we've determined here in shell/system environment variables, so they can be easily referenced from other py scripts/functions
+    # #
+    # Verbose:
+    # print('\n Here are the persistent variables to import into the next script: ... ')
+    # print('from bootstrap import HOME')
+    # print('from bootstrap import COMPUTERNAME')
+    # print('from bootstrap import hostOS')
+    # print('from bootstrap import hostOSCaption')
+    # print('from bootstrap import IsWindows')
+    # print('from bootstrap import IsLinux')
+    # print('from bootstrap import IsMacOS')
+    #print('\n # # Python Environment Bootstrap Complete #\n')
+    # #
+
+    print_var('global variables','HOME, COMPUTERNAME, hostOS, hostOSCaption, IsWindows, IsLinux, IsMacOS')
 
-if MyCommandName == 'bootstrap.py':
     print(' End: {}\n'.format(time.strftime('%Y %m %d %H:%M:%S %Z', time.localtime())))
 
-# When IsVerbose, pausing between profile/bootstrap scripts to aid in visual testing
-if IsVerbose:
-    print('(pause ...)')
-    time.sleep( SleepTime )
+    # When IsVerbose, pausing between profile/bootstrap scripts to aid in visual testing
+    if IsVerbose:
+        print('(pause ...)')
+        time.sleep( SleepTime )
 
 #sys.exit(0)
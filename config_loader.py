@@ -0,0 +1,285 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : config_loader.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : Load JSON and YAML settings files (e.g. MyPSfiles.json, learnyaml.yaml) once: parse, validate against a schema,
+#             and resolve their $env:NAME and $name tokens, then keep the result as a compiled (pickled) copy in the
+#             bootstrap cache directory. A later load reads only that copy, while the source's mtime and size are unchanged
+#             (or, when they changed, its content hash is), and each token still resolves to the same value.
+#             config_loader.py FILE [--refresh] [--repeat N]   print the compiled settings as JSON, and the load times
+#             YAML needs PyYAML (https://pypi.org/project/PyYAML/), which is imported only to parse a YAML file. A complex
+#             key (a sequence or mapping used as a key, or a !!python/tuple) is loaded as a tuple or frozenset, which JSON
+#             cannot represent: json_data turns such keys into strings for printing.
+# ===================================== #
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+
+import bootstrap
+
+IsVerbose = False # True
+
+CacheVersion = 1
+TokenPattern = re.compile(r'\$(env:)?(\w+)')
+YamlSuffixes = ('.yaml', '.yml')
+
+# -- print_var prints a label and a variable's value, if IsVerbose
+def print_var(label, varname):
+    if IsVerbose:
+        print('< {} = \'{}\' >'.format(label, varname))
+
+# -- ConfigError reports a settings file that cannot be parsed, or does not match its schema (one message per problem)
+class ConfigError(ValueError):
+
+    def __init__(self, path, problems):
+        self.path = path
+        self.problems = list(problems)
+        super(ConfigError, self).__init__('{}: {}'.format(path, '; '.join(self.problems)))
+
+# Region Variables
+# $env:NAME is an environment variable ($env:USERPROFILE falls back to HOME, so the Windows paths of the settings map
+# onto the same folders in a Linux or macOS HOME). $name is one of the PowerShell variables of ps_variables, or a
+# bootstrap fact (e.g. $hostOS, $COMPUTERNAME), which is only resolved when a settings file refers to it.
+
+# -- ps_variables returns the values of the PowerShell variables that the settings may refer to
+def ps_variables():
+    if bootstrap.IsWindows:
+        modulesPath = os.path.join(bootstrap.HOME, 'Documents', 'WindowsPowerShell', 'Modules')
+    else:
+        modulesPath = os.path.join(bootstrap.HOME, '.local', 'share', 'powershell', 'Modules')
+    return dict({'myPSModulesPath': modulesPath, 'HOME': bootstrap.HOME})
+
+# -- resolve_token returns the value of one token (e.g. '$env:USERPROFILE'), or None when it does not resolve
+def resolve_token(token, variables):
+    match = TokenPattern.fullmatch(token)
+    name = match.group(2)
+    if match.group(1):
+        if name in os.environ:
+            return os.environ[name]
+        return bootstrap.HOME if name == 'USERPROFILE' else None
+    if name in variables:
+        return variables[name]
+    if name in bootstrap.FactResolvers and name != 'HostFacts':
+        return str(bootstrap.get_fact(name))
+    return None
+
+# -- expand_value expands the tokens in a string; returns (value, {token: resolved value or None}); tokens that do not
+#    resolve are left as they are
+def expand_value(value, variables, tokens):
+    def expand(match):
+        token = match.group(0)
+        if token not in tokens:
+            tokens[token] = resolve_token(token, variables)
+        return match.group(0) if tokens[token] is None else tokens[token]
+
+    return TokenPattern.sub(expand, value)
+
+#End Region
+
+# Region Schema
+# A schema mirrors the settings it describes:
+#   dict({'Key': schema, 'Optional?': schema})   a mapping with (at least) these keys; a key ending in '?' may be absent
+#   [schema]                                     a list, each item matching schema
+#   str, int, float, bool (or a tuple of them)   a scalar of that type
+#   'path'                                       a string, expanded and normalized as a path for this OS
+#   None                                         anything
+
+# -- validate returns the problems of data against schema, as messages that name their location (e.g. /RepositorySets/3/Name)
+def validate(data, schema, location=''):
+    if schema is None:
+        return []
+    if isinstance(schema, dict):
+        if not isinstance(data, dict):
+            return ['{} should be a mapping'.format(location or '/')]
+        problems = []
+        for key, itemSchema in schema.items():
+            name = key.rstrip('?')
+            if name in data:
+                problems += validate(data[name], itemSchema, '{}/{}'.format(location, name))
+            elif not key.endswith('?'):
+                problems.append('{}/{} is missing'.format(location, name))
+        return problems
+    if isinstance(schema, list):
+        if not isinstance(data, list):
+            return ['{} should be a list'.format(location or '/')]
+        problems = []
+        for index, item in enumerate(data):
+            problems += validate(item, schema[0], '{}/{}'.format(location, index))
+        return problems
+    types = (str,) if schema == 'path' else schema if isinstance(schema, tuple) else (schema,)
+    # bool is an int, but a true or false is not a valid number setting
+    if not isinstance(data, types) or (isinstance(data, bool) and bool not in types):
+        return ['{} should be {}, not {!r}'.format(location or '/', ' or '.join(kind.__name__ for kind in types), data)]
+    return []
+
+# -- compile_data returns data with the tokens of every string expanded (and the 'path' strings of schema normalized), and
+#    {location (a tuple of keys and indexes): [unresolved tokens]}; tokens collects every token and its resolved value
+def compile_data(data, schema, variables, tokens, location=(), unresolved=None):
+    unresolved = dict() if unresolved is None else unresolved
+    if isinstance(data, dict):
+        schemaKeys = dict((key.rstrip('?'), value) for key, value in schema.items()) if isinstance(schema, dict) else dict()
+        return dict((key, compile_data(value, schemaKeys.get(key), variables, tokens, location + (key,), unresolved)[0])
+                    for key, value in data.items()), unresolved
+    if isinstance(data, list):
+        itemSchema = schema[0] if isinstance(schema, list) else None
+        return [compile_data(item, itemSchema, variables, tokens, location + (index,), unresolved)[0] for index, item in enumerate(data)], unresolved
+    if isinstance(data, str):
+        value = expand_value(data, variables, tokens)
+        missing = list(dict.fromkeys(match.group(0) for match in TokenPattern.finditer(data) if tokens[match.group(0)] is None))
+        if missing:
+            unresolved[location] = missing
+        if schema == 'path':
+            if not bootstrap.IsWindows:
+                value = value.replace('\\', '/')
+            value = os.path.normpath(value)
+        return value, unresolved
+    return data, unresolved
+
+#End Region
+
+# Region Compiled cache
+
+# -- cache_file returns the compiled copy's path for a settings file
+def cache_file(path):
+    return bootstrap.cache_dir().joinpath('config', hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[0:16] + '.pickle')
+
+# -- hashable_key returns a YAML key that Python can hash: a sequence as a tuple, a mapping or set as a frozenset
+def hashable_key(key):
+    if isinstance(key, (list, tuple)):
+        return tuple(hashable_key(item) for item in key)
+    if isinstance(key, dict):
+        return frozenset((hashable_key(name), hashable_key(value)) for name, value in key.items())
+    if isinstance(key, set):
+        return frozenset(hashable_key(item) for item in key)
+    return key
+
+# -- yaml_loader returns a safe loader class (libyaml's, when PyYAML was built with it) that also takes the complex keys of
+#    YAML, e.g. '? - Manchester United', !!python/tuple and !!python/complex; it constructs nothing else that safe_load
+#    would not (no arbitrary python objects)
+def yaml_loader(yaml):
+
+    class ConfigLoader(getattr(yaml, 'CSafeLoader', yaml.SafeLoader)):
+
+        def construct_mapping(self, node, deep=False):
+            if not isinstance(node, yaml.MappingNode):
+                raise yaml.constructor.ConstructorError(None, None, 'expected a mapping node, but found {}'.format(node.id), node.start_mark)
+            self.flatten_mapping(node)
+            mapping = dict()
+            for keyNode, valueNode in node.value:
+                key = hashable_key(self.construct_object(keyNode, deep=True))
+                mapping[key] = self.construct_object(valueNode, deep=deep)
+            return mapping
+
+    ConfigLoader.add_constructor('tag:yaml.org,2002:python/tuple', lambda loader, node: tuple(loader.construct_sequence(node, deep=True)))
+    ConfigLoader.add_constructor('tag:yaml.org,2002:python/complex', lambda loader, node: complex(loader.construct_scalar(node)))
+    return ConfigLoader
+
+# -- parse_config parses the text of a settings file (JSON, or YAML by its suffix)
+def parse_config(path, content):
+    if path.lower().endswith(YamlSuffixes):
+        try:
+            import yaml
+        except ImportError:
+            raise ConfigError(path, ['reading YAML needs PyYAML (pip install PyYAML)'])
+        try:
+            return yaml.load(content, Loader=yaml_loader(yaml))
+        except yaml.YAMLError as err:
+            raise ConfigError(path, [str(err).replace('\n', ' ')])
+    try:
+        return json.loads(content.decode('utf-8-sig'))
+    except ValueError as err:
+        raise ConfigError(path, [str(err)])
+
+# -- schema_digest identifies a schema, so a compiled copy is only used with the schema it was validated against
+def schema_digest(schema):
+    return hashlib.sha1(repr(schema).encode('utf-8')).hexdigest()
+
+# -- load_config returns (settings, {location: [unresolved tokens]}) for a settings file: the compiled copy when it is
+#    still valid, otherwise the file is parsed, validated (raising ConfigError) and compiled again
+def load_config(path, schema=None, variables=None, refresh=False):
+    path = os.path.abspath(path)
+    variables = ps_variables() if variables is None else variables
+    sourceStat = os.stat(path)
+    stamp = [sourceStat.st_mtime_ns, sourceStat.st_size]
+    cachePath = cache_file(path)
+    compiled = None
+    if not refresh:
+        try:
+            with open(cachePath, 'rb') as cacheFile:
+                compiled = pickle.load(cacheFile)
+            if compiled['version'] != CacheVersion or compiled['source'] != path or compiled['schema'] != schema_digest(schema):
+                compiled = None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, KeyError, TypeError):
+            compiled = None
+    # the compiled values are only valid while each token still resolves as it did
+    if compiled and any(resolve_token(token, variables) != value for token, value in compiled['tokens'].items()):
+        compiled = None
+    if compiled and compiled['stamp'] == stamp:
+        return compiled['data'], compiled['unresolved']
+
+    with open(path, 'rb') as sourceFile:
+        content = sourceFile.read()
+    digest = hashlib.sha256(content).hexdigest()
+    if compiled and compiled['digest'] == digest:
+        # touched, or copied, but not changed
+        print_var(path, 'unchanged content')
+    else:
+        data = parse_config(path, content)
+        problems = validate(data, schema)
+        if problems:
+            raise ConfigError(path, problems)
+        tokens = dict()
+        data, unresolved = compile_data(data, schema, variables, tokens)
+        compiled = dict({'version': CacheVersion, 'source': path, 'schema': schema_digest(schema), 'digest': digest,
+                         'tokens': tokens, 'data': data, 'unresolved': unresolved})
+        print_var(path, 'compiled, with tokens {}'.format(tokens))
+    compiled['stamp'] = stamp
+    try:
+        bootstrap.write_atomic(cachePath, pickle.dumps(compiled, protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        # a read-only or missing cache location only costs us the warm start
+        pass
+    return compiled['data'], compiled['unresolved']
+
+# -- json_data returns data with the keys JSON cannot hold (tuples and frozensets, from complex YAML keys) as strings,
+#    and sets and tuples as lists
+def json_data(data):
+    if isinstance(data, dict):
+        return dict((key if key is None or isinstance(key, (str, int, float, bool)) else str(key), json_data(value))
+                    for key, value in data.items())
+    if isinstance(data, (list, tuple, set, frozenset)):
+        return [json_data(item) for item in data]
+    return data
+
+#End Region
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description='Load a JSON or YAML settings file through its compiled copy, and print it as JSON')
+    parser.add_argument('path', metavar='FILE', help='settings file')
+    parser.add_argument('--refresh', action='store_true', help='parse and compile the file again, ignoring the compiled copy')
+    parser.add_argument('--repeat', type=int, default=1, help='loads to time (default: %(default)s)')
+    args = parser.parse_args()
+
+    timings = []
+    try:
+        for count in range(max(1, args.repeat)):
+            started = time.perf_counter()
+            settings, unresolved = load_config(args.path, refresh=args.refresh and count == 0)
+            timings.append((time.perf_counter() - started) * 1000.0)
+    except (ConfigError, OSError) as err:
+        print(' {}'.format(err), file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(json_data(settings), indent=2, default=str))
+    for location, tokens in sorted(unresolved.items(), key=str):
+        print(' unresolved {} in /{}'.format(', '.join(tokens), '/'.join(str(key) for key in location)), file=sys.stderr)
+    print(' first load {:.2f} ms{}'.format(timings[0], ', then best of {} {:.3f} ms'.format(len(timings) - 1, min(timings[1:])) if len(timings) > 1 else ''),
+          file=sys.stderr)
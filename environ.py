@@ -4,24 +4,428 @@
 # LANGUAGE  : Python
 # VERSION   : 3
 # AUTHOR    : Bryan Dady
-# UPDATED   : 11/1/2019 - reference working with system environment variables
+# UPDATED   : 10/18/2026 - Add procs, to query the environments of all processes (from /proc)
+# INTRO     : reference working with system environment variables
+#             environ.py [show]                     print the environment variables
+#             environ.py snapshot [-o FILE]         save the environment, as json (default), ndjson or env0 (KEY=VALUE\0, as in /proc/<pid>/environ)
+#             environ.py diff BEFORE [AFTER]        compare two snapshots (AFTER defaults to the current environment)
+#             environ.py path                       report duplicate, missing and unreadable PATH entries, and shadowed commands
+#             environ.py which NAME [NAME ...]      resolve commands, from a cached index of the PATH directories
+#             environ.py procs [--key GLOB] [--value REGEX] [--name GLOB]   find variables across all processes (Linux /proc)
+#             --filter GLOB limits show, snapshot and diff to matching variable names
 # ===================================== #
 
+import argparse
+import concurrent.futures
+import fnmatch
+import json
 import os
+import re
 import sys
 import time
 
-print('Start {}: {}\n'.format(sys.argv[0], time.strftime('%Y %m %d %H:%M:%S %Z', time.localtime())))
+from bootstrap import cache_dir
+from bootstrap import write_atomic
 
-# printing environment variables
-print('')
-print('Environment Variables:')
-print(' # # #')
-for k, v in os.environ.items():
-    print(f'    {k} = {v}')
-print(' # # #')
-print('')
+# Variables whose values are lists of paths, which diff compares element by element
+PathLikeNames = ('PATH', 'PATHEXT', 'PSModulePath', 'MANPATH', 'INFOPATH', 'LD_LIBRARY_PATH', 'DYLD_LIBRARY_PATH',
+                 'PYTHONPATH', 'CLASSPATH', 'XDG_DATA_DIRS', 'XDG_CONFIG_DIRS', 'FPATH', 'CDPATH')
 
-print('\nEnd : {}'.format(time.strftime('%Y %m %d %H:%M:%S %Z', time.localtime())))
+# -- filter_environ returns the items of environ whose names match any of the glob patterns (all of them, when there are none)
+def filter_environ(environ, patterns):
+    if not patterns:
+        return dict(environ)
+    return dict((key, value) for key, value in environ.items() if any(fnmatch.fnmatchcase(key, pattern) for pattern in patterns))
+
+# -- dump_environ serializes environ as json, ndjson or env0, always to bytes
+def dump_environ(environ, outputFormat):
+    if outputFormat == 'env0':
+        return b''.join(os.fsencode(key) + b'=' + os.fsencode(value) + b'\0' for key, value in environ.items())
+    if outputFormat == 'ndjson':
+        return ''.join(json.dumps(dict({'key': key, 'value': value})) + '\n' for key, value in environ.items()).encode('utf-8')
+    return (json.dumps(environ, indent=1, sort_keys=True) + '\n').encode('utf-8')
+
+# -- parse_env0 parses NUL-separated KEY=VALUE entries (an env0 snapshot, or /proc/<pid>/environ)
+def parse_env0(data):
+    environ = dict()
+    for entry in data.split(b'\0'):
+        key, separator, value = entry.partition(b'=')
+        if separator:
+            environ[os.fsdecode(key)] = os.fsdecode(value)
+    return environ
+
+# -- load_environ reads a snapshot in any of the dump_environ formats, detected from its content
+def load_environ(path):
+    with open(path, 'rb') as snapshot:
+        data = snapshot.read()
+    if b'\0' in data:
+        return parse_env0(data)
+    text = data.decode('utf-8')
+    try:
+        environ = json.loads(text)
+        # a one-line ndjson snapshot is also a valid json object
+        if isinstance(environ, dict) and set(environ) != set(('key', 'value')):
+            return environ
+    except ValueError:
+        pass
+    environ = dict()
+    for line in text.splitlines():
+        if line.strip():
+            record = json.loads(line)
+            environ[record['key']] = record['value']
+    return environ
+
+# -- is_path_like reports whether a variable holds a list of paths
+def is_path_like(key):
+    return key.upper() in PathLikeNames or key.upper().endswith('PATH')
+
+# -- diff_paths compares two path lists element by element: (added, removed, reordered)
+def diff_paths(before, after):
+    separator = ';' if ';' in before + after else os.pathsep
+    beforeItems = [item for item in before.split(separator) if item]
+    afterItems = [item for item in after.split(separator) if item]
+    beforeSet = set(beforeItems)
+    afterSet = set(afterItems)
+    added = [item for item in afterItems if item not in beforeSet]
+    removed = [item for item in beforeItems if item not in afterSet]
+    common = afterSet & beforeSet
+    reordered = [item for item in beforeItems if item in common] != [item for item in afterItems if item in common]
+    return added, removed, reordered
+
+# -- diff_environ compares two environments in linear time: {'added': {}, 'removed': {}, 'changed': {}}
+def diff_environ(before, after):
+    diff = dict({'added': dict(), 'removed': dict(), 'changed': dict()})
+    for key, value in after.items():
+        if key not in before:
+            diff['added'][key] = value
+        elif before[key] != value:
+            change = dict({'old': before[key], 'new': value})
+            if is_path_like(key):
+                change['added'], change['removed'], change['reordered'] = diff_paths(before[key], value)
+            diff['changed'][key] = change
+    for key, value in before.items():
+        if key not in after:
+            diff['removed'][key] = value
+    return diff
+
+# -- format_diff renders a diff_environ result as text lines: + added, - removed, ~ changed
+def format_diff(diff):
+    lines = []
+    for key in sorted(diff['added']):
+        lines.append('+ {}={}'.format(key, diff['added'][key]))
+    for key in sorted(diff['removed']):
+        lines.append('- {}={}'.format(key, diff['removed'][key]))
+    for key in sorted(diff['changed']):
+        change = diff['changed'][key]
+        if 'added' in change:
+            lines.append('~ {}:{}'.format(key, ' (reordered)' if change['reordered'] else ''))
+            lines.extend('    + {}'.format(item) for item in change['added'])
+            lines.extend('    - {}'.format(item) for item in change['removed'])
+        else:
+            lines.append('~ {}: {} -> {}'.format(key, change['old'], change['new']))
+    return lines
+
+# -- format_environ renders environment variables as the indented 'KEY = VALUE' listing
+def format_environ(environ):
+    lines = ['', 'Environment Variables:', ' # # #']
+    lines.extend('    {} = {}'.format(key, value) for key, value in environ.items())
+    lines.extend([' # # #', ''])
+    return lines
+
+# Region PATH index
+# `environ.py path` reports duplicate and missing PATH entries, and commands shadowed by an earlier PATH entry.
+# `environ.py which NAME` resolves commands. Both use an index of executable names per PATH directory, kept in the
+# bootstrap cache directory, in which a directory is only re-scanned (in parallel) when its mtime has changed.
+
+# -- path_entries splits a PATH value into its (non-empty) directories, in order
+def path_entries(pathValue):
+    return [entry for entry in pathValue.split(os.pathsep) if entry]
+
+# -- executable_suffixes returns the file name suffixes that make a file executable on Windows ($PATHEXT), or None elsewhere
+def executable_suffixes():
+    if sys.platform == "win32":
+        return tuple(suffix.lower() for suffix in os.environ.get('PATHEXT', '.COM;.EXE;.BAT;.CMD').split(';') if suffix)
+    return None
+
+# -- scan_directory returns the sorted executable file names in one directory, or None when it cannot be listed
+def scan_directory(directory, suffixes):
+    names = []
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return None
+    with entries:
+        for entry in entries:
+            try:
+                if not entry.is_file():
+                    continue
+                if suffixes is None:
+                    if entry.stat().st_mode & 0o111:
+                        names.append(entry.name)
+                elif entry.name.lower().endswith(suffixes):
+                    names.append(entry.name)
+            except OSError:
+                continue
+    return sorted(names)
+
+# -- load_path_index returns {directory: {'mtime': ns, 'names': [...]}} for the PATH directories, re-scanning (in
+#    parallel, with up to workers threads) only those whose mtime differs from the cached index; missing directories map to None.
+#    A directory that cannot be listed is cached as {'mtime', 'ctime', 'names': [], 'unreadable': True}: a chmod changes
+#    its ctime, not its mtime, so it is scanned again once its ctime changes
+def load_path_index(directories, workers=8, refresh=False):
+    indexFile = cache_dir().joinpath('path-index.json')
+    try:
+        cached = json.loads(indexFile.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        cached = dict()
+
+    index = dict()
+    stale = []
+    for directory in dict.fromkeys(directories):
+        try:
+            directoryStat = os.stat(directory)
+        except OSError:
+            index[directory] = None
+            continue
+        entry = cached.get(directory)
+        if not refresh and entry and entry['mtime'] == directoryStat.st_mtime_ns and entry.get('ctime', directoryStat.st_ctime_ns) == directoryStat.st_ctime_ns:
+            index[directory] = entry
+        else:
+            stale.append((directory, directoryStat))
+
+    if stale:
+        suffixes = executable_suffixes()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            scans = pool.map(lambda item: (item, scan_directory(item[0], suffixes)), stale)
+            for (directory, directoryStat), names in scans:
+                if names is None:
+                    index[directory] = dict({'mtime': directoryStat.st_mtime_ns, 'ctime': directoryStat.st_ctime_ns, 'names': [], 'unreadable': True})
+                else:
+                    index[directory] = dict({'mtime': directoryStat.st_mtime_ns, 'names': names})
+        try:
+            write_atomic(indexFile, json.dumps(dict((directory, entry) for directory, entry in index.items() if entry)))
+        except OSError:
+            pass
+    return index
+
+# -- unique_directories returns the directories in order, without repeats or aliases (e.g. /bin when it links to /usr/bin)
+def unique_directories(directories):
+    seen = set()
+    unique = []
+    for directory in directories:
+        realPath = os.path.realpath(directory)
+        if realPath not in seen:
+            seen.add(realPath)
+            unique.append(directory)
+    return unique
+
+# -- command_table maps each executable name to the directories that provide it, in PATH order; on Windows,
+#    names are also listed without their suffix, and matched case-insensitively
+def command_table(directories, index):
+    table = dict()
+    windows = sys.platform == "win32"
+    for directory in unique_directories(directories):
+        entry = index.get(directory)
+        if not entry:
+            continue
+        for name in entry['names']:
+            keys = [name.lower(), os.path.splitext(name)[0].lower()] if windows else [name]
+            for key in dict.fromkeys(keys):
+                table.setdefault(key, []).append(os.path.join(directory, name))
+    return table
+
+# -- analyze_path returns the duplicate, missing and shadowing findings for a list of PATH directories
+def analyze_path(directories, index, table):
+    # entries are duplicates when they resolve to the same directory, e.g. /bin and /usr/bin on a merged-/usr system
+    positions = dict()
+    for position, directory in enumerate(directories):
+        positions.setdefault(os.path.realpath(directory), []).append(position)
+    return dict({
+        'entries': len(directories),
+        'unique': len(positions),
+        'duplicates': dict((directories[where[0]], where) for where in positions.values() if len(where) > 1),
+        'missing': list(dict.fromkeys(directory for directory in directories if index.get(directory) is None)),
+        'unreadable': list(dict.fromkeys(directory for directory in directories if (index.get(directory) or dict()).get('unreadable'))),
+        'shadowed': dict((name, paths) for name, paths in sorted(table.items()) if len(paths) > 1),
+    })
+
+# -- format_path_report renders an analyze_path result as text lines
+def format_path_report(report):
+    lines = ['PATH: {} entries, {} unique'.format(report['entries'], report['unique'])]
+    for directory, where in report['duplicates'].items():
+        lines.append(' duplicate: {} (entries {})'.format(directory, ', '.join(str(position + 1) for position in where)))
+    for directory in report['missing']:
+        lines.append(' missing:   {}'.format(directory))
+    for directory in report['unreadable']:
+        lines.append(' unreadable: {}'.format(directory))
+    for name, paths in report['shadowed'].items():
+        lines.append(' shadowed:  {} -> {} (hides {})'.format(name, paths[0], ', '.join(paths[1:])))
+    return lines
+
+#End Region
+
+# Region Process environments
+# `environ.py procs` reads /proc/<pid>/environ for every accessible process (Linux), with a bounded thread pool, and
+# answers which processes carry a variable (--key), a value (--value) or are a given program (--name). Identical
+# KEY=VALUE entries are parsed once and shared between processes, as most processes inherit the same environment.
+# Processes that exit while being read, or whose environment is not readable by this user, are skipped and counted.
+
+# -- read_process reads (pid, comm, environ entries) for one process, or (pid, None, reason) when it cannot be read
+def read_process(procRoot, pid):
+    try:
+        with open(os.path.join(procRoot, pid, 'environ'), 'rb') as environFile:
+            data = environFile.read()
+        with open(os.path.join(procRoot, pid, 'comm'), 'rb') as commFile:
+            comm = commFile.read().rstrip(b'\n')
+    except (FileNotFoundError, ProcessLookupError):
+        # kernel threads have no environment (ESRCH) for as long as they exist
+        return pid, None, 'without environ' if os.path.exists(os.path.join(procRoot, pid)) else 'vanished'
+    except PermissionError:
+        return pid, None, 'denied'
+    except OSError:
+        return pid, None, 'unreadable'
+    return pid, comm, data.split(b'\0')
+
+# -- intern_entries parses environ entries into (key, value) tuples, shared through pool across processes
+def intern_entries(entries, pool):
+    pairs = []
+    for entry in entries:
+        pair = pool.get(entry)
+        if pair is None:
+            key, separator, value = entry.partition(b'=')
+            if not separator:
+                continue
+            pair = pool[entry] = (sys.intern(os.fsdecode(key)), os.fsdecode(value))
+        pairs.append(pair)
+    return tuple(pairs)
+
+# -- read_processes returns ([(pid, comm, pairs)], {skip reason: count}) for all processes under procRoot
+def read_processes(procRoot='/proc', workers=16):
+    pids = [name for name in os.listdir(procRoot) if name.isdigit()]
+    pool = dict()
+    commNames = dict()
+    processes = []
+    skipped = dict()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for pid, comm, entries in executor.map(lambda pid: read_process(procRoot, pid), pids, chunksize=64):
+            if comm is None:
+                skipped[entries] = skipped.get(entries, 0) + 1
+                continue
+            if comm not in commNames:
+                commNames[comm] = os.fsdecode(comm)
+            processes.append((int(pid), commNames[comm], intern_entries(entries, pool)))
+    processes.sort()
+    return processes, skipped
+
+# -- query_processes yields (pid, comm, key, value) for each variable matching the key glob and value regex, in processes
+#    whose comm matches the name glob; any of the three may be None (matching everything)
+def query_processes(processes, keyPattern=None, valuePattern=None, namePattern=None):
+    valueRegex = re.compile(valuePattern) if valuePattern else None
+    for pid, comm, pairs in processes:
+        if namePattern and not fnmatch.fnmatchcase(comm, namePattern):
+            continue
+        for key, value in pairs:
+            if keyPattern and not fnmatch.fnmatchcase(key, keyPattern):
+                continue
+            if valueRegex and not valueRegex.search(value):
+                continue
+            yield pid, comm, key, value
+
+#End Region
+
+if __name__ == '__main__':
+    # --filter is accepted before or after the command: the main parser keeps its own dest, as a command's parser would
+    # otherwise overwrite the main one's value; both lists are merged once parsed
+    filterHelp = 'only include variables whose name matches GLOB (repeatable)'
+    filterParser = argparse.ArgumentParser(add_help=False)
+    filterParser.add_argument('--filter', action='append', metavar='GLOB', help=filterHelp)
+    parser = argparse.ArgumentParser(description='Show, snapshot and compare environment variables')
+    parser.add_argument('--filter', action='append', dest='global_filter', metavar='GLOB', help=filterHelp)
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('show', parents=[filterParser], help='print the environment variables (default)')
+    snapshotParser = commands.add_parser('snapshot', parents=[filterParser], help='save the environment variables')
+    snapshotParser.add_argument('-o', '--output', help='snapshot file (default: stdout)')
+    snapshotParser.add_argument('--format', choices=('json', 'ndjson', 'env0'), default='json', help='snapshot format (default: json)')
+    diffParser = commands.add_parser('diff', parents=[filterParser], help='compare two snapshots')
+    diffParser.add_argument('before', help='snapshot file')
+    diffParser.add_argument('after', nargs='?', help='snapshot file (default: the current environment)')
+    diffParser.add_argument('--json', action='store_true', help='print the differences as JSON')
+    pathParser = commands.add_parser('path', help='report duplicate and missing PATH entries, and shadowed commands')
+    pathParser.add_argument('--json', action='store_true', help='print the report as JSON')
+    whichParser = commands.add_parser('which', help='resolve commands via the PATH index')
+    whichParser.add_argument('names', nargs='+', metavar='NAME', help='command name')
+    whichParser.add_argument('-a', '--all', action='store_true', help='list every match, not only the first')
+    procsParser = commands.add_parser('procs', help='query the environment variables of all processes (Linux)')
+    procsParser.add_argument('--key', metavar='GLOB', help='variable name glob')
+    procsParser.add_argument('--value', metavar='REGEX', help='variable value regular expression')
+    procsParser.add_argument('--name', metavar='GLOB', help='process name (comm) glob')
+    procsParser.add_argument('--workers', type=int, default=16, help='concurrent /proc readers (default: %(default)s)')
+    procsParser.add_argument('--json', action='store_true', help='print the matches as ndjson')
+    for indexParser in (pathParser, whichParser):
+        indexParser.add_argument('--refresh', action='store_true', help='re-scan every PATH directory, ignoring the cached index')
+        indexParser.add_argument('--workers', type=int, default=8, help='concurrent directory scans (default: %(default)s)')
+    args = parser.parse_args()
+    args.filter = ((args.global_filter or []) + (getattr(args, 'filter', None) or [])) or None
+
+    if args.command == 'procs':
+        if not os.path.isdir('/proc'):
+            parser.error('procs requires a /proc filesystem')
+        started = time.perf_counter()
+        processes, skipped = read_processes('/proc', max(1, args.workers))
+        lines = []
+        for pid, comm, key, value in query_processes(processes, args.key, args.value, args.name):
+            if args.json:
+                lines.append(json.dumps(dict({'pid': pid, 'comm': comm, 'key': key, 'value': value})))
+            else:
+                lines.append('{:>8} {:<16} {}={}'.format(pid, comm, key, value))
+        sys.stdout.write(''.join(line + '\n' for line in lines))
+        sys.stderr.write(' {} processes read in {:.1f} ms, {} matches{}\n'.format(len(processes), (time.perf_counter() - started) * 1000.0, len(lines),
+                         ''.join(', {} {}'.format(count, reason) for reason, count in sorted(skipped.items()))))
+        sys.exit(0 if lines else 1)
+
+    if args.command in ('path', 'which'):
+        directories = path_entries(os.environ.get('PATH', ''))
+        index = load_path_index(directories, max(1, args.workers), args.refresh)
+        table = command_table(directories, index)
+        if args.command == 'which':
+            notFound = 0
+            for name in args.names:
+                paths = table.get(name.lower() if sys.platform == "win32" else name, [])
+                if not paths:
+                    notFound += 1
+                sys.stdout.write(''.join(path + '\n' for path in (paths if args.all else paths[0:1])))
+            sys.exit(1 if notFound else 0)
+        report = analyze_path(directories, index, table)
+        if args.json:
+            sys.stdout.write(json.dumps(report, indent=1) + '\n')
+        else:
+            sys.stdout.write(''.join(line + '\n' for line in format_path_report(report)))
+        sys.exit(0)
+
+    if args.command == 'snapshot':
+        data = dump_environ(filter_environ(os.environ, args.filter), args.format)
+        if args.output:
+            with open(args.output, 'wb') as snapshot:
+                snapshot.write(data)
+        else:
+            sys.stdout.buffer.write(data)
+        sys.exit(0)
+
+    if args.command == 'diff':
+        before = filter_environ(load_environ(args.before), args.filter)
+        after = filter_environ(load_environ(args.after) if args.after else os.environ, args.filter)
+        diff = diff_environ(before, after)
+        if args.json:
+            sys.stdout.write(json.dumps(diff, indent=1, sort_keys=True) + '\n')
+        else:
+            lines = format_diff(diff)
+            sys.stdout.write(''.join(line + '\n' for line in lines))
+        sys.exit(1 if diff['added'] or diff['removed'] or diff['changed'] else 0)
+
+    # printing environment variables, in a single buffered write
+    lines = ['Start {}: {}\n'.format(sys.argv[0], time.strftime('%Y %m %d %H:%M:%S %Z', time.localtime()))]
+    lines.extend(format_environ(filter_environ(os.environ, args.filter)))
+    lines.append('\nEnd : {}'.format(time.strftime('%Y %m %d %H:%M:%S %Z', time.localtime())))
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 #sys.exit(0)
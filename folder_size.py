@@ -0,0 +1,210 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : folder_size.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : Disk usage of folder trees, on any OS (Get-FolderSize.ps1 needs COM or robocopy, so only works on Windows)
+#             folder_size.py PATH [PATH ...] [--max-depth N] [--ndjson] [--workers N] [--refresh] [--one-file-system]
+#             Directories are read with os.scandir, by a pool of threads, and each directory's total is reported (streamed)
+#             as soon as all of its sub-directories are done, so only the directories still in progress are held in memory.
+#             Each directory's own files (bytes, count) and sub-directory names are cached in an SQLite database (in the
+#             bootstrap cache directory); a rescan only reads the directories whose mtime changed. A directory's mtime
+#             changes when entries are added, removed or renamed, but not when a file in it is rewritten in place, so use
+#             --refresh after in-place changes (e.g. growing log files) matter.
+# ===================================== #
+
+import argparse
+import concurrent.futures
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from bootstrap import IsLinux
+from bootstrap import IsMacOS
+from bootstrap import cache_dir
+
+IsVerbose = False # True
+
+# Virtual or duplicated trees, skipped unless they are the path being measured
+if IsLinux:
+    SkipPaths = ('/proc', '/sys', '/dev', '/run')
+elif IsMacOS:
+    # the Data volume is firmlinked into /, so it would be counted twice
+    SkipPaths = ('/dev', '/System/Volumes/Data', '/Volumes')
+else:
+    SkipPaths = ()
+
+Precision = 4
+CommitBatch = 1000
+
+# Region Cache
+# One row per directory: its mtime when scanned, the bytes and count of the files directly in it, and the names of its
+# sub-directories. Only the main thread uses the connection; the workers are handed the row of the directory they scan.
+
+# -- open_cache opens (creating when needed) the directory cache database
+def open_cache(path=None):
+    path = str(path or cache_dir().joinpath('folder_size.sqlite'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.execute('CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime INTEGER, bytes INTEGER, files INTEGER, subdirs TEXT)')
+    return connection
+
+# -- cached_row returns (mtime, bytes, files, [sub-directory names]) for a directory, or None
+def cached_row(connection, path):
+    row = connection.execute('SELECT mtime, bytes, files, subdirs FROM dirs WHERE path = ?', (path,)).fetchone()
+    if row is None:
+        return None
+    return row[0], row[1], row[2], row[3].split('\0') if row[3] else []
+
+# -- forget_tree deletes the rows of a removed directory and everything below it (a range scan of the primary key)
+def forget_tree(connection, path):
+    prefix = path.rstrip(os.sep) + os.sep
+    connection.execute('DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)', (path, prefix, prefix[:-1] + chr(ord(os.sep) + 1)))
+
+#End Region
+
+# Region Scan
+
+# -- scan_directory returns the own totals of one directory, re-reading it only when its mtime differs from the cached row:
+#    dict(mtime, dev, bytes, files, subdirs, cached, errors)
+def scan_directory(path, row):
+    directoryStat = os.stat(path, follow_symlinks=False)
+    result = dict({'mtime': directoryStat.st_mtime_ns, 'dev': directoryStat.st_dev, 'errors': 0})
+    if row is not None and row[0] == directoryStat.st_mtime_ns:
+        result.update({'bytes': row[1], 'files': row[2], 'subdirs': row[3], 'cached': True})
+        return result
+
+    totalBytes = 0
+    files = 0
+    subdirs = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                else:
+                    # symlinks count as their own (small) size, and are never followed
+                    totalBytes += entry.stat(follow_symlinks=False).st_size
+                    files += 1
+            except OSError:
+                result['errors'] += 1
+    result.update({'bytes': totalBytes, 'files': files, 'subdirs': sorted(subdirs), 'cached': False})
+    return result
+
+# -- folder_sizes walks root, and yields dict(path, depth, bytes, files, dirs, errors) for each directory, as soon as its whole
+#    subtree is done (children before parents; root last). Up to workers directories are read at a time, taken depth
+#    first, so the directories in progress stay few even on very large trees. bytes, files and dirs are subtree totals.
+def folder_sizes(root, connection, workers=8, refresh=False, oneFileSystem=False):
+    root = os.path.abspath(root)
+    skipPaths = set(path for path in SkipPaths if path != root)
+    rootDev = os.stat(root).st_dev if oneFileSystem else None
+    # inProgress: {path: [parent, depth, children pending, bytes, files, dirs, errors]}
+    inProgress = dict()
+    stack = [(root, None, 0)]
+    running = dict()
+    pendingWrites = 0
+
+    def finish(path):
+        while path is not None:
+            parent, depth, pending, totalBytes, files, dirs, errors = inProgress.pop(path)
+            yield dict({'path': path, 'depth': depth, 'bytes': totalBytes, 'files': files, 'dirs': dirs, 'errors': errors})
+            if parent is None:
+                return
+            totals = inProgress[parent]
+            totals[2] -= 1
+            totals[3] += totalBytes
+            totals[4] += files
+            totals[5] += dirs + 1
+            totals[6] += errors
+            path = parent if totals[2] == 0 else None
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        while stack or running:
+            while stack and len(running) < workers * 2:
+                path, parent, depth = stack.pop()
+                row = None if refresh else cached_row(connection, path)
+                running[pool.submit(scan_directory, path, row)] = (path, parent, depth, row)
+            done, notDone = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                path, parent, depth, row = running.pop(future)
+                try:
+                    result = future.result()
+                except OSError:
+                    result = dict({'bytes': 0, 'files': 0, 'subdirs': [], 'cached': True, 'errors': 1, 'dev': None})
+                    forget_tree(connection, path)
+                subdirs = [os.path.join(path, name) for name in result['subdirs']]
+                if not result['cached']:
+                    connection.execute('INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?)',
+                                       (path, result['mtime'], result['bytes'], result['files'], '\0'.join(result['subdirs'])))
+                    if row is not None:
+                        for removed in set(row[3]) - set(result['subdirs']):
+                            forget_tree(connection, os.path.join(path, removed))
+                    pendingWrites += 1
+                if rootDev is not None and result['dev'] not in (None, rootDev):
+                    # a mount point of another file system: counted as an empty folder, as du -x does
+                    result.update({'bytes': 0, 'files': 0})
+                    subdirs = []
+                subdirs = [subdir for subdir in subdirs if subdir not in skipPaths]
+                inProgress[path] = [parent, depth, len(subdirs), result['bytes'], result['files'], 0, result['errors']]
+                stack.extend((subdir, path, depth + 1) for subdir in reversed(subdirs))
+                if not subdirs:
+                    for total in finish(path):
+                        yield total
+            if pendingWrites >= CommitBatch:
+                connection.commit()
+                pendingWrites = 0
+    connection.commit()
+
+# -- format_bytes renders a byte count with a binary unit (B, K, M, G, T)
+def format_bytes(count):
+    for unit in ('B', 'K', 'M', 'G', 'T'):
+        if count < 1024 or unit == 'T':
+            return '{:.0f}{}'.format(count, unit) if unit == 'B' else '{:.1f}{}'.format(count, unit)
+        count /= 1024.0
+
+#End Region
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report the disk usage (apparent size) of folder trees')
+    parser.add_argument('paths', nargs='+', metavar='PATH', help='folder to measure')
+    parser.add_argument('--max-depth', type=int, default=1, help='report directories down to this depth below each PATH (default: %(default)s)')
+    parser.add_argument('--ndjson', action='store_true', help='stream one JSON object per reported directory, and a summary per PATH')
+    parser.add_argument('--workers', type=int, default=8, help='directories to read concurrently (default: %(default)s)')
+    parser.add_argument('--refresh', action='store_true', help='read every directory, ignoring the cached results')
+    parser.add_argument('--one-file-system', '-x', action='store_true', help='do not descend into other file systems (mount points)')
+    parser.add_argument('--cache', default=None, help='cache database (default: folder_size.sqlite in the bootstrap cache directory)')
+    args = parser.parse_args()
+
+    connection = open_cache(args.cache)
+    failed = False
+    for path in args.paths:
+        if not os.path.isdir(path):
+            print(' Not a folder: {}'.format(path), file=sys.stderr)
+            failed = True
+            continue
+        startedTime = time.time()
+        for total in folder_sizes(path, connection, max(1, args.workers), args.refresh, args.one_file_system):
+            if total['depth'] > args.max_depth:
+                continue
+            if total['depth'] == 0:
+                # Get-FolderSize's properties
+                summary = dict({'Path': total['path'], 'TotalBytes': total['bytes'], 'TotalMBytes': round(total['bytes'] / 1024.0 ** 2, Precision),
+                                'TotalGBytes': round(total['bytes'] / 1024.0 ** 3, Precision), 'DirCount': total['dirs'], 'FileCount': total['files'],
+                                'DirFailed': total['errors'], 'TimeElapsed': round(time.time() - startedTime, Precision),
+                                'StartedTime': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(startedTime)),
+                                'EndedTime': time.strftime('%Y-%m-%dT%H:%M:%S')})
+            if args.ndjson:
+                print(json.dumps(summary if total['depth'] == 0 else total), flush=True)
+            else:
+                print('{:>9} {:>10} {}'.format(format_bytes(total['bytes']), total['files'], total['path']), flush=True)
+        if not args.ndjson:
+            print(' {} files, {} folders{}, in {:.2f} s'.format(summary['FileCount'], summary['DirCount'],
+                                                              ', {} unreadable'.format(summary['DirFailed']) if summary['DirFailed'] else '', summary['TimeElapsed']))
+    connection.close()
+    sys.exit(1 if failed else 0)
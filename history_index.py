@@ -0,0 +1,551 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : history_index.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : Search years of shell history (bash, zsh, PSReadLine and python), through a persistent trigram index, where
+#             Invoke-SelectedHistory.ps1 filters Get-History linearly
+#             history_index.py [--fuzzy] [--limit N] [--source KIND] [--] QUERY   ranked matches, best last (nearest the prompt)
+#             history_index.py update | stats | rebuild
+#             The history files are located from bootstrap's HOME and host OS ($HISTFILE first), and memory-mapped. The
+#             index (in the bootstrap cache directory) records each command line's position in its history file, and a
+#             trigram -> command line ids posting list per segment. Each update indexes only the tail that was appended
+#             since the last indexed offset, into a new segment; segments are merged once there are more than
+#             MaxSegments. A history file that was truncated or replaced is indexed again from the start, and the lines
+#             of the old one are dropped when the segments are next merged.
+#             A query line must contain every trigram of the (lower-cased) query; the matches are then confirmed against
+#             the history text. --fuzzy instead ranks the command lines that share most of the query's trigrams.
+# ===================================== #
+
+import argparse
+import bisect
+import hashlib
+import itertools
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from bootstrap import HOME
+from bootstrap import IsWindows
+from bootstrap import cache_dir
+from bootstrap import write_atomic
+
+IsVerbose = False # True
+
+IndexVersion = 2
+MaxSegments = 8
+DeadShare = 4               # re-index the live history files once over 1/DeadShare of the command lines are of replaced ones
+MaxLineIndexed = 4096       # bytes of a (pasted, very long) command line that are indexed
+ScanLimit = 5000            # most recent confirmed matches considered for ranking
+FuzzyCandidates = 20000     # most recent fuzzy candidates considered for ranking
+WindowIds = 65536          # ids of the rarest trigram intersected at a time, most recent first
+BisectRatio = 64           # postings longer than this many times the candidates are binary searched, not intersected
+HeadBytes = 1024            # leading bytes of a history file, whose digest detects a replaced file
+
+SegmentMagic = b'HISTTRI1'
+SegmentHeader = struct.Struct('=8sQ')       # magic, trigram count
+SegmentEntry = struct.Struct('=3sxQI')      # trigram, postings offset, postings count
+EntryRecord = struct.Struct('=IQI')         # source slot, offset in the history file, length
+
+# -- print_var prints a label and a variable's value, if IsVerbose
+def print_var(label, varname):
+    if IsVerbose:
+        print('< {} = \'{}\' >'.format(label, varname))
+
+# Region Sources
+
+# -- history_sources returns the [(kind, path)] of the history files present for this user
+def history_sources():
+    if IsWindows:
+        dataRoot = os.path.join(os.environ.get('APPDATA', os.path.join(HOME, 'AppData', 'Roaming')), 'Microsoft', 'Windows', 'PowerShell')
+    else:
+        dataRoot = os.path.join(os.environ.get('XDG_DATA_HOME', os.path.join(HOME, '.local', 'share')), 'powershell')
+    candidates = []
+    if os.environ.get('HISTFILE'):
+        candidates.append(('zsh' if 'zsh' in os.path.basename(os.environ['HISTFILE']) else 'bash', os.environ['HISTFILE']))
+    candidates += [('bash', os.path.join(HOME, '.bash_history')),
+                   ('zsh', os.path.join(HOME, '.zsh_history')),
+                   ('psreadline', os.path.join(dataRoot, 'PSReadLine', 'ConsoleHost_history.txt')),
+                   ('python', os.path.join(HOME, '.python_history'))]
+    sources = dict()
+    for kind, path in candidates:
+        if os.path.isfile(path):
+            sources.setdefault(os.path.realpath(path), (kind, path))
+    return list(sources.values())
+
+# -- command_span returns the (start, end) of the command in one history line, or None for a line without one:
+#    bash timestamp lines (#1600000000) are skipped, and zsh extended history lines (: 1600000000:0;command) are stripped;
+#    start is the line's offset in the history file
+def command_span(kind, line, start):
+    if kind == 'bash' and line[0:1] == b'#' and line[1:].strip().isdigit():
+        return None
+    skip = 0
+    if kind == 'zsh' and line[0:2] == b': ':
+        skip = line.find(b';') + 1
+    command = line[skip:]
+    skip += len(command) - len(command.lstrip())
+    if skip >= len(line.rstrip()):
+        return None
+    return start + skip, start + len(line.rstrip())
+
+# -- head_digest returns the digest of a history file's first HeadBytes, as written when it was indexed
+def head_digest(path, size):
+    with open(path, 'rb') as historyFile:
+        return hashlib.sha1(historyFile.read(min(size, HeadBytes))).hexdigest()
+
+#End Region
+
+# Region Segments
+# A segment file: header, then the sorted trigram table (SegmentEntry), then the postings (uint32 command line ids,
+# ascending). The ids of a later segment are all greater than those of an earlier one, so the postings of a trigram,
+# across segments, are the concatenation of its postings per segment.
+
+# -- trigrams returns the distinct (lower-cased) byte trigrams of text
+def trigrams(text):
+    text = text[0:MaxLineIndexed].lower()
+    return set(text[index:index + 3] for index in range(len(text) - 2))
+
+# -- write_segment writes {trigram: array('I') of ids} as a segment file
+def write_segment(path, postings):
+    keys = sorted(postings)
+    offset = SegmentHeader.size + SegmentEntry.size * len(keys)
+    table = bytearray(SegmentHeader.pack(SegmentMagic, len(keys)))
+    for key in keys:
+        table += SegmentEntry.pack(key, offset, len(postings[key]))
+        offset += postings[key].itemsize * len(postings[key])
+    tmpPath = path + '.tmp'
+    with open(tmpPath, 'wb') as segmentFile:
+        segmentFile.write(table)
+        for key in keys:
+            postings[key].tofile(segmentFile)
+    os.replace(tmpPath, path)
+
+# -- Segment gives read access to a memory-mapped segment file
+class Segment(object):
+
+    def __init__(self, path):
+        with open(path, 'rb') as segmentFile:
+            self.map = mmap.mmap(segmentFile.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = SegmentHeader.unpack_from(self.map, 0)
+        if magic != SegmentMagic:
+            raise ValueError('not a history index segment: {}'.format(path))
+        self.ids = memoryview(self.map).cast('I')
+
+    # -- key returns the trigram of table entry number index
+    def key(self, index):
+        start = SegmentHeader.size + SegmentEntry.size * index
+        return self.map[start:start + 3]
+
+    # -- entries yields (trigram, postings offset, postings count) in trigram order
+    def entries(self):
+        for index in range(self.count):
+            yield SegmentEntry.unpack_from(self.map, SegmentHeader.size + SegmentEntry.size * index)
+
+    # -- postings returns the ids (a memoryview of uint32) of the command lines containing trigram
+    def postings(self, trigram):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.key(middle) < trigram:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self.key(low) == trigram:
+            key, offset, count = SegmentEntry.unpack_from(self.map, SegmentHeader.size + SegmentEntry.size * low)
+            return self.ids[offset // 4:offset // 4 + count]
+        return self.ids[0:0]
+
+    def close(self):
+        self.ids.release()
+        self.map.close()
+
+# -- merge_segments merges segment files (in id order) into one, copying each trigram's postings in order
+def merge_segments(segments, path):
+    merged = dict()
+    for number, segment in enumerate(segments):
+        for key, offset, count in segment.entries():
+            merged.setdefault(key, []).append((number, offset, count))
+    keys = sorted(merged)
+    offset = SegmentHeader.size + SegmentEntry.size * len(keys)
+    tmpPath = path + '.tmp'
+    with open(tmpPath, 'wb') as segmentFile:
+        segmentFile.write(SegmentHeader.pack(SegmentMagic, len(keys)))
+        for key in keys:
+            count = sum(part[2] for part in merged[key])
+            segmentFile.write(SegmentEntry.pack(key, offset, count))
+            offset += 4 * count
+        for key in keys:
+            for number, partOffset, count in merged[key]:
+                segmentFile.write(segments[number].map[partOffset:partOffset + 4 * count])
+    os.replace(tmpPath, path)
+
+# -- Postings is one trigram's postings across all segments
+class Postings(object):
+    __slots__ = ('parts', 'size')
+
+    def __init__(self, parts):
+        self.parts = [part for part in parts if len(part)]
+        self.size = sum(len(part) for part in self.parts)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, lineId):
+        for part in self.parts:
+            if part[0] <= lineId <= part[-1]:
+                index = bisect.bisect_left(part, lineId)
+                return index < len(part) and part[index] == lineId
+        return False
+
+    # -- hits returns the members of candidates (a set of ids) that are in these postings: by a set intersection, unless
+    #    the postings are so much longer than candidates that a binary search per candidate is cheaper
+    def hits(self, candidates):
+        if self.size < BisectRatio * len(candidates):
+            return candidates.intersection(itertools.chain.from_iterable(self.parts))
+        return set(lineId for lineId in candidates if lineId in self)
+
+    # -- between returns the postings of the ids from low to high (inclusive)
+    def between(self, low, high):
+        return Postings([part[bisect.bisect_left(part, low):bisect.bisect_right(part, high)] for part in self.parts])
+
+    # -- newest_first yields the ids, most recent (highest) first
+    def newest_first(self):
+        for part in reversed(self.parts):
+            for index in range(len(part) - 1, -1, -1):
+                yield part[index]
+
+    # -- windows yields the ids in slices of up to size ids (each in ascending order), the most recent slice first
+    def windows(self, size):
+        for part in reversed(self.parts):
+            for end in range(len(part), 0, -size):
+                yield part[max(0, end - size):end]
+
+#End Region
+
+# Region Index
+
+# -- new_meta returns the meta.json content of an empty index, whose files are named from serial on
+def new_meta(serial):
+    return dict({'version': IndexVersion, 'slots': [], 'entries': 0, 'segments': [], 'serial': serial, 'entriesFile': 'entries-{:06d}.bin'.format(serial)})
+
+# -- HistoryIndex is the persistent index: meta.json (sources and segments), the entries file (EntryRecord per command
+#    line) and the segment files, in one directory. Files are only removed once meta.json no longer refers to them.
+class HistoryIndex(object):
+
+    def __init__(self, directory=None):
+        self.directory = str(directory or cache_dir().joinpath('history_index'))
+        self.metaPath = os.path.join(self.directory, 'meta.json')
+        try:
+            with open(self.metaPath, encoding='utf-8') as metaFile:
+                self.meta = json.load(metaFile)
+            if self.meta.get('version') != IndexVersion:
+                raise ValueError('index version')
+        except (OSError, ValueError):
+            self.meta = new_meta(0)
+        self.entriesPath = os.path.join(self.directory, self.meta['entriesFile'])
+        self.segments = None
+        self.entries = None
+        self.maps = dict()
+
+    # -- lock serializes updates between concurrent shells (POSIX only)
+    def lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        lockFile = open(os.path.join(self.directory, 'lock'), 'w')
+        try:
+            import fcntl
+            fcntl.flock(lockFile, fcntl.LOCK_EX)
+        except ImportError:
+            pass
+        return lockFile
+
+    def save_meta(self):
+        write_atomic(self.metaPath, json.dumps(self.meta, indent=1))
+
+    # -- update indexes the new tail of every history file; returns the number of command lines added. Once there are more
+    #    than MaxSegments segments, they are merged; unless over 1/DeadShare of the command lines are of history files that
+    #    were replaced or deleted since (bash rewrites its file whenever it trims it to $HISTFILESIZE): then the live files
+    #    are indexed again, into a new entries file and segment, which drops those lines.
+    def update(self, sources=None, rebuild=False):
+        sources = history_sources() if sources is None else sources
+        with self.lock():
+            # another shell may have updated the index while we waited for the lock
+            self.__init__(self.directory)
+            retired = []
+            added = 0
+            if not rebuild:
+                added = self.index_sources(sources)
+                if len(self.meta['segments']) > MaxSegments:
+                    rebuild = self.dead_entries() * DeadShare > self.meta['entries']
+                    if not rebuild:
+                        retired = self.compact()
+            if rebuild:
+                retired = self.meta['segments'] + [self.meta['entriesFile']]
+                self.meta = new_meta(self.meta['serial'] + 1)
+                self.entriesPath = os.path.join(self.directory, self.meta['entriesFile'])
+                added = self.index_sources(sources)
+            self.save_meta()
+            for name in retired:
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+        return added
+
+    # -- dead_entries returns the number of command lines of history files that were replaced or deleted
+    def dead_entries(self):
+        return sum(slot.get('count', 0) for slot in self.meta['slots'] if not slot['alive'])
+
+    # -- index_sources indexes the new tail of each of sources into a new segment, and retires the slots of history files
+    #    that no longer exist; returns the number of command lines added
+    def index_sources(self, sources):
+        slots = dict((slot['path'], number) for number, slot in enumerate(self.meta['slots']) if slot['alive'])
+        postings = dict()
+        added = 0
+        with open(self.entriesPath, 'ab') as entriesFile:
+            # drop records an interrupted update appended, beyond those meta.json accounts for
+            entriesFile.truncate(EntryRecord.size * self.meta['entries'])
+            for kind, path in sources:
+                try:
+                    added += self.index_source(kind, path, slots, postings, entriesFile)
+                except FileNotFoundError:
+                    pass
+        for slot in self.meta['slots']:
+            if slot['alive'] and not os.path.isfile(slot['path']):
+                slot['alive'] = False
+        if postings:
+            self.meta['serial'] += 1
+            name = 'segment-{:06d}.bin'.format(self.meta['serial'])
+            write_segment(os.path.join(self.directory, name), postings)
+            self.meta['segments'].append(name)
+        return added
+
+    # -- index_source appends the command lines of one history file's unindexed tail; a file that is not the one
+    #    indexed before (another inode, shorter, or different leading bytes) gets a new slot, indexed from the start
+    def index_source(self, kind, path, slots, postings, entriesFile):
+        fileStat = os.stat(path)
+        number = slots.get(path)
+        slot = self.meta['slots'][number] if number is not None else None
+        if slot and (slot['ino'] != fileStat.st_ino or fileStat.st_size < slot['offset'] or
+                     (slot['offset'] and head_digest(path, slot['offset']) != slot['head'])):
+            slot['alive'] = False
+            slot = None
+        if slot is None:
+            self.meta['slots'].append(dict({'path': path, 'kind': kind, 'ino': fileStat.st_ino, 'offset': 0, 'head': '', 'alive': True}))
+            number = len(self.meta['slots']) - 1
+            slots[path] = number
+            slot = self.meta['slots'][number]
+        if fileStat.st_size == slot['offset']:
+            return 0
+
+        lineId = self.meta['entries']
+        records = bytearray()
+        with open(path, 'rb') as historyFile:
+            historyMap = mmap.mmap(historyFile.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                # only complete lines: a line still being written is indexed by the next update
+                end = historyMap.rfind(b'\n', slot['offset']) + 1
+                position = slot['offset']
+                while position < end:
+                    lineEnd = historyMap.find(b'\n', position, end)
+                    line = historyMap[position:lineEnd].rstrip(b'\r')
+                    span = command_span(kind, line, position)
+                    if span:
+                        command = historyMap[span[0]:span[1]]
+                        for trigram in trigrams(command):
+                            postings.setdefault(trigram, array('I')).append(lineId)
+                        records += EntryRecord.pack(number, span[0], span[1] - span[0])
+                        lineId += 1
+                    position = lineEnd + 1
+                if end > 0:
+                    slot['head'] = hashlib.sha1(historyMap[0:min(end, HeadBytes)]).hexdigest()
+            finally:
+                historyMap.close()
+        entriesFile.write(records)
+        added = lineId - self.meta['entries']
+        self.meta['entries'] = lineId
+        slot['count'] = slot.get('count', 0) + added
+        slot['offset'] = max(end, slot['offset'])
+        print_var(path, '{} command lines added'.format(added))
+        return added
+
+    # -- compact merges all segments into one; returns the names of the merged segment files, for update to remove
+    def compact(self):
+        segments = [Segment(os.path.join(self.directory, name)) for name in self.meta['segments']]
+        self.meta['serial'] += 1
+        name = 'segment-{:06d}.bin'.format(self.meta['serial'])
+        try:
+            merge_segments(segments, os.path.join(self.directory, name))
+        finally:
+            for segment in segments:
+                segment.close()
+        retired = self.meta['segments']
+        self.meta['segments'] = [name]
+        return retired
+
+    # -- open maps the segments and the entries file, for queries
+    def open(self):
+        self.segments = [Segment(os.path.join(self.directory, name)) for name in self.meta['segments']]
+        if self.meta['entries']:
+            with open(self.entriesPath, 'rb') as entriesFile:
+                self.entries = mmap.mmap(entriesFile.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # -- postings returns one trigram's postings across the segments
+    def postings(self, trigram):
+        return Postings([segment.postings(trigram) for segment in self.segments])
+
+    # -- command returns (source kind, command bytes) for a command line id, or None when its history file was replaced
+    def command(self, lineId):
+        number, offset, length = EntryRecord.unpack_from(self.entries, EntryRecord.size * lineId)
+        slot = self.meta['slots'][number]
+        if not slot['alive']:
+            return None
+        historyMap = self.maps.get(number)
+        if historyMap is None:
+            try:
+                with open(slot['path'], 'rb') as historyFile:
+                    historyMap = mmap.mmap(historyFile.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # deleted (or emptied: an empty file cannot be mapped) since the last update
+                historyMap = False
+            self.maps[number] = historyMap
+        if historyMap is False:
+            return None
+        return slot['kind'], historyMap[offset:offset + length]
+
+#End Region
+
+# Region Search
+
+# -- rank_score orders matches: a prefix match, then a match at a word start, then how often it was run, then recency
+def rank_score(command, needle, count, lineId, lastId):
+    lowered = command.lower()
+    where = lowered.find(needle)
+    score = 0.25 * math.log2(1 + count) + lineId / float(lastId or 1)
+    if where == 0:
+        score += 2.0
+    elif where > 0 and not lowered[where - 1:where].isalnum():
+        score += 1.0
+    return score
+
+# -- candidate_ids yields the ids in all postings (sorted rarest first), most recent first, a window of the rarest
+#    postings at a time; once an intersection removes too few ids to pay for itself (in text checks saved), the rest
+#    of the postings are left to the text check
+def candidate_ids(postings):
+    for window in postings[0].windows(WindowIds):
+        found = set(window)
+        for posting in postings[1:]:
+            posting = posting.between(window[0], window[-1])
+            remaining = len(found)
+            found = posting.hits(found)
+            if not found or (remaining - len(found)) * BisectRatio < len(posting):
+                break
+        for lineId in sorted(found, reverse=True):
+            yield lineId
+
+# -- search_substring returns [(score, count, kind, command)] of the command lines containing query (case-insensitive)
+def search_substring(index, query, kinds=None):
+    needle = query.encode('utf-8').lower()
+    grams = sorted(trigrams(needle))
+    matches = dict()
+    if grams:
+        candidates = candidate_ids(sorted((index.postings(gram) for gram in grams), key=len))
+    else:
+        # a query shorter than a trigram: scan the command lines, newest first
+        candidates = range(index.meta['entries'] - 1, -1, -1)
+    for lineId in candidates:
+        found = index.command(lineId)
+        if found is None or (kinds and found[0] not in kinds) or needle not in found[1].lower():
+            continue
+        match = matches.get(found[1])
+        if match:
+            match[1] += 1
+        else:
+            matches[found[1]] = [lineId, 1, found[0]]
+            if len(matches) >= ScanLimit:
+                break
+    lastId = index.meta['entries'] - 1
+    return [(rank_score(command, needle, count, lineId, lastId), count, kind, command) for command, (lineId, count, kind) in matches.items()]
+
+# -- search_fuzzy returns [(score, count, kind, command)] of the command lines sharing at least half of the query's trigrams;
+#    by the pigeonhole principle, each of them is in at least one of the (trigrams - needed + 1) rarest postings
+def search_fuzzy(index, query, kinds=None, threshold=0.5):
+    needle = query.encode('utf-8').lower()
+    grams = sorted(trigrams(needle))
+    if not grams:
+        return search_substring(index, query, kinds)
+    postings = sorted((index.postings(gram) for gram in grams), key=len)
+    needed = max(1, int(math.ceil(threshold * len(grams))))
+    candidates = set()
+    for posting in postings[0:len(grams) - needed + 1]:
+        for lineId in posting.newest_first():
+            if len(candidates) >= FuzzyCandidates:
+                break
+            candidates.add(lineId)
+    shared = dict.fromkeys(candidates, 0)
+    low, high = min(candidates, default=0), max(candidates, default=0)
+    for posting in postings:
+        for lineId in posting.between(low, high).hits(candidates):
+            shared[lineId] += 1
+    matches = dict()
+    lastId = index.meta['entries'] - 1
+    for lineId in sorted(candidates, reverse=True):
+        if shared[lineId] < needed:
+            continue
+        found = index.command(lineId)
+        if found is None or (kinds and found[0] not in kinds):
+            continue
+        match = matches.get(found[1])
+        if match:
+            match[1] += 1
+        else:
+            matches[found[1]] = [lineId, 1, found[0], shared[lineId]]
+    return [(common / float(len(grams)) * 4.0 + rank_score(command, needle, count, lineId, lastId), count, kind, command)
+            for command, (lineId, count, kind, common) in matches.items()]
+
+#End Region
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Search shell history through a persistent trigram index')
+    parser.add_argument('query', nargs='*', help='text to search for (or: update, stats, rebuild)')
+    parser.add_argument('--fuzzy', '-f', action='store_true', help='rank by shared trigrams, tolerating typos and reordering')
+    parser.add_argument('--limit', '-n', type=int, default=20, help='matches to show (default: %(default)s)')
+    parser.add_argument('--source', '-s', action='append', choices=('bash', 'zsh', 'psreadline', 'python'), help='only search this kind of history')
+    parser.add_argument('--no-update', action='store_true', help='query the index as it is, without indexing new history first')
+    parser.add_argument('--index', default=None, help='index directory (default: history_index in the bootstrap cache directory)')
+    args = parser.parse_args()
+
+    index = HistoryIndex(args.index)
+    command = args.query[0] if len(args.query) == 1 and args.query[0] in ('update', 'stats', 'rebuild') else None
+    started = time.perf_counter()
+    if command in ('update', 'rebuild'):
+        added = index.update(rebuild=command == 'rebuild')
+        print(' {} command lines indexed, {} in total, in {:.2f} s'.format(added, index.meta['entries'], time.perf_counter() - started))
+        sys.exit(0)
+    if command == 'stats':
+        for slot in index.meta['slots']:
+            print(' {:<10} {:>12} bytes  {}{}'.format(slot['kind'], slot['offset'], slot['path'], '' if slot['alive'] else ' (replaced)'))
+        print(' {} command lines ({} of replaced history files), {} segments'.format(index.meta['entries'], index.dead_entries(), len(index.meta['segments'])))
+        sys.exit(0)
+    if not args.query:
+        parser.error('nothing to search for')
+
+    if not args.no_update:
+        index.update()
+    updated = time.perf_counter()
+    index.open()
+    query = ' '.join(args.query)
+    results = (search_fuzzy if args.fuzzy else search_substring)(index, query, args.source)
+    results.sort(key=lambda result: result[0])
+    # best match last, nearest the prompt
+    for score, count, kind, text in results[-max(1, args.limit):]:
+        print(' {:>4}x {:<10} {}'.format(count, kind, text.decode('utf-8', 'replace')))
+    print(' {} matches; update {:.1f} ms, search {:.1f} ms'.format(len(results), 1000.0 * (updated - started), 1000.0 * (time.perf_counter() - updated)),
+          file=sys.stderr)
+    sys.exit(0 if results else 1)
@@ -0,0 +1,322 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : hostfactsd.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : Optional long-lived service for bootstrap's host facts, for sessions that start many shells or status-line
+#             scripts: the facts are loaded once, re-checked for changes every --interval seconds, and answered over a
+#             Unix domain socket (asyncio, so any number of clients are served concurrently).
+#             hostfactsd.py serve [--detach] [--interval S]   run the service (--detach: in the background, once it answers)
+#             hostfactsd.py get NAME | all | sh | ping | refresh | stop   query a running service
+#             hostfactsd.py bench [--repeat N]                time query round trips, over one connection
+#             Protocol: one request line per query, any number per connection; each reply is one line, 'OK <value>'
+#             or 'ERR <message>'.
+#               GET NAME   a fact (COMPUTERNAME, hostOS, hostOSCaption, IsWindows, IsLinux, IsMacOS, HOME, py_version)
+#               ALL        all facts, as one line of JSON
+#               SH         all facts as one line of sh exports, for: eval "$(hostfactsd.py sh)"
+#               PING       'OK <generation>'; the generation counts the changes seen since the service started
+#               REFRESH    re-derive the facts now; replies with the new generation
+#               STOP       stop the service
+#             Without python, a shell can query it with: printf 'GET hostOS\n' | nc -U -q0 "$socket"
+# ===================================== #
+
+# asyncio is imported by serve only, so a client starts as fast as python allows
+import errno
+import json
+import os
+import socket
+import stat
+import sys
+import time
+
+import bootstrap
+
+IsVerbose = False # True
+
+CheckInterval = 5.0
+
+# -- print_var prints a label and a variable's value, if IsVerbose
+def print_var(label, varname):
+    if IsVerbose:
+        print('< {} = \'{}\' >'.format(label, varname))
+
+# -- socket_path returns the service socket: $BOOTSTRAP_FACTSD_SOCKET, else in $XDG_RUNTIME_DIR, else in bootstrap's cache directory
+def socket_path():
+    if 'BOOTSTRAP_FACTSD_SOCKET' in os.environ:
+        return os.environ['BOOTSTRAP_FACTSD_SOCKET']
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(os.environ['XDG_RUNTIME_DIR'], 'bootstrap-hostfactsd.sock')
+    return str(bootstrap.cache_dir().joinpath('hostfactsd.sock'))
+
+# Region Client
+
+# -- FactsClient keeps one connection to the service open, for any number of queries
+class FactsClient(object):
+
+    def __init__(self, path=None, timeout=2.0):
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.settimeout(timeout)
+        try:
+            self.connection.connect(path or socket_path())
+        except OSError:
+            self.connection.close()
+            raise
+        self.pending = b''
+
+    # -- query sends one request line, and returns the value of an OK reply; an ERR reply raises LookupError
+    def query(self, request):
+        self.connection.sendall(request.encode('utf-8') + b'\n')
+        while b'\n' not in self.pending:
+            received = self.connection.recv(65536)
+            if not received:
+                raise ConnectionError('hostfactsd closed the connection')
+            self.pending += received
+        line, self.pending = self.pending.split(b'\n', 1)
+        status, _, value = line.decode('utf-8').partition(' ')
+        if status != 'OK':
+            raise LookupError(value)
+        return value
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+# -- query sends one request to the service, over a new connection
+def query(request, path=None):
+    with FactsClient(path) as client:
+        return client.query(request)
+
+# -- daemon_facts returns all facts from a running service, or None when none is answering
+def daemon_facts(path=None):
+    try:
+        return json.loads(query('ALL', path))
+    except (OSError, LookupError, ValueError):
+        return None
+
+#End Region
+
+# Region Service
+
+# -- FactsService holds the current facts, and answers the protocol requests
+class FactsService(object):
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.generation = 0
+        self.facts = bootstrap.get_host_facts()
+        self.stamp = self.current_stamp()
+        self.stopped = None
+
+    # -- current_stamp combines what invalidates the facts: the FactSources mtimes, and the host name, interpreter and HOME
+    def current_stamp(self):
+        return (bootstrap.facts_key(), bootstrap.facts_stamp())
+
+    # -- refresh re-derives the facts (via bootstrap's cache, which probes again when stale); True when they changed
+    def refresh(self, force=False):
+        facts = bootstrap.get_host_facts(refresh=force)
+        self.stamp = self.current_stamp()
+        if facts == self.facts:
+            return False
+        self.facts = facts
+        self.generation += 1
+        return True
+
+    # -- refresh_async runs refresh in a worker thread, as probing the platform would hold up every other client
+    async def refresh_async(self, force=False):
+        import asyncio
+        changed = await asyncio.get_running_loop().run_in_executor(None, self.refresh, force)
+        if changed:
+            print_log('facts changed (generation {})'.format(self.generation))
+        return changed
+
+    # -- watch re-checks the stamp every interval seconds, and refreshes only when it changed
+    async def watch(self):
+        import asyncio
+        while True:
+            await asyncio.sleep(self.interval)
+            stamp = self.current_stamp()
+            if stamp != self.stamp:
+                print_var('stamp changed', stamp)
+                await self.refresh_async()
+
+    def answer(self, request):
+        command, _, argument = request.strip().partition(' ')
+        command = command.upper()
+        if command == 'GET':
+            if argument not in self.facts:
+                return 'ERR unknown fact: {}'.format(argument)
+            return 'OK {}'.format(self.facts[argument])
+        if command == 'ALL':
+            return 'OK ' + json.dumps(self.facts, sort_keys=True)
+        if command == 'SH':
+            return 'OK ' + '; '.join('export {}={}'.format(name, bootstrap.sh_quote(self.facts[name])) for name in bootstrap.CompiledFacts)
+        if command == 'PING':
+            return 'OK {}'.format(self.generation)
+        if command == 'STOP':
+            self.stopped.set()
+            return 'OK stopping'
+        return 'ERR unknown request: {}'.format(command)
+
+    # -- handle serves one connection, until the client closes it; REFRESH is answered once the refresh is done
+    async def handle(self, reader, writer):
+        import asyncio
+        try:
+            while not self.stopped.is_set():
+                line = await reader.readline()
+                if not line:
+                    break
+                request = line.decode('utf-8', 'replace')
+                if request.strip().upper() == 'REFRESH':
+                    await self.refresh_async(force=True)
+                    reply = 'OK {}'.format(self.generation)
+                else:
+                    reply = self.answer(request)
+                writer.write((reply + '\n').encode('utf-8'))
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+# -- print_log prints a time-stamped service message
+def print_log(message):
+    print('{} hostfactsd[{}]: {}'.format(time.strftime('%Y-%m-%d %H:%M:%S'), os.getpid(), message), flush=True)
+
+# -- claim_socket removes a socket file left behind by a service that is gone (nothing listens: the connection is refused);
+#    raises FileExistsError when anything else answers, the socket cannot be checked (e.g. a busy service timed out), or
+#    path is not a socket at all (a mistyped --socket must not cost a file)
+def claim_socket(path):
+    try:
+        pathStat = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(pathStat.st_mode):
+        raise FileExistsError('{} exists and is not a socket'.format(path))
+    try:
+        reply = query('PING', path)
+    except OSError as err:
+        if err.errno not in (errno.ECONNREFUSED, errno.ENOENT):
+            raise FileExistsError('{} is in use, or cannot be checked: {}'.format(path, err))
+        print_var('stale socket', path)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        return
+    except LookupError as err:
+        reply = err
+    raise FileExistsError('hostfactsd is already running on {} (PING: {})'.format(path, reply))
+
+# -- serve runs the service on path, until STOP, SIGTERM or SIGINT; SIGHUP refreshes the facts
+async def serve(path, interval):
+    import asyncio
+    import signal
+    loop = asyncio.get_running_loop()
+    service = FactsService(interval)
+    service.stopped = asyncio.Event()
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    claim_socket(path)
+    # only this user may connect: the socket is created 0600
+    umask = os.umask(0o177)
+    try:
+        server = await asyncio.start_unix_server(service.handle, path=path)
+    finally:
+        os.umask(umask)
+    for signalNumber in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signalNumber, service.stopped.set)
+    loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(service.refresh_async(force=True)))
+
+    print_log('serving {} facts on {}'.format(len(service.facts), path))
+    watcher = asyncio.ensure_future(service.watch())
+    try:
+        async with server:
+            await service.stopped.wait()
+    finally:
+        watcher.cancel()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        print_log('stopped')
+
+# -- detach starts the service in a new session, and waits (up to timeout seconds) until it answers
+def detach(path, interval, timeout=10.0):
+    import subprocess
+    with open(os.devnull, 'wb') as devnull:
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), 'serve', '--interval', str(interval)], stdin=devnull, stdout=devnull,
+                         stderr=devnull, start_new_session=True, env=dict(os.environ, BOOTSTRAP_FACTSD_SOCKET=path))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return query('PING', path)
+        except (OSError, LookupError):
+            time.sleep(0.05)
+    raise TimeoutError('hostfactsd did not answer on {} within {} seconds'.format(path, timeout))
+
+#End Region
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve or query bootstrap's host facts over a Unix domain socket")
+    parser.add_argument('--socket', default=None, help='socket path (default: {})'.format(socket_path()))
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    serveParser = commands.add_parser('serve', help='run the service')
+    serveParser.add_argument('--interval', type=float, default=CheckInterval, help='seconds between checks for changed facts (default: %(default)s)')
+    serveParser.add_argument('--detach', action='store_true', help='run in the background, and return once it answers')
+    getParser = commands.add_parser('get', help='print one fact')
+    getParser.add_argument('name', help='fact name')
+    for name, description in (('all', 'print all facts, as JSON'), ('sh', 'print all facts as sh exports'), ('ping', 'print the facts generation'),
+                              ('refresh', 're-derive the facts now'), ('stop', 'stop the service')):
+        commands.add_parser(name, help=description)
+    benchParser = commands.add_parser('bench', help='time query round trips, over one connection')
+    benchParser.add_argument('--repeat', type=int, default=10000, help='queries to time (default: %(default)s)')
+    args = parser.parse_args()
+    path = args.socket or socket_path()
+
+    if not hasattr(socket, 'AF_UNIX'):
+        print(' hostfactsd needs Unix domain sockets, which this platform does not support', file=sys.stderr)
+        sys.exit(2)
+
+    if args.command == 'serve':
+        try:
+            if args.detach:
+                print(' hostfactsd answering on {} (generation {})'.format(path, detach(path, args.interval)))
+            else:
+                import asyncio
+                asyncio.run(serve(path, args.interval))
+        except (FileExistsError, TimeoutError) as err:
+            print(' {}'.format(err), file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+
+    try:
+        if args.command == 'bench':
+            import statistics
+            timings = []
+            with FactsClient(path) as client:
+                for index in range(max(1, args.repeat)):
+                    started = time.perf_counter()
+                    client.query('GET hostOS')
+                    timings.append((time.perf_counter() - started) * 1e6)
+            timings.sort()
+            print(' {} round trips: median {:.1f} us, p99 {:.1f} us, max {:.1f} us'.format(len(timings), statistics.median(timings),
+                                                                                          timings[int(len(timings) * 0.99) - 1], timings[-1]))
+        elif args.command == 'get':
+            print(query('GET ' + args.name, path))
+        else:
+            print(query((args.command or 'all').upper(), path))
+    except LookupError as err:
+        print(' hostfactsd: {}'.format(err), file=sys.stderr)
+        sys.exit(1)
+    except OSError as err:
+        print(' hostfactsd is not answering on {}: {}'.format(path, err), file=sys.stderr)
+        sys.exit(2)
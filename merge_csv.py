@@ -0,0 +1,276 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : merge_csv.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : Merge CSV files into one, de-duplicated on key columns, in constant memory (as Merge-ProcessedCSV.ps1 does,
+#             in memory, with Import-Csv and Sort-Object -Unique)
+#             merge_csv.py INPUT [INPUT ...] --key COLUMN [--key COLUMN] [-o OUTPUT] [--memory-mb N] [--workers N]
+#             Inputs (files, or glob patterns) are read oldest first, as ordered by their modification time. The output
+#             has the union of the input headers, in order of first appearance; a column an input lacks is left empty.
+#             With --key, the output is sorted on the key columns, with one row per key: the first one read (--keep first,
+#             as Sort-Object -Unique), or the last one (--keep last). Without --key, the rows are concatenated.
+#             Each input is parsed and sorted by its own worker process, within its share of --memory-mb; the sorted runs
+#             that exceed it are spilled to temp files, and all runs are combined with a k-way merge. Rows read and written,
+#             and the throughput in rows/sec, are reported on stderr. An input that is not valid CSV, or has a row with more
+#             fields than its header, stops the merge (exit 1), naming the file and line.
+# ===================================== #
+
+import argparse
+import concurrent.futures
+import csv
+import glob
+import heapq
+import itertools
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+
+IsVerbose = False # True
+
+MaxFanIn = 64           # runs merged at once; more runs are first merged in passes, so open files stay bounded
+RowOverhead = 200       # estimated bytes per parsed row (its tuples and list), and per value (a str), beyond the text
+ValueOverhead = 60
+BatchRows = 1024        # rows per pickled batch, in a run file
+
+# -- print_var prints a label and a variable's value, if IsVerbose
+def print_var(label, varname):
+    if IsVerbose:
+        print('< {} = \'{}\' >'.format(label, varname), file=sys.stderr)
+
+# Region Inputs
+
+# -- InputError reports an input that cannot be merged: its file and line, and the problem
+class InputError(ValueError):
+    pass
+
+# -- expand_inputs expands glob patterns (Windows shells leave them to the program), and orders the files oldest first
+def expand_inputs(patterns):
+    paths = []
+    for pattern in patterns:
+        matches = glob.glob(pattern) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            raise FileNotFoundError('no input matches {}'.format(pattern))
+        paths.extend(matches)
+    return sorted(dict.fromkeys(paths), key=lambda path: os.stat(path).st_mtime)
+
+# -- read_header returns the column names of a CSV file (its first row)
+def read_header(path):
+    with open(path, newline='', encoding='utf-8-sig') as csvFile:
+        reader = csv.reader(csvFile)
+        try:
+            return next(reader, [])
+        except csv.Error as err:
+            raise InputError('{}, line {}: {}'.format(path, reader.line_num, err))
+
+# -- read_rows yields (row number, values) for the rows of one input, with values laid out as the columns of header (the
+#    union header); a short row is padded with empty values, but a row with more fields than the input's own header, or
+#    text that is not valid CSV, raises InputError rather than losing values
+def read_rows(path, header):
+    with open(path, newline='', encoding='utf-8-sig') as csvFile:
+        reader = csv.reader(csvFile)
+        try:
+            positions = [header.index(name) for name in next(reader, [])]
+            for rowNumber, row in enumerate(reader):
+                if len(row) > len(positions):
+                    raise InputError('{}, line {}: {} fields, but the header has {}'.format(path, reader.line_num, len(row), len(positions)))
+                values = [''] * len(header)
+                for position, value in zip(positions, row):
+                    values[position] = value
+                yield rowNumber, values
+        except csv.Error as err:
+            raise InputError('{}, line {}: {}'.format(path, reader.line_num, err))
+
+# -- union_header returns the column names of all inputs, in order of first appearance
+def union_header(paths):
+    return list(dict.fromkeys(name for path in paths for name in read_header(path)))
+
+#End Region
+
+# Region Sorted runs
+# A run is a sequence of (sort key, input number, row number, values) tuples, sorted; it is either held in memory (a
+# list), or spilled to a temp file, as pickled batches of rows. The input and row numbers keep equal keys in read order.
+
+# -- write_run spills a sorted list of rows to a new temp file in tempDir, and returns its path
+def write_run(rows, tempDir):
+    fd, runPath = tempfile.mkstemp(dir=tempDir, prefix='run.', suffix='.pickle')
+    with os.fdopen(fd, 'wb') as runFile:
+        for start in range(0, len(rows), BatchRows):
+            pickle.dump(rows[start:start + BatchRows], runFile, protocol=pickle.HIGHEST_PROTOCOL)
+    return runPath
+
+# -- read_run yields the rows of a run file, one batch in memory at a time
+def read_run(runPath):
+    with open(runPath, 'rb') as runFile:
+        while True:
+            try:
+                batch = pickle.load(runFile)
+            except EOFError:
+                return
+            for row in batch:
+                yield row
+
+# -- sort_input parses one input into sorted runs (runs on the key columns of the union header), within budget bytes of
+#    rows: returns (rows read, [sorted row list, or run file path], bytes of the run returned in memory); a run is only
+#    returned in memory when the whole input fits the budget, and spill is False (pickling a whole run back from a worker
+#    process costs more than spilling it in batches)
+def sort_input(path, number, header, keys, ignoreCase, budget, tempDir, spill=True):
+    keyPositions = [header.index(key) for key in keys]
+    runs = []
+    chunk = []
+    chunkBytes = 0
+    rowCount = 0
+    for rowNumber, values in read_rows(path, header):
+        key = tuple(values[position].casefold() if ignoreCase else values[position] for position in keyPositions)
+        chunk.append((key, number, rowNumber, values))
+        chunkBytes += sum(map(len, values)) + RowOverhead + ValueOverhead * len(values)
+        rowCount += 1
+        if chunkBytes > budget:
+            chunk.sort()
+            runs.append(write_run(chunk, tempDir))
+            chunk = []
+            chunkBytes = 0
+    chunk.sort()
+    if chunk and (runs or spill):
+        runs.append(write_run(chunk, tempDir))
+    elif chunk:
+        runs.append(chunk)
+        return rowCount, runs, chunkBytes
+    return rowCount, runs, 0
+
+# -- open_run returns an iterator over a run (in memory, or spilled)
+def open_run(run):
+    return iter(run) if isinstance(run, list) else read_run(run)
+
+# -- reduce_runs merges runs, MaxFanIn at a time, into new spilled runs, until at most MaxFanIn are left
+def reduce_runs(runs, tempDir):
+    while len(runs) > MaxFanIn:
+        merged = []
+        for start in range(0, len(runs), MaxFanIn):
+            group = runs[start:start + MaxFanIn]
+            fd, runPath = tempfile.mkstemp(dir=tempDir, prefix='run.', suffix='.pickle')
+            with os.fdopen(fd, 'wb') as runFile:
+                rows = heapq.merge(*[open_run(run) for run in group])
+                while True:
+                    batch = list(itertools.islice(rows, BatchRows))
+                    if not batch:
+                        break
+                    pickle.dump(batch, runFile, protocol=pickle.HIGHEST_PROTOCOL)
+            for run in group:
+                if not isinstance(run, list):
+                    os.unlink(run)
+            merged.append(runPath)
+        runs = merged
+    return runs
+
+# -- merge_runs yields the values of the rows of all runs in key order, one row per key (the first or last read)
+def merge_runs(runs, keep):
+    rows = heapq.merge(*[open_run(run) for run in runs])
+    for key, group in itertools.groupby(rows, key=lambda row: row[0]):
+        if keep == 'first':
+            yield next(group)[3]
+        else:
+            for row in group:
+                pass
+            yield row[3]
+
+#End Region
+
+# -- concatenate_rows yields the values of every row of every input, in input order (no --key)
+def concatenate_rows(paths, header):
+    for path in paths:
+        for rowNumber, values in read_rows(path, header):
+            yield values
+
+# -- merge_csv merges the inputs into output (a text file object); returns a statistics dictionary
+def merge_csv(paths, output, keys=(), keep='first', ignoreCase=False, memoryBytes=256 * 1024 * 1024, workers=None, tempDir=None):
+    started = time.perf_counter()
+    header = union_header(paths)
+    missing = [key for key in keys if key not in header]
+    if missing:
+        raise ValueError('key column not found in any input: {}'.format(', '.join(missing)))
+    stats = dict({'inputs': len(paths), 'columns': len(header), 'read': 0, 'written': 0, 'runs': 0, 'spilled': 0})
+
+    writer = csv.writer(output, quoting=csv.QUOTE_ALL)
+    writer.writerow(header)
+    if not keys:
+        for values in concatenate_rows(paths, header):
+            writer.writerow(values)
+            stats['written'] += 1
+        stats['read'] = stats['written']
+    else:
+        workers = workers or min(len(paths), os.cpu_count() or 1)
+        workDir = tempfile.mkdtemp(prefix='merge_csv.', dir=tempDir)
+        try:
+            # each worker gets an equal share of the budget, and the parent keeps at most one batch per run
+            budget = max(1024 * 1024, memoryBytes // (workers + 1))
+            runs = []
+            heldBytes = 0
+            if workers > 1:
+                pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+                results = [pool.submit(sort_input, path, number, header, list(keys), ignoreCase, budget, workDir) for number, path in enumerate(paths)]
+            else:
+                # one worker: sort in this process, and keep the inputs that fit the budget in memory
+                pool = None
+                results = (sort_input(path, number, header, list(keys), ignoreCase, budget, workDir, spill=False) for number, path in enumerate(paths))
+            try:
+                for path, result in zip(paths, results):
+                    rowCount, fileRuns, runBytes = result.result() if pool else result
+                    print_var(path, '{} rows, {} runs'.format(rowCount, len(fileRuns)))
+                    stats['read'] += rowCount
+                    # many small inputs would add up: spill their runs too, once those held here reach the budget
+                    if runBytes and heldBytes + runBytes > budget:
+                        fileRuns = [write_run(fileRuns[0], workDir)]
+                    else:
+                        heldBytes += runBytes
+                    runs.extend(fileRuns)
+            finally:
+                if pool:
+                    pool.shutdown()
+            stats['runs'] = len(runs)
+            stats['spilled'] = sum(1 for run in runs if not isinstance(run, list))
+            for values in merge_runs(reduce_runs(runs, workDir), keep):
+                writer.writerow(values)
+                stats['written'] += 1
+        finally:
+            shutil.rmtree(workDir, ignore_errors=True)
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Merge CSV files, de-duplicated on key columns, in constant memory')
+    parser.add_argument('inputs', nargs='+', metavar='INPUT', help='CSV file, or glob pattern')
+    parser.add_argument('--key', '-k', action='append', default=[], metavar='COLUMN', help='key column (repeat for a compound key)')
+    parser.add_argument('--keep', choices=('first', 'last'), default='first', help='of rows with the same key, keep the first read (default) or the last')
+    parser.add_argument('--ignore-case', '-i', action='store_true', help='compare keys case-insensitively (as Sort-Object does)')
+    parser.add_argument('--output', '-o', default='-', help='output file (default: stdout)')
+    parser.add_argument('--memory-mb', type=int, default=256, help='memory budget for parsed rows, in MB (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=None, help='input files parsed at once (default: one per CPU)')
+    parser.add_argument('--temp-dir', default=None, help='folder for the spilled runs (default: the system temp folder)')
+    args = parser.parse_args()
+
+    try:
+        paths = expand_inputs(args.inputs)
+    except (FileNotFoundError, OSError) as err:
+        parser.error(str(err))
+
+    outputFile = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    try:
+        stats = merge_csv(paths, outputFile, args.key, args.keep, args.ignore_case, args.memory_mb * 1024 * 1024, args.workers, args.temp_dir)
+    except (InputError, OSError) as err:
+        print(' {}'.format(err), file=sys.stderr)
+        sys.exit(1)
+    except ValueError as err:
+        parser.error(str(err))
+    finally:
+        if outputFile is not sys.stdout:
+            outputFile.close()
+
+    print(' {} inputs, {} columns: {} rows read, {} written ({} duplicates), {} runs ({} spilled), in {:.2f} s, {:.0f} rows/sec'.format(
+        stats['inputs'], stats['columns'], stats['read'], stats['written'], stats['read'] - stats['written'], stats['runs'], stats['spilled'],
+        stats['seconds'], stats['read'] / stats['seconds'] if stats['seconds'] else 0.0), file=sys.stderr)
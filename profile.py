@@ -4,8 +4,9 @@
 # LANGUAGE  : Python
 # VERSION   : 3
 # AUTHOR    : Bryan Dady
-# UPDATED   : 11/1/2019 - Convert from PowerShell Core
-# INTRO     : python .profile script
+# UPDATED   : 10/18/2026 - Add the prompt step, installing the segment-cached prompt (prompt.py) as sys.ps1
+# INTRO     : python .profile script; run it directly, or set it as $PYTHONSTARTUP for interactive sessions
+#             profile.py [--report] [--workers N] [--skip-deferred]
 # Created by New-Profile function of ProfilePal module
 # ===================================== #
 
@@ -88,140 +89,326 @@ IsVerbose = False
     #End Region
 
 # Region python header : import
+import time
+ProfileStart = time.perf_counter()
+
 import sys
 import os
 import argparse
+import concurrent.futures
+import threading
 
-# example: http://www.effbot.org/librarybook/sys/sys-argv-example-1.py
-print("script name (path) is", sys.argv[0])
-
-if len(sys.argv) > 1:
-    print("there are", len(sys.argv)-1, "arguments:")
-    for arg in sys.argv[1:]:
-        print(arg)
-else:
-    print("there are no arguments!")
+# Under $PYTHONSTARTUP, this file runs in the interactive __main__ namespace, with an empty argv[0], and from any current
+# directory: its sibling modules are only importable once its own folder is on sys.path
+Interactive = not sys.argv[0]
+ScriptRoot = os.path.dirname(os.path.abspath(__file__ if '__file__' in globals() else sys.argv[0]))
+if ScriptRoot not in sys.path:
+    sys.path.insert(0, ScriptRoot)
 
-print('')
-print(' # Loading python profile')
-print('')
+import bootstrap
+from startup_trace import span
 
-# capture starting path so we can go back after other things below might move around
-#$startingPath = $PWD.Path
-
-if IsVerbose:
-    print('It''s VERBOSE!!')
-else:
-    print('NOT verbose, but hey -- no errors either :)')
+ProfileImported = time.perf_counter()
 
-exit()
-
-""" print('Defining custom prompt')
-def my_function():
+#End Region
 
-    return "[{0} @ {1}]`n{2}{3}{4}{5}" -f $Env:COMPUTERNAME, $PWD.Path, $AdminPrompt, $PSCPrompt, $DebugPrompt, $PromptLevel
-}
-if ($IsVerbose) {print(''})
+# Region Steps
+# Each step of the profile is declared, with the @step decorator, with the steps it must run after. run_steps starts
+# every step as soon as the steps it depends on are done, so independent steps run concurrently in a thread pool.
+# Steps marked deferred are not needed at the prompt (they warm caches for later commands), so they only start once
+# the prompt is ready: in the background for an interactive session, or after the banner when run directly.
+# A step receives the results of all completed steps ({name: result}), and its own return value is added to them.
+# When a step fails, the steps that depend on it are skipped; the rest of the profile still loads.
+
+# -- Step holds one declared step, and the timing and outcome of its last run
+class Step(object):
+    __slots__ = ('name', 'function', 'after', 'deferred', 'state', 'queued', 'begin', 'end', 'error')
+
+    def __init__(self, name, function, after, deferred):
+        self.name = name
+        self.function = function
+        self.after = tuple(after)
+        self.deferred = deferred
+        self.state = 'pending'
+        self.queued = None
+        self.begin = None
+        self.end = None
+        self.error = None
+
+ProfileSteps = dict()
+
+# -- step registers the decorated function as a profile step
+def step(name, after=(), deferred=False):
+    def register(function):
+        ProfileSteps[name] = Step(name, function, after, deferred)
+        return function
+    return register
+
+# -- check_steps raises ValueError for an unknown dependency, a cycle, or an essential step that depends on a deferred one
+def check_steps(steps):
+    for current in steps.values():
+        for name in current.after:
+            if name not in steps:
+                raise ValueError('step {!r} runs after unknown step {!r}'.format(current.name, name))
+            if steps[name].deferred and not current.deferred:
+                raise ValueError('step {!r} runs after deferred step {!r}'.format(current.name, name))
+    ordered = set()
+    while len(ordered) < len(steps):
+        ready = [name for name, current in steps.items() if name not in ordered and ordered.issuperset(current.after)]
+        if not ready:
+            raise ValueError('steps {} depend on each other'.format(', '.join(sorted(set(steps) - ordered))))
+        ordered.update(ready)
+
+# -- run_step runs one step, recording when it began and ended, and whether it failed
+def run_step(current, results):
+    with span('profile: ' + current.name):
+        current.begin = time.perf_counter()
+        try:
+            return current.function(results)
+        finally:
+            current.end = time.perf_counter()
+
+# -- run_inline runs a function in the calling thread, and returns its outcome as a done Future, as pool.submit would
+def run_inline(function, *args):
+    future = concurrent.futures.Future()
+    try:
+        future.set_result(function(*args))
+    except Exception as err:
+        future.set_exception(err)
+    return future
+
+# -- run_steps runs the given steps, each as soon as the steps it runs after are done, with up to workers at a time;
+#    inline runs them one at a time in the calling thread instead, for a daemon thread: the worker threads of a pool
+#    are not daemons, and the interpreter would wait for them at exit
+def run_steps(steps, results, workers, inline=False):
+    pending = dict((current.name, current) for current in steps)
+    running = dict()
+    pool = None if inline else concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='profile')
+    submit = run_inline if inline else pool.submit
+    try:
+        while pending or running:
+            changed = True
+            while changed:
+                changed = False
+                for current in list(pending.values()):
+                    states = [ProfileSteps[name].state for name in current.after]
+                    if 'failed' in states or 'skipped' in states:
+                        current.state = 'skipped'
+                        current.error = 'after {}'.format(', '.join(name for name in current.after if ProfileSteps[name].state != 'done'))
+                    elif all(state == 'done' for state in states):
+                        current.state = 'running'
+                        current.queued = time.perf_counter()
+                        running[submit(run_step, current, dict(results))] = current
+                    else:
+                        continue
+                    del pending[current.name]
+                    changed = True
+            if not running:
+                break
+            done, notDone = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                current = running.pop(future)
+                try:
+                    results[current.name] = future.result()
+                    current.state = 'done'
+                except Exception as err:
+                    current.state = 'failed'
+                    current.error = '{}: {}'.format(type(err).__name__, err)
+    finally:
+        if pool:
+            pool.shutdown()
+    return results
+
+# -- critical_path returns the chain of steps that bounded the finish of the given steps: the step that ended last,
+#    preceded by whichever of its dependencies ended last, and so on
+def critical_path(steps):
+    finished = [current for current in steps if current.end is not None]
+    if not finished:
+        return []
+    path = [max(finished, key=lambda current: current.end)]
+    while True:
+        before = [ProfileSteps[name] for name in path[-1].after if ProfileSteps[name].end is not None]
+        if not before:
+            break
+        path.append(max(before, key=lambda current: current.end))
+    path.reverse()
+    return path
+
+# -- format_report renders every step's timing (in ms from the start of the profile), marking the critical path (*),
+#    and the time to prompt; wait is the time a ready step was queued for a free worker
+def format_report(steps, readyTime):
+    essential = [current for current in steps if not current.deferred]
+    path = critical_path(essential)
+    lines = [' {:1} {:<20} {:<9} {:>9} {:>9} {:>9}  {}'.format('', 'step', 'kind', 'start ms', 'ms', 'wait ms', 'state')]
+    for current in sorted(steps, key=lambda current: (current.begin is None, current.begin or 0.0)):
+        if current.begin is None:
+            lines.append(' {:1} {:<20} {:<9} {:>9} {:>9} {:>9}  {}'.format('', current.name, 'deferred' if current.deferred else 'essential', '-', '-', '-',
+                                                                       current.state + (' ({})'.format(current.error) if current.error else '')))
+            continue
+        lines.append(' {:1} {:<20} {:<9} {:>9.1f} {:>9.1f} {:>9.1f}  {}'.format('*' if current in path else '', current.name,
+                                                                          'deferred' if current.deferred else 'essential',
+                                                                          1000.0 * (current.begin - ProfileStart), 1000.0 * (current.end - current.begin),
+                                                                          1000.0 * (current.begin - current.queued),
+                                                                          current.state + (' ({})'.format(current.error) if current.error else '')))
+    lines.append(' imports: {:.1f} ms; time to prompt: {:.1f} ms; critical path: {}'.format(1000.0 * (ProfileImported - ProfileStart), 1000.0 * (readyTime - ProfileStart),
+                                                                                       ' > '.join(current.name for current in path) or '-'))
+    return lines
 
-#Create conditional functions for calling back to, if we determine (later) that our python, zsh, iterm, vscode or any other toolchain essentials are not (yet) available
-# function install-xcode # xcode-select —-install
-# function install-homebrew # /usr/bin/ruby -e "$(curl -fsSL https://raw.githubusercontent.com/Homebrew/install/master/install)"
-# -- perhaps conditionally add brew bin-root to PATH # append to .zshrc ? or ~/.profile: export PATH="/usr/local/bin:$PATH"
-# function install-python3 # Install Python 3 and pip3 (from Homebrew) # $ brew install python # https://docs.python-guide.org/starting/install3/osx/#doing-it-right
-# function install-aws # pip3 install awscli2 
-# then to use aws cli, we have to configure permissions, such as follows (or via `aws2 configure`)
-  # ! instead of storing AWS access keys / configurations in Env variables, use the aws-vault utility
+#End Region
 
-# function install-golang # TBD
+# Region Profile steps
+
+# -- host facts, preferring those exported by a fresh compiled snapshot (sourced by the shell), over loading them via bootstrap
+@step('host facts')
+def load_host_facts(results):
+    facts = bootstrap.compiled_facts()
+    if facts:
+        return dict({'facts': facts, 'source': os.environ['BOOTSTRAP_FACTS']})
+    return dict({'facts': bootstrap.get_fact('HostFacts'), 'source': 'bootstrap.py'})
+
+# -- sub-profile: run the OS specific profile script (profile-Linux.py, profile-macOS.py or profile-Windows.py), from
+#    the same folder as this script, into the profile namespace, when there is one. It runs after the steps that write
+#    the namespace (aliases) or read the current directory (console title), which it may change
+@step('sub-profile', after=['host facts', 'aliases', 'console title'])
+def load_sub_profile(results):
+    facts = results['host facts']['facts']
+    hostName = 'Windows' if facts['IsWindows'] else 'macOS' if facts['IsMacOS'] else 'Linux'
+    subProfile = os.path.join(ScriptRoot, 'profile-{}.py'.format(hostName))
+    if not os.path.isfile(subProfile):
+        return None
+    with open(subProfile, encoding='utf-8') as subProfileFile:
+        code = compile(subProfileFile.read(), subProfile, 'exec')
+    exec(code, globals())
+    return subProfile
+
+# -- console title: '[python X.Y] COMPUTERNAME: starting path', as Set-ConsoleTitle did, for the terminal window or tab
+@step('console title', after=['host facts'])
+def set_console_title(results):
+    facts = results['host facts']['facts']
+    title = '[python {}] {}: {}'.format('.'.join(facts['py_version'].split('.')[0:2]), facts['COMPUTERNAME'], os.getcwd())
+    if facts['IsWindows']:
+        import ctypes
+        ctypes.windll.kernel32.SetConsoleTitleW(title)
+    elif sys.stdout.isatty():
+        sys.stdout.write('\033]0;{}\007'.format(title))
+        sys.stdout.flush()
+    return title
+
+# -- prompt: '[COMPUTERNAME @ cwd] (venv) git:branch*' as sys.ps1, with each segment cached (see prompt.py); interactive only
+@step('prompt', after=['host facts'])
+def install_prompt(results):
+    if not Interactive:
+        return None
+    import prompt
+    sys.ps1 = prompt.Prompt(results['host facts']['facts'])
+    return sys.ps1
+
+# -- aliases: convenience commands for the interactive prompt, defined in the profile namespace
+@step('aliases')
+def define_aliases(results):
+    def cls():
+        """clear the terminal screen"""
+        os.system('cls' if sys.platform == "win32" else 'clear')
+
+    def cd(path='~'):
+        """change the current directory (default: HOME), and return the new one"""
+        os.chdir(os.path.expanduser(path))
+        return os.getcwd()
+
+    def ll(path='.'):
+        """list a directory: size, modified time and name, with a trailing / for folders"""
+        with os.scandir(os.path.expanduser(path)) as entries:
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                entryStat = entry.stat(follow_symlinks=False)
+                print(' {:>12} {} {}{}'.format(entryStat.st_size, time.strftime('%Y-%m-%d %H:%M', time.localtime(entryStat.st_mtime)), entry.name, '/' if entry.is_dir() else ''))
+
+    def which(name):
+        """resolve a command from the (cached) index of the PATH directories, as `environ.py which` does"""
+        import environ
+        directories = environ.unique_directories(environ.path_entries(os.environ.get('PATH', '')))
+        matches = environ.command_table(directories, environ.load_path_index(directories)).get(name.lower() if sys.platform == "win32" else name)
+        return matches[0] if matches else None
+
+    aliases = dict({'cls': cls, 'cd': cd, 'll': ll, 'which': which})
+    globals().update(aliases)
+    return sorted(aliases)
+
+# -- compiled snapshot (deferred): re-compile the shell snapshots (bootstrap.py --compile) when they are missing, stale, or
+#    compiled on another host, so the next shell exports the host facts without starting python
+@step('compiled snapshot', after=['host facts'], deferred=True)
+def refresh_compiled_snapshot(results):
+    if bootstrap.compiled_fresh(bootstrap.cache_dir().joinpath('hostfacts.sh')):
+        return None
+    return bootstrap.compile_snapshot(bootstrap.get_fact('HostFacts'))
+
+# -- path index (deferred): refresh the cached index of the PATH directories, for which() and `environ.py which`
+@step('path index', deferred=True)
+def warm_path_index(results):
+    import environ
+    return len(environ.load_path_index(environ.path_entries(os.environ.get('PATH', ''))))
+
+# -- sysconfig cache (deferred): refresh this interpreter's cached config vars, for show_sysconfig.py
+@step('sysconfig cache', deferred=True)
+def warm_sysconfig_cache(results):
+    import show_sysconfig
+    return len(show_sysconfig.load_sysconfig()['vars'])
 
-#Region Bootstrap
-    # Invoke Bootstrap.ps1, from the same root path as this $PROFILE script
-    if (Get-Variable -Name 'myPS*' -ValueOnly -ErrorAction SilentlyContinue) {
-        # python path variables have been initialized via a recent invocation of bootstrap.ps1
-        print('')
-        print('My python paths:')
-        Get-Variable -Name 'myPS*' | Format-Table -AutoSize
-    } else {
-        # initialize variables, via bootstrap.ps1
-        print ('(Test-Path -Path ./bootstrap.ps1): {0}' -f (Test-Path -Path ./Bootstrap.ps1))
-        if (Test-Path -Path ./Bootstrap.ps1) {
-            #print '. ./Bootstrap.ps1'
-            . ./Bootstrap.ps1
-        }
-
-        if (Get-Variable -Name 'myPS*' -ValueOnly -ErrorAction SilentlyContinue) {
-            # python path variables have been initialized via a recent invocation of bootstrap.ps1
-            print('')
-            print('My python paths:')
-            Get-Variable -Name 'myPS*' | Format-Table -AutoSize
-        } else {
-            Write-Warning -Message './Bootstrap.ps1 may have encountered errors.'
-        }
-    }
 #End Region
 
-# if (Get-Command -Name Set-ConsoleTitle -ErrorAction SilentlyContinue) {
-#     # Call Set-ConsoleTitle, from ProfilePal module
-#     if ($IsVerbose) {print(''})
-#     print(' # Set-ConsoleTitle >')
-#     Set-ConsoleTitle
-#     print(' # < Set-ConsoleTitle')
-#     if ($IsVerbose) {print(''})
-# }
-
-# In case any intermediary scripts or module loads change our current directory, restore original path, before it's locked into the window title by Set-ConsoleTitle
-#Set-Location $startingPath
-
-# Loading ProfilePal Module, and only if successful, call Set-ConsoleTitle to customize the ConsoleHost window title
-#Import-Module -Name ProfilePal
-# if $?:
-#     # Call Set-ConsoleTitle function from ProfilePal module
-#     Set-ConsoleTitle
-# }
-
-print ('$HostOS = ''{0}''' -f $HostOS)
-# Detect host OS (as set in variables by Bootstrap) and proceed accordingly
-if ($IsLinux) {
-    #$Private:SubProfile = (Join-Path -Path (split-path -Path $MyScriptInfo.CommandPath) -ChildPath 'Microsoft.PowerShell_profile-Linux.ps1')
-}
-
-if ($IsMacOS) {
-    #$Private:SubProfile = (Join-Path -Path (split-path -Path $MyScriptInfo.CommandPath) -ChildPath 'Microsoft.PowerShell_profile-macOS.ps1')
-    
-    # Set DNS resolver to Cloudflare secure DNS
-    sudo networksetup -setdnsservers Wi-Fi 1.1.1.1
-
-}
-
-if ($IsWindows) {
-    $Private:SubProfile = (Join-Path -Path (split-path -Path $MyScriptInfo.CommandPath) -ChildPath 'Microsoft.PowerShell_profile-Windows.ps1')
-}
-
-if ($IsVerbose) {print ''}
-print ('$SubProfile = ''{0}''' -f $Private:SubProfile)
-
-# Load/invoke OS specific profile sub-script
-if (Test-Path -Path $SubProfile) {
-    # dot-source it
-    . $SubProfile
-} else {
-    throw ('Failed to locate OS specific profile sub-script: {0}' -f $SubProfile)
-}
-Remove-Variable -Name SubProfile -Force
-
-# Here's an example of how convenient aliases can be added to your PS profile
-New-Alias -Name rdp -Value Start-RemoteDesktop -ErrorAction Ignore
-
-print ''
-print ' ** To view additional available modules, run: Get-Module -ListAvailable'
-print ' ** To view cmdlets available in a given module, run: Get-Command -Module <ModuleName>'
-
-if ($IsVerbose) {print ''}
-print ' # End of python $Profile CurrentUserCurrentHost #'
-
-# For intra-profile/bootstrap script flow testing
-if ($IsVerbose) {
-    print 'Start-Sleep -Seconds 3'
-    Start-Sleep -Seconds 3
-}
- """
+# -- profile_report prints the timing of every step run so far (deferred steps may still be running in the background)
+def profile_report():
+    print('\n'.join(format_report(list(ProfileSteps.values()), ProfileReady)))
+
+parser = argparse.ArgumentParser(description='Load the python profile')
+parser.add_argument('--report', action='store_true', help='print the timing of each step, and the critical path to the prompt')
+parser.add_argument('--workers', type=int, default=4, help='steps to run concurrently (default: 4)')
+parser.add_argument('--skip-deferred', action='store_true', help='do not run the deferred (non-essential) steps')
+args = parser.parse_args([] if Interactive else sys.argv[1:])
+
+with span('profile: load'):
+    print('')
+    print(' # Loading python profile')
+    print('')
+
+    # capture starting path so we can go back after other things below might move around
+    startingPath = os.getcwd()
+
+    if IsVerbose:
+        print('It''s VERBOSE!!')
+
+    check_steps(ProfileSteps)
+    ProfileResults = run_steps([current for current in ProfileSteps.values() if not current.deferred], dict(), max(1, args.workers))
+
+    # In case a sub-profile changed our current directory, restore the original path
+    os.chdir(startingPath)
+
+ProfileReady = time.perf_counter()
+
+if 'host facts' in ProfileResults:
+    HostFacts = ProfileResults['host facts']['facts']
+    print(' # Python {} on {} - {} # (from {})'.format('.'.join(HostFacts['py_version'].split('.')[0:2]), HostFacts['hostOSCaption'], HostFacts['COMPUTERNAME'], ProfileResults['host facts']['source']))
+if ProfileResults.get('sub-profile'):
+    print(' # Loaded {}'.format(ProfileResults['sub-profile']))
+for current in ProfileSteps.values():
+    if current.state in ('failed', 'skipped'):
+        print(' ! {} {}: {}'.format(current.name, current.state, current.error), file=sys.stderr)
+print(' # Ready in {:.0f} ms (critical path: {})'.format(1000.0 * (ProfileReady - ProfileStart),
+                                                        ' > '.join(current.name for current in critical_path([current for current in ProfileSteps.values() if not current.deferred]))))
+if 'aliases' in ProfileResults:
+    print(' ** Aliases: {}() ; profile_report() prints the timing of each step'.format('(), '.join(ProfileResults['aliases'])))
+
+deferredSteps = [] if args.skip_deferred else [current for current in ProfileSteps.values() if current.deferred]
+if Interactive:
+    # the prompt follows as soon as this script returns; the deferred steps continue, one at a time, in a background
+    # (daemon) thread, so exiting the REPL does not wait for them (they only warm caches, each written atomically)
+    if deferredSteps:
+        threading.Thread(target=run_steps, args=(deferredSteps, dict(ProfileResults), 1, True), name='profile-deferred', daemon=True).start()
+else:
+    if deferredSteps:
+        run_steps(deferredSteps, ProfileResults, max(1, args.workers))
+    if args.report:
+        print('')
+        profile_report()
+    if IsVerbose:
+        print('')
+    print(' # End of python profile #')
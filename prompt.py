@@ -0,0 +1,275 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : prompt.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : Interactive prompt for the python profile, installed as sys.ps1 by profile.py (the python port of the
+#             '[COMPUTERNAME @ PWD] admin/debug/level' prompt function of the PowerShell profile):
+#             [COMPUTERNAME @ ~/cwd] (venv) git:branch* [ahead 1] [LastError]
+#             #>>>   (the # is shown when running as root / Administrator)
+#             The REPL renders sys.ps1 (via str) before every command, so each segment keeps its last value, and only
+#             recomputes it when its own invalidation key changes. The git working tree status is the one slow segment;
+#             it is refreshed in a background thread, and the last known value is shown meanwhile.
+#             prompt.py [--bench] [--repeat N] [--pause MS] [DIR]   print the prompt for DIR, or time its rendering
+# ===================================== #
+
+import os
+import sys
+import threading
+import time
+
+IsVerbose = False # True
+
+# Region Segments
+
+Unset = object()
+
+# -- Segment caches one part of the prompt: compute(context) runs only when key(context) differs from the last render
+class Segment(object):
+    __slots__ = ('name', 'key', 'compute', 'cachedKey', 'cachedValue')
+
+    def __init__(self, name, key, compute):
+        self.name = name
+        self.key = key
+        self.compute = compute
+        self.cachedKey = Unset
+        self.cachedValue = ''
+
+    def value(self, context):
+        key = self.key(context)
+        if key != self.cachedKey:
+            self.cachedValue = self.compute(context)
+            self.cachedKey = key
+        return self.cachedValue
+
+# -- AsyncSegment computes in a background thread, when its key changes or its value is older than ttl seconds, and
+#    meanwhile renders the last known value for that key (render(None) when there is none yet); one refresh at a time.
+#    The refresh is queued in context['refresh'], to be started once the prompt text is complete, so the new thread does
+#    not compete with the rest of the render for the GIL
+class AsyncSegment(Segment):
+    __slots__ = ('render', 'ttl', 'known', 'refreshing')
+
+    def __init__(self, name, key, compute, render, ttl):
+        Segment.__init__(self, name, key, compute)
+        self.render = render
+        self.ttl = ttl
+        self.known = dict()     # key: (monotonic time computed, value)
+        self.refreshing = None
+
+    def value(self, context):
+        key = self.key(context)
+        if key is None:
+            return ''
+        computed, value = self.known.get(key, (None, None))
+        if (computed is None or time.monotonic() - computed > self.ttl) and self.refreshing is None:
+            self.refreshing = threading.Thread(target=self.refresh, args=(key, context), name='prompt-' + self.name, daemon=True)
+            context['refresh'].append(self.refreshing)
+        return self.render(value)
+
+    def refresh(self, key, context):
+        try:
+            value = self.compute(context)
+            if len(self.known) > 64:
+                self.known.clear()
+            self.known[key] = (time.monotonic(), value)
+        finally:
+            self.refreshing = None
+
+# -- StatusSegment shows the type of the exception that ended the previous command (the REPL keeps it as sys.last_value),
+#    for the one prompt that follows it
+class StatusSegment(object):
+    __slots__ = ('name', 'lastError')
+
+    def __init__(self):
+        self.name = 'status'
+        self.lastError = getattr(sys, 'last_value', None)
+
+    def value(self, context):
+        error = getattr(sys, 'last_value', None)
+        if error is self.lastError:
+            return ''
+        self.lastError = error
+        return ' [{}]'.format(type(error).__name__)
+
+#End Region
+
+# Region Git
+# The repository is found by walking up from the current directory (a few stats); the branch is read from HEAD; the
+# working tree status comes from `git status`, which can take seconds in a large repository, so it is an AsyncSegment.
+# A background status must not block the user's own git commands, hence GIT_OPTIONAL_LOCKS=0 (no index refresh writes,
+# as --no-optional-locks, which older gits lack); nor start the user's fsmonitor daemon or hook, hence core.fsmonitor=false.
+GitStatusTTL = 2.0
+GitStatusTimeout = 30
+
+# -- find_git returns (work tree, git dir) for the repository containing directory, or None; a .git file (worktrees,
+#    submodules) names the git dir
+def find_git(directory):
+    while True:
+        dotGit = os.path.join(directory, '.git')
+        if os.path.isdir(dotGit):
+            return directory, dotGit
+        if os.path.isfile(dotGit):
+            try:
+                with open(dotGit, encoding='utf-8') as dotGitFile:
+                    line = dotGitFile.readline().strip()
+            except OSError:
+                return None
+            if line.startswith('gitdir:'):
+                return directory, os.path.join(directory, line[len('gitdir:'):].strip())
+            return None
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+# -- mtime_ns returns a file's modification time, or None when it is absent
+def mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+# -- read_branch returns the checked out branch name, or the abbreviated commit when HEAD is detached
+def read_branch(gitDir):
+    try:
+        with open(os.path.join(gitDir, 'HEAD'), encoding='utf-8') as headFile:
+            head = headFile.read().strip()
+    except OSError:
+        return '?'
+    if head.startswith('ref: '):
+        return head[len('ref: '):].replace('refs/heads/', '', 1)
+    return head[0:8]
+
+# -- git_status returns {'dirty': bool, 'ahead': n, 'behind': n} for a work tree, or None when git fails
+def git_status(workTree):
+    import subprocess
+    env = dict(os.environ)
+    env['GIT_OPTIONAL_LOCKS'] = '0'
+    try:
+        result = subprocess.run(['git', '-c', 'core.fsmonitor=false', '-C', workTree, 'status', '--porcelain=v1', '--branch', '--ignore-submodules=dirty'],
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env, timeout=GitStatusTimeout)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    lines = result.stdout.decode('utf-8', 'replace').splitlines()
+    status = dict({'dirty': any(not line.startswith('## ') for line in lines), 'ahead': 0, 'behind': 0})
+    if lines and lines[0].startswith('## ') and lines[0].endswith(']'):
+        for part in lines[0][lines[0].rindex('[') + 1:-1].split(', '):
+            name, _, count = part.partition(' ')
+            if name in ('ahead', 'behind') and count.isdigit():
+                status[name] = int(count)
+    return status
+
+# -- format_git_status renders a git_status result: * when dirty, ? while not yet known
+def format_git_status(status):
+    if status is None:
+        return '?'
+    text = '*' if status['dirty'] else ''
+    counts = ['{} {}'.format(name, status[name]) for name in ('ahead', 'behind') if status[name]]
+    return text + (' [{}]'.format(', '.join(counts)) if counts else '')
+
+#End Region
+
+# Region Prompt
+
+# -- is_admin reports whether this process runs as root, or as an elevated Administrator on Windows
+def is_admin():
+    if sys.platform == "win32":
+        import ctypes
+        try:
+            return bool(ctypes.windll.shell32.IsUserAnAdmin())
+        except (AttributeError, OSError):
+            return False
+    return os.geteuid() == 0
+
+# -- venv_name returns the name of the active virtual environment (or conda environment), or ''
+def venv_name():
+    venv = os.environ.get('VIRTUAL_ENV') or (sys.prefix if sys.prefix != getattr(sys, 'base_prefix', sys.prefix) else '')
+    if venv:
+        return os.path.basename(venv.rstrip(os.sep))
+    return os.environ.get('CONDA_DEFAULT_ENV', '')
+
+# -- Prompt renders the segments; assign an instance to sys.ps1, and the REPL calls str() on it for every prompt
+class Prompt(object):
+
+    def __init__(self, facts, ttl=GitStatusTTL):
+        self.computerName = facts['COMPUTERNAME']
+        self.home = facts['HOME'].rstrip(os.sep)
+        self.lastRender = 0.0
+        self.segments = dict({
+            'cwd': Segment('cwd', lambda context: context['cwd'], lambda context: self.short_path(context['cwd'])),
+            'venv': Segment('venv', lambda context: (os.environ.get('VIRTUAL_ENV'), os.environ.get('CONDA_DEFAULT_ENV')),
+                            lambda context: ' ({})'.format(venv_name()) if venv_name() else ''),
+            'branch': Segment('branch', lambda context: context['git'] and (context['git'][1], mtime_ns(os.path.join(context['git'][1], 'HEAD'))),
+                              lambda context: ' git:{}'.format(read_branch(context['git'][1])) if context['git'] else ''),
+            'git status': AsyncSegment('git status', lambda context: context['git'] and (context['git'][0], mtime_ns(os.path.join(context['git'][1], 'index')),
+                                                                                         mtime_ns(os.path.join(context['git'][1], 'HEAD'))),
+                                       lambda context: git_status(context['git'][0]), format_git_status, ttl),
+            'status': StatusSegment(),
+            'admin': Segment('admin', lambda context: os.geteuid() if hasattr(os, 'geteuid') else None, lambda context: '#' if is_admin() else ''),
+        })
+
+    # -- short_path abbreviates HOME to ~
+    def short_path(self, path):
+        if self.home and (path == self.home or path.startswith(self.home + os.sep)):
+            return '~' + path[len(self.home):]
+        return path
+
+    def render(self):
+        started = time.perf_counter()
+        try:
+            cwd = os.getcwd()
+        except OSError:
+            cwd = '?'
+        context = dict({'cwd': cwd, 'git': find_git(cwd) if cwd != '?' else None, 'refresh': []})
+        try:
+            values = dict((name, segment.value(context)) for name, segment in self.segments.items())
+            text = '[{} @ {}]{}{}{}{}\n{}>>> '.format(self.computerName, values['cwd'], values['venv'], values['branch'], values['git status'] if values['branch'] else '',
+                                                     values['status'], values['admin'])
+            self.lastRender = time.perf_counter() - started
+        finally:
+            # even when a later segment raised: a queued refresh that never started would block its segment for good
+            for refreshing in context['refresh']:
+                refreshing.start()
+        return text
+
+    def __str__(self):
+        # an exception here would break the REPL prompt, so fall back to the default prompt
+        try:
+            return self.render()
+        except Exception:
+            return '>>> '
+
+#End Region
+
+if __name__ == '__main__':
+    import argparse
+    import statistics
+    import bootstrap
+    parser = argparse.ArgumentParser(description='Print the python profile prompt, or time its rendering')
+    parser.add_argument('directory', nargs='?', default='.', help='directory to render the prompt in (default: the current directory)')
+    parser.add_argument('--bench', action='store_true', help='time repeated renders, as the REPL would do for each command')
+    parser.add_argument('--repeat', type=int, default=200, help='renders to time with --bench (default: 200)')
+    parser.add_argument('--pause', type=float, default=5.0, help='ms between renders, standing in for the command typed at each prompt (default: 5)')
+    args = parser.parse_args()
+
+    os.chdir(args.directory)
+    prompt = Prompt(bootstrap.get_fact('HostFacts'))
+    if args.bench:
+        timings = []
+        for index in range(max(1, args.repeat)):
+            prompt.render()
+            timings.append(prompt.lastRender * 1000.0)
+            time.sleep(args.pause / 1000.0)
+        print(' first render {:.3f} ms; then median {:.3f} ms, max {:.3f} ms, over {} renders'.format(timings[0], statistics.median(timings[1:] or timings),
+                                                                                                      max(timings[1:] or timings), len(timings)))
+    else:
+        # wait for the background git status, so the printed prompt is complete
+        prompt.render()
+        refreshing = prompt.segments['git status'].refreshing
+        if refreshing:
+            refreshing.join()
+        print(prompt.render())
@@ -0,0 +1,73 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : rootfs_facts.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : Inventory mounted OS images and container rootfs trees: bootstrap's host facts (hostOS, hostOSCaption,
+#             COMPUTERNAME, distro and version, and the pythons installed) of each root, as one NDJSON record per root
+#             rootfs_facts.py ROOT [ROOT ...] [--workers N]
+#             Roots are read by a pool of processes (bootstrap.facts_for_root), and the records are written in the order
+#             of the ROOT arguments, as soon as each is ready. A root that cannot be read gets a record with its error.
+# ===================================== #
+
+import argparse
+import concurrent.futures
+import glob
+import json
+import os
+import sys
+import time
+
+import bootstrap
+
+IsVerbose = False # True
+
+ChunkSize = 4
+
+# -- print_var prints a label and a variable's value, if IsVerbose
+def print_var(label, varname):
+    if IsVerbose:
+        print('< {} = \'{}\' >'.format(label, varname), file=sys.stderr)
+
+# -- root_record returns the facts of one root, or dict(root, error) when it cannot be read (runs in a worker process)
+def root_record(root):
+    try:
+        return bootstrap.facts_for_root(root)
+    except OSError as err:
+        return dict({'root': os.path.abspath(root), 'error': str(err)})
+
+# -- expand_roots expands glob patterns (Windows shells leave them to the program), keeping the order given
+def expand_roots(patterns):
+    roots = []
+    for pattern in patterns:
+        roots.extend(sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern])
+    return list(dict.fromkeys(roots))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write bootstrap's host facts of each OS image or rootfs tree, as NDJSON")
+    parser.add_argument('roots', nargs='+', metavar='ROOT', help='root directory of a mounted image (or a glob pattern)')
+    parser.add_argument('--workers', type=int, default=None, help='roots read at once (default: one per CPU)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    roots = expand_roots(args.roots)
+    print_var('roots', len(roots))
+    failed = 0
+    workers = max(1, args.workers or os.cpu_count() or 1)
+    if workers == 1 or len(roots) == 1:
+        records = map(root_record, roots)
+        pool = None
+    else:
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        records = pool.map(root_record, roots, chunksize=ChunkSize)
+    try:
+        for record in records:
+            failed += 'error' in record
+            print(json.dumps(record), flush=True)
+    finally:
+        if pool:
+            pool.shutdown()
+    print(' {} roots ({} unreadable), in {:.2f} s'.format(len(roots), failed, time.perf_counter() - started), file=sys.stderr)
+    sys.exit(1 if failed else 0)
@@ -4,23 +4,26 @@
 # LANGUAGE  : Python
 # VERSION   : 3
 # AUTHOR    : Bryan Dady
-# UPDATED   : 11/1/2019 - reference working with system config variables
+# UPDATED   : 10/18/2026 - Add --compare, a side by side matrix of the config vars that differ between interpreters
+# INTRO     : reference working with system config variables
+#             show_sysconfig.py [KEY|GLOB ...] [--prefix PREFIX]   config vars (all of them, when there is no query)
+#             show_sysconfig.py --paths [--scheme NAME] [...]     install paths, of the default (or named) scheme
+#             show_sysconfig.py --schemes                         install scheme names
+#             show_sysconfig.py --compare [--venv-root DIR] [KEY|GLOB ...]   config vars that differ between interpreters
+#             Results come from a cache (in the bootstrap cache directory), with one entry per interpreter executable,
+#             build and prefix (so each venv has its own), so repeated queries do not load the _sysconfigdata module.
 # ===================================== #
 
+import argparse
+import fnmatch
+import json
+import os
+import re
 import sys
-import sysconfig
 import time
 
-print('Start {}: {}\n'.format(sys.argv[0], time.strftime('%Y %m %d %H:%M:%S %Z', time.localtime())))
-
-# print python system config (dictionary)
-print('')
-print('Python ''Host''/Shell (system) config:')
-print(' # # #')
-for k, v in sysconfig.get_config_vars().items():
-    print(f'    {k} = {v}')
-print(' # # #')
-print('')
+from bootstrap import cache_dir
+from bootstrap import write_atomic
 
 # possibly interesting / useful sysconfig properties to reference
 # access value example: "py_version_short" :: sysconfig.get_config_var('py_version_short')
@@ -28,6 +31,244 @@ print('')
 # py_version_short = 3.6
 # HOST_GNU_TYPE = x86_64-pc-linux-gnu
 
-print('\nEnd : {}'.format(time.strftime('%Y %m %d %H:%M:%S %Z', time.localtime())))
+# -- interpreter_key identifies this interpreter's build (the real executable's path, mtime and size, and sys.version) and
+#    installation: a venv's python links to its base binary, but has its own sys.executable, sys.prefix and install paths
+def interpreter_key():
+    executable = os.path.realpath(sys.executable)
+    executableStat = os.stat(executable)
+    return dict({'executable': executable, 'mtime': executableStat.st_mtime_ns, 'size': executableStat.st_size, 'version': sys.version,
+                 'invoked': sys.executable, 'prefix': sys.prefix, 'base_prefix': sys.base_prefix})
+
+# -- cache_file returns the cache file of one interpreter_key, so switching between interpreters keeps each one's entry
+def cache_file(key):
+    import hashlib
+    return cache_dir().joinpath('sysconfig', hashlib.sha1(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()[0:16] + '.json')
+
+# -- collect_sysconfig loads everything the queries can ask for, from the sysconfig module (the slow path)
+def collect_sysconfig():
+    import sysconfig
+    schemes = sysconfig.get_scheme_names()
+    defaultScheme = sysconfig.get_default_scheme() if hasattr(sysconfig, 'get_default_scheme') else sysconfig._get_default_scheme()
+    return dict({
+        'vars': sysconfig.get_config_vars(),
+        'schemes': list(schemes),
+        'default_scheme': defaultScheme,
+        'paths': dict((scheme, sysconfig.get_paths(scheme)) for scheme in schemes),
+    })
+
+# -- load_sysconfig returns the collect_sysconfig result from the cache, when it matches this interpreter, or collects and caches it
+def load_sysconfig(refresh=False):
+    key = interpreter_key()
+    cacheFile = cache_file(key)
+    if not refresh:
+        try:
+            cached = json.loads(cacheFile.read_text(encoding='utf-8'))
+            if cached.get('key') == key:
+                return cached['sysconfig']
+        except (OSError, ValueError):
+            pass
+    config = collect_sysconfig()
+    try:
+        write_atomic(cacheFile, json.dumps(dict({'key': key, 'sysconfig': config}), default=str))
+    except OSError:
+        pass
+    return config
+
+# -- select_items returns the items whose key equals or glob-matches any query, or starts with any prefix (all, when there are none)
+def select_items(items, queries, prefixes):
+    if not queries and not prefixes:
+        return dict(items)
+    selected = dict()
+    for key, value in items.items():
+        if any(key.startswith(prefix) for prefix in prefixes) or any(key == query or fnmatch.fnmatchcase(key, query) for query in queries):
+            selected[key] = value
+    return selected
+
+# -- format_items renders items as text, json or ndjson, for a single write
+def format_items(items, outputFormat, title):
+    if outputFormat == 'json':
+        return json.dumps(items, indent=1, default=str) + '\n'
+    if outputFormat == 'ndjson':
+        return ''.join(json.dumps(dict({'key': key, 'value': value}), default=str) + '\n' for key, value in items.items())
+    lines = ['Start {}: {}\n'.format(sys.argv[0], time.strftime('%Y %m %d %H:%M:%S %Z', time.localtime())), '', title, ' # # #']
+    lines.extend('    {} = {}'.format(key, value) for key, value in items.items())
+    lines.extend([' # # #', '', '\nEnd : {}'.format(time.strftime('%Y %m %d %H:%M:%S %Z', time.localtime()))])
+    return '\n'.join(lines) + '\n'
+
+# Region Compare
+# `show_sysconfig.py --compare` discovers the interpreters on PATH (python, python3, python3.X) and in any --venv-root,
+# collects their config vars concurrently (one subprocess each), and shows a matrix of only the keys whose values differ.
+# Each interpreter's result is cached by its binary's (real path, mtime, size), so re-running a comparison is nearly instant.
+InterpreterName = re.compile(r'^python(\d+(\.\d+)?)?(\.exe)?$', re.IGNORECASE)
+CollectScript = ('import json, sys, sysconfig\n'
+                 'config = sysconfig.get_config_vars()\n'
+                 'json.dump(dict(executable=sys.executable, prefix=sys.prefix, version=sys.version.split()[0], vars=dict((key, config[key]) for key in config)), sys.stdout, default=str)\n')
+
+# -- find_interpreters returns {key: interpreter path} for python* on PATH, and the venvs under (or at) each venv root
+#    The key is the real path of the binary, as the same binary is often reachable under several names (python3 ->
+#    python3.11) or folders (/bin, /usr/bin); a venv's python links to its base binary, so venvs are keyed on their own path
+def find_interpreters(venvRoots=(), extra=()):
+    candidates = [(os.path.realpath(interpreter), interpreter) for interpreter in extra]
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            continue
+        candidates.extend((os.path.realpath(os.path.join(directory, name)), os.path.join(directory, name)) for name in names if InterpreterName.match(name))
+    for venvRoot in venvRoots:
+        try:
+            venvs = [venvRoot] + sorted(os.path.join(venvRoot, name) for name in os.listdir(venvRoot))
+        except OSError:
+            continue
+        for venv in venvs:
+            for relative in (os.path.join('bin', 'python'), os.path.join('Scripts', 'python.exe')):
+                venvPython = os.path.abspath(os.path.join(venv, relative))
+                candidates.append((venvPython, venvPython))
+
+    interpreters = dict()
+    for key, candidate in candidates:
+        if key not in interpreters and os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+            interpreters[key] = candidate
+    return interpreters
+
+# -- collect_interpreter runs CollectScript with one interpreter; returns its result, or a dictionary with an 'error'
+def collect_interpreter(interpreter, timeout=60):
+    import subprocess
+    try:
+        result = subprocess.run([interpreter, '-I', '-c', CollectScript], stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as err:
+        return dict({'error': str(err)})
+    if result.returncode != 0:
+        errorLines = result.stderr.decode('utf-8', 'replace').strip().splitlines()
+        return dict({'error': errorLines[-1].strip() if errorLines else 'exit code {}'.format(result.returncode)})
+    return json.loads(result.stdout.decode('utf-8'))
+
+# -- collect_interpreters returns {interpreter path: collect_interpreter result}, using the cache for unchanged binaries,
+#    and up to workers concurrent subprocesses for the rest; failures (e.g. a pyenv shim for a version that is not
+#    installed) are cached too, so they are not re-run every time; a candidate gone since it was found (e.g. a dangling
+#    symlink left by a removed venv) is skipped
+def collect_interpreters(interpreters, workers=8, refresh=False):
+    import concurrent.futures
+    cacheFile = cache_dir().joinpath('sysconfig-interpreters.json')
+    try:
+        cached = json.loads(cacheFile.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        cached = dict()
+
+    results = dict()
+    stale = []
+    for key, candidate in interpreters.items():
+        try:
+            binaryStat = os.stat(candidate)
+        except OSError:
+            continue
+        stamp = [os.path.realpath(candidate), binaryStat.st_mtime_ns, binaryStat.st_size]
+        entry = cached.get(key)
+        if not refresh and entry and entry['stamp'] == stamp:
+            results[candidate] = entry['result']
+        else:
+            stale.append((key, candidate, stamp))
+
+    if stale:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            for (key, candidate, stamp), result in zip(stale, pool.map(lambda item: collect_interpreter(item[1]), stale)):
+                results[candidate] = result
+                cached[key] = dict({'stamp': stamp, 'result': result})
+        try:
+            write_atomic(cacheFile, json.dumps(cached))
+        except OSError:
+            pass
+
+    # wrappers (e.g. pyenv shims) run an interpreter that may also be listed directly
+    unique = dict()
+    seen = set()
+    for candidate in interpreters.values():
+        if candidate not in results:
+            continue
+        result = results[candidate]
+        identity = (os.path.realpath(result['executable']), result['prefix']) if 'executable' in result else candidate
+        if identity not in seen:
+            seen.add(identity)
+            unique[candidate] = result
+    return unique
+
+# -- difference_matrix returns {key: [value per interpreter]} for the selected keys whose values are not all the same,
+#    among the interpreters whose config vars were collected
+def difference_matrix(results, queries, prefixes):
+    columns = [result['vars'] for result in results.values() if 'vars' in result]
+    keys = set()
+    for column in columns:
+        keys.update(select_items(column, queries, prefixes))
+    matrix = dict()
+    for key in sorted(keys):
+        values = [column.get(key) for column in columns]
+        if any(value != values[0] for value in values[1:]):
+            matrix[key] = values
+    return matrix
+
+# -- format_matrix renders the interpreter legend and the side by side matrix, with values truncated to width
+def format_matrix(results, matrix, width):
+    lines = []
+    collected = [candidate for candidate, result in results.items() if 'vars' in result]
+    for number, candidate in enumerate(collected, 1):
+        lines.append(' [{}] {} {}'.format(number, results[candidate]['version'], candidate))
+    for candidate, result in results.items():
+        if 'vars' not in result:
+            lines.append(' skipped {}: {}'.format(candidate, result['error']))
+    lines.append('')
+    keyWidth = max([len(key) for key in matrix] + [3])
+    lines.append(' {:<{}} '.format('key', keyWidth) + ' '.join('{:<{}}'.format('[{}]'.format(number), width) for number in range(1, len(collected) + 1)))
+    for key, values in matrix.items():
+        cells = ['-' if value is None else str(value) for value in values]
+        lines.append(' {:<{}} '.format(key, keyWidth) + ' '.join('{:<{}}'.format(cell if len(cell) <= width else cell[0:width - 3] + '...', width) for cell in cells))
+    lines.append('')
+    lines.append(' {} interpreters, {} differing keys'.format(len(collected), len(matrix)))
+    return '\n'.join(lines) + '\n'
+
+#End Region
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Show (and query) Python sysconfig variables, install paths and schemes')
+    parser.add_argument('queries', nargs='*', metavar='KEY', help='key, or glob (e.g. \'py_version*\'), to show')
+    parser.add_argument('--prefix', action='append', default=[], help='show keys starting with PREFIX (repeatable)')
+    parser.add_argument('--paths', action='store_true', help='query the install paths, instead of the config vars')
+    parser.add_argument('--scheme', help='install scheme, for --paths (default: the default scheme)')
+    parser.add_argument('--schemes', action='store_true', help='list the install schemes')
+    parser.add_argument('--format', choices=('text', 'json', 'ndjson'), default='text', help='output format (default: text)')
+    parser.add_argument('--refresh', action='store_true', help='ignore the cache, and load the sysconfig module again')
+    parser.add_argument('--compare', action='store_true', help='compare the config vars of the interpreters on PATH (and in --venv-root)')
+    parser.add_argument('--venv-root', action='append', default=[], help='folder of venvs (or a venv) to include, for --compare (repeatable)')
+    parser.add_argument('--interpreter', action='append', default=[], help='interpreter to include, for --compare (repeatable)')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent interpreters, for --compare (default: %(default)s)')
+    parser.add_argument('--width', type=int, default=30, help='column width, for --compare (default: %(default)s)')
+    args = parser.parse_args()
+
+    if args.compare:
+        results = collect_interpreters(find_interpreters(args.venv_root, args.interpreter), max(1, args.workers), args.refresh)
+        matrix = difference_matrix(results, args.queries, args.prefix)
+        if args.format == 'text':
+            sys.stdout.write(format_matrix(results, matrix, max(8, args.width)))
+        else:
+            sys.stdout.write(json.dumps(dict({'interpreters': list(results), 'differences': matrix}), indent=1, default=str) + '\n')
+        sys.exit(0)
+
+    config = load_sysconfig(args.refresh)
+    if args.schemes:
+        items = dict((scheme, 'default' if scheme == config['default_scheme'] else '') for scheme in config['schemes'])
+        title = 'Python install schemes:'
+    elif args.paths:
+        scheme = args.scheme or config['default_scheme']
+        if scheme not in config['paths']:
+            parser.error('unknown scheme {!r} (choose from {})'.format(scheme, ', '.join(config['schemes'])))
+        items = config['paths'][scheme]
+        title = 'Python install paths ({} scheme):'.format(scheme)
+    else:
+        items = config['vars']
+        # print python system config (dictionary)
+        title = 'Python ''Host''/Shell (system) config:'
+
+    selected = select_items(items, args.queries, args.prefix)
+    sys.stdout.write(format_items(selected, args.format, title))
+    sys.exit(0 if selected or not (args.queries or args.prefix) else 1)
 
 #sys.exit(0)
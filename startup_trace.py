@@ -0,0 +1,112 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : startup_trace.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : Shared span / timer facility for the python profile scripts (bootstrap.py, profile.py, userChrome.py)
+#             Tracing is enabled by setting $PYPROFILE_TRACE, to either a file path, a directory, or 1 (for the temp directory)
+#             When enabled, each traced phase is recorded and, at exit, written as a Chrome trace (JSON) timeline,
+#             which can be loaded in chrome://tracing or https://ui.perfetto.dev, and a summary of the slowest phases is
+#             printed to stderr. When disabled, each phase costs a single flag check.
+# ===================================== #
+
+import atexit
+import os
+import sys
+import threading
+import time
+
+TraceTarget = os.environ.get('PYPROFILE_TRACE', '')
+Enabled = TraceTarget not in ('', '0')
+SummaryRows = 10
+
+TraceEvents = []
+TraceLock = threading.Lock()
+TraceStart = time.perf_counter_ns()
+
+# -- NullContext is the do-nothing context manager handed out (as the shared NullSpan) while tracing is disabled
+class NullContext(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NullSpan = NullContext()
+
+# -- Span records one 'complete' (ph: X) trace event, from __enter__ to __exit__
+class Span(object):
+    __slots__ = ('name', 'args', 'begin')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.begin = 0
+
+    def __enter__(self):
+        self.begin = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        event = dict({'name': self.name, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                      'ts': (self.begin - TraceStart) / 1000.0, 'dur': (end - self.begin) / 1000.0})
+        if self.args:
+            event['args'] = self.args
+        with TraceLock:
+            if not TraceEvents:
+                atexit.register(finish)
+            TraceEvents.append(event)
+        return False
+
+# -- span times a phase: `with span('host detection'):` ... ; keyword arguments are stored with the event
+def span(name, **args):
+    if not Enabled:
+        return NullSpan
+    return Span(name, args)
+
+# -- trace_path derives the Chrome trace output file from $PYPROFILE_TRACE
+def trace_path():
+    fileName = 'startup-trace-{}-{}.json'.format(os.path.basename(sys.argv[0] or 'python').replace('.py', ''), os.getpid())
+    if TraceTarget == '1':
+        import tempfile
+        return os.path.join(tempfile.gettempdir(), fileName)
+    if os.path.isdir(TraceTarget):
+        return os.path.join(TraceTarget, fileName)
+    return TraceTarget
+
+# -- summarize aggregates the recorded events by name, slowest (by total duration) first
+def summarize(events):
+    totals = dict()
+    for event in events:
+        count, total, longest = totals.get(event['name'], (0, 0.0, 0.0))
+        totals[event['name']] = (count + 1, total + event['dur'], max(longest, event['dur']))
+    return sorted(((name,) + values for name, values in totals.items()), key=lambda row: row[2], reverse=True)
+
+# -- format_summary renders the slowest phases as a fixed width text table
+def format_summary(events, rows=SummaryRows):
+    wallTime = max([event['ts'] + event['dur'] for event in events] or [0.0]) or 1.0
+    lines = [' {:<36} {:>6} {:>10} {:>10} {:>7}'.format('phase', 'count', 'total ms', 'max ms', '% wall')]
+    for name, count, total, longest in summarize(events)[0:rows]:
+        lines.append(' {:<36} {:>6} {:>10.3f} {:>10.3f} {:>6.1f}%'.format(name[0:36], count, total / 1000.0, longest / 1000.0, 100.0 * total / wallTime))
+    return '\n'.join(lines)
+
+# -- finish writes the Chrome trace timeline and prints the summary; registered with atexit by the first recorded span
+def finish():
+    import json
+    with TraceLock:
+        events = list(TraceEvents)
+    if not events:
+        return
+    outputPath = trace_path()
+    try:
+        with open(outputPath, 'w', encoding='utf-8') as traceFile:
+            json.dump(dict({'traceEvents': events, 'displayTimeUnit': 'ms'}), traceFile)
+    except OSError as err:
+        print(' startup_trace: unable to write {}: {}'.format(outputPath, err), file=sys.stderr)
+        outputPath = None
+    sys.stderr.write('\n # Startup trace{} #\n{}\n'.format(': ' + outputPath if outputPath else '', format_summary(events)))
@@ -0,0 +1,338 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : sync_psfiles.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Load the settings through config_loader
+# INTRO     : Sync the RepositorySets of MyPSfiles.json (as Merge-MyPSfiles.ps1 does via WinMerge), one way, from each
+#             SourcePath to its TargetPath, on any OS
+#             sync_psfiles.py [NAME ...] [--dry-run] [--force] [--workers N] [--settings FILE] [--list]
+#             The settings are loaded through config_loader, which validates them (before any sync starts) and expands their
+#             $env:NAME and $myPSModulesPath tokens, from the environment and bootstrap's HOME and Is* flags, once per change.
+#             Files whose size and mtime match are taken as unchanged; otherwise their digests are compared, from a
+#             persistent per-tree index (in the bootstrap cache directory), so only new or modified files are hashed.
+#             A file is copied when it is missing from the target, or differs and the source copy is newer; a target
+#             copy that is newer is reported as a conflict, and only overwritten with --force. Nothing is deleted.
+#             On Linux and macOS, a set with a Windows drive path (e.g. H:\My Documents) is skipped as not available.
+# ===================================== #
+
+import argparse
+import concurrent.futures
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+from bootstrap import IsWindows
+from bootstrap import cache_dir
+from bootstrap import write_atomic
+from config_loader import ConfigError
+from config_loader import load_config
+
+IsVerbose = False # True
+
+ScriptRoot = os.path.dirname(os.path.abspath(__file__))
+SettingsFile = os.path.join(ScriptRoot, 'MyPSfiles.json')
+
+# Folders and files never synced (as for Compare-Directory, in Merge-MyPSfiles.ps1)
+ExcludeNames = ('.git', '.hg', '.svn', '__pycache__', '*.orig', '.DS_Store', 'Thumbs.db')
+BlockSize = 1024 * 1024
+DrivePattern = re.compile(r'[A-Za-z]:([\\/]|$)')
+
+# -- print_var prints a label and a variable's value, if IsVerbose
+def print_var(label, varname):
+    if IsVerbose:
+        print('< {} = \'{}\' >'.format(label, varname))
+
+# Region Settings
+
+# MyPSfiles.json, as config_loader validates it; the path tokens are expanded (and the paths normalized) as it is compiled
+SettingsSchema = dict({
+    'MergeTool?': dict({'Options?': str}),
+    'RepositorySets': [dict({'Name': str, 'SourcePath': 'path', 'TargetPath': 'path'})],
+})
+
+# -- load_settings returns (settings, {repository set name: [unresolved tokens in its paths]}) from the compiled MyPSfiles.json;
+#    raises ConfigError when the file is invalid, or names two repository sets the same
+def load_settings(path=SettingsFile):
+    settings, unresolved = load_config(path, SettingsSchema)
+    names = [repo['Name'] for repo in settings['RepositorySets']]
+    duplicates = sorted(set(name for name in names if names.count(name) > 1))
+    if duplicates:
+        raise ConfigError(path, ['/RepositorySets name {} is used more than once'.format(name) for name in duplicates])
+    repoUnresolved = dict()
+    for index, repo in enumerate(settings['RepositorySets']):
+        repoUnresolved[repo['Name']] = unresolved.get(('RepositorySets', index, 'SourcePath'), []) + unresolved.get(('RepositorySets', index, 'TargetPath'), [])
+    return settings, repoUnresolved
+
+# -- is_drive_path tells whether a (normalized) settings path names a Windows drive, e.g. H:\My Documents, which on
+#    another OS would otherwise be taken as a path relative to the current directory
+def is_drive_path(path):
+    return not IsWindows and DrivePattern.match(path) is not None
+
+# -- include_patterns returns the file name patterns of the MergeTool's '/f' option (e.g. '/f *.ps1;*.psm1'), or None for all files
+def include_patterns(settings):
+    options = settings.get('MergeTool', dict()).get('Options', '').split()
+    if '/f' in options and options.index('/f') + 1 < len(options):
+        return tuple(pattern for pattern in options[options.index('/f') + 1].split(';') if pattern)
+    return None
+
+#End Region
+
+# Region Tree index
+# scan_tree walks a tree with a pool of threads, one directory per task, so the stat calls of many directories overlap.
+# The digest index maps each relative path to [size, mtime_ns, sha256]; a digest is only trusted while the size and
+# mtime still match, and is computed again (in the pool) otherwise.
+
+# -- name_matcher compiles file name glob patterns into one regular expression match function (case-insensitive on Windows),
+#    as calling fnmatch per pattern per file dominates a scan of a large tree
+def name_matcher(patterns):
+    return re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns), re.IGNORECASE if IsWindows else 0).match
+
+is_excluded = name_matcher(ExcludeNames)
+
+# -- scan_directory returns ([(relative path, size, mtime_ns)], [sub-directory relative paths]) for one directory;
+#    includes is a name_matcher for the files to list, or None for all
+def scan_directory(root, relative, includes):
+    files = []
+    folders = []
+    with os.scandir(os.path.join(root, relative)) as entries:
+        for entry in entries:
+            if is_excluded(entry.name):
+                continue
+            path = os.path.join(relative, entry.name) if relative else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    folders.append(path)
+                elif entry.is_file():
+                    if includes is None or includes(entry.name):
+                        entryStat = entry.stat()
+                        files.append((path, entryStat.st_size, entryStat.st_mtime_ns))
+            except OSError:
+                continue
+    return files, folders
+
+# -- scan_tree returns {relative path: (size, mtime_ns)} for the files under root, scanning directories in parallel
+def scan_tree(root, includes, pool):
+    tree = dict()
+    running = set([pool.submit(scan_directory, root, '', includes)])
+    while running:
+        done, running = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            try:
+                files, folders = future.result()
+            except OSError:
+                continue
+            for path, size, mtime in files:
+                tree[path] = (size, mtime)
+            for folder in folders:
+                running.add(pool.submit(scan_directory, root, folder, includes))
+    return tree
+
+# -- index_file returns the digest index file for a tree root
+def index_file(root):
+    return cache_dir().joinpath('sync_psfiles', hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()[0:16] + '.json')
+
+# -- load_index returns the digest index of a tree root ({relative path: [size, mtime_ns, digest]})
+def load_index(root):
+    try:
+        with open(str(index_file(root)), encoding='utf-8') as indexFile:
+            index = json.load(indexFile)
+        if index.get('root') == os.path.abspath(root):
+            return index['files']
+    except (OSError, ValueError, KeyError):
+        pass
+    return dict()
+
+# -- save_index writes the digest index of a tree root, for the files still present in tree
+def save_index(root, index, tree):
+    files = dict((path, entry) for path, entry in index.items() if path in tree and tuple(entry[0:2]) == tree[path])
+    try:
+        write_atomic(index_file(root), json.dumps(dict({'root': os.path.abspath(root), 'files': files})))
+    except OSError:
+        pass
+
+# -- file_digest returns the sha256 hex digest of a file, or None when it cannot be read
+def file_digest(path):
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as hashed:
+            for block in iter(lambda: hashed.read(BlockSize), b''):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+# -- digests returns {relative path: digest} for the given paths of a tree, from the index when the size and mtime
+#    still match, hashing the rest in the pool (and recording them in the index); also returns how many were hashed
+def digests(root, paths, tree, index, pool):
+    result = dict()
+    stale = []
+    for path in paths:
+        entry = index.get(path)
+        if entry and tuple(entry[0:2]) == tree[path]:
+            result[path] = entry[2]
+        else:
+            stale.append(path)
+    for path, digest in zip(stale, pool.map(lambda path: file_digest(os.path.join(root, path)), stale)):
+        result[path] = digest
+        if digest is not None:
+            index[path] = [tree[path][0], tree[path][1], digest]
+    return result, len(stale)
+
+#End Region
+
+# Region Sync
+
+# -- copy_file copies source to target (content and mtime), via a temp file beside the target, so a reader never sees a partial copy
+def copy_file(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmpName = os.path.join(os.path.dirname(target), '.{}.sync.tmp'.format(os.path.basename(target)))
+    try:
+        shutil.copy2(source, tmpName)
+        os.replace(tmpName, target)
+    except BaseException:
+        if os.path.exists(tmpName):
+            os.unlink(tmpName)
+        raise
+
+# -- plan_sync compares the source and target trees; returns {'copy': [...], 'conflict': [...], 'error': [...], 'unchanged': n, 'hashed': n}
+def plan_sync(sourcePath, targetPath, sourceTree, targetTree, sourceIndex, targetIndex, force, pool):
+    plan = dict({'copy': [], 'conflict': [], 'error': [], 'unchanged': 0, 'hashed': 0})
+    compare = []
+    for path, (size, mtime) in sourceTree.items():
+        target = targetTree.get(path)
+        if target is None:
+            plan['copy'].append(path)
+        elif target[0] != size:
+            plan['copy' if force or mtime > target[1] else 'conflict'].append(path)
+        elif target[1] == mtime:
+            plan['unchanged'] += 1
+        else:
+            compare.append(path)
+
+    # same size, different mtime: only the digests tell whether the content differs
+    sourceDigests, sourceHashed = digests(sourcePath, compare, sourceTree, sourceIndex, pool)
+    targetDigests, targetHashed = digests(targetPath, compare, targetTree, targetIndex, pool)
+    plan['hashed'] = sourceHashed + targetHashed
+    for path in compare:
+        if sourceDigests[path] is None or targetDigests[path] is None:
+            plan['error'].append('{}: unreadable'.format(path))
+        elif sourceDigests[path] == targetDigests[path]:
+            plan['unchanged'] += 1
+        elif force or sourceTree[path][1] > targetTree[path][1]:
+            plan['copy'].append(path)
+        else:
+            plan['conflict'].append(path)
+    plan['copy'].sort()
+    plan['conflict'].sort()
+    return plan
+
+# -- sync_set syncs one repository set; returns a report dictionary
+def sync_set(repo, unresolved, includes, pool, dryRun=False, force=False):
+    started = time.perf_counter()
+    sourcePath = repo['SourcePath']
+    targetPath = repo['TargetPath']
+    report = dict({'name': repo['Name'], 'source': sourcePath, 'target': targetPath, 'copied': [], 'conflicts': [], 'errors': [],
+                   'unchanged': 0, 'hashed': 0, 'skipped': None})
+    drivePaths = [path for path in (sourcePath, targetPath) if is_drive_path(path)]
+    if unresolved:
+        report['skipped'] = 'unresolved {}'.format(', '.join(unresolved))
+    elif drivePaths:
+        report['skipped'] = 'Windows drive not available on this OS ({})'.format(', '.join(drivePaths))
+    elif not os.path.isdir(sourcePath):
+        report['skipped'] = 'source is not available'
+    elif not os.path.isdir(os.path.dirname(targetPath)):
+        report['skipped'] = 'target (parent) is not available'
+    if report['skipped']:
+        return report
+
+    sourceTree = scan_tree(sourcePath, includes, pool)
+    targetTree = scan_tree(targetPath, includes, pool) if os.path.isdir(targetPath) else dict()
+    sourceIndex = load_index(sourcePath)
+    targetIndex = load_index(targetPath)
+    plan = plan_sync(sourcePath, targetPath, sourceTree, targetTree, sourceIndex, targetIndex, force, pool)
+    report['unchanged'] = plan['unchanged']
+    report['hashed'] = plan['hashed']
+    report['conflicts'] = plan['conflict']
+    report['errors'] = plan['error']
+
+    if dryRun:
+        report['copied'] = plan['copy']
+    else:
+        copies = [pool.submit(copy_file, os.path.join(sourcePath, path), os.path.join(targetPath, path)) for path in plan['copy']]
+        for path, copy in zip(plan['copy'], copies):
+            try:
+                copy.result()
+                report['copied'].append(path)
+                # copy2 preserves the mtime, so the target now has the source's size, mtime and digest
+                targetTree[path] = sourceTree[path]
+                if path in sourceIndex:
+                    targetIndex[path] = list(sourceIndex[path])
+            except OSError as err:
+                report['errors'].append('{}: {}'.format(path, err))
+    save_index(sourcePath, sourceIndex, sourceTree)
+    save_index(targetPath, targetIndex, targetTree)
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+# -- print_report prints one repository set's sync report
+def print_report(report, dryRun):
+    if report['skipped']:
+        print(' {}: skipped, {} ({} -> {})'.format(report['name'], report['skipped'], report['source'], report['target']))
+        return
+    print(' {}: {} {}, {} unchanged, {} hashed, {} conflicts, {} errors, in {:.2f} s'.format(report['name'], len(report['copied']),
+                                                                                            'to copy' if dryRun else 'copied', report['unchanged'],
+                                                                                            report['hashed'], len(report['conflicts']), len(report['errors']),
+                                                                                            report['seconds']))
+    for path in report['copied'] if (IsVerbose or dryRun) else []:
+        print('   {} {}'.format('would copy' if dryRun else 'copied', path))
+    for path in report['conflicts']:
+        print('   conflict (target is newer; use --force to overwrite): {}'.format(path))
+    for error in report['errors']:
+        print('   error: {}'.format(error))
+
+#End Region
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sync the RepositorySets of MyPSfiles.json, from each SourcePath to its TargetPath')
+    parser.add_argument('names', nargs='*', metavar='NAME', help='repository sets to sync (default: all)')
+    parser.add_argument('--settings', default=SettingsFile, help='settings file (default: %(default)s)')
+    parser.add_argument('--dry-run', action='store_true', help='report what would be copied, without copying')
+    parser.add_argument('--force', action='store_true', help='overwrite target files that are newer than the source')
+    parser.add_argument('--workers', type=int, default=8, help='threads to scan, hash and copy with (default: %(default)s)')
+    parser.add_argument('--list', action='store_true', help='list the repository sets, with their expanded paths')
+    args = parser.parse_args()
+
+    try:
+        settings, unresolved = load_settings(args.settings)
+    except (ConfigError, OSError) as err:
+        parser.error(str(err))
+    repositorySets = settings.get('RepositorySets', [])
+    unknown = set(args.names) - set(repo['Name'] for repo in repositorySets)
+    if unknown:
+        parser.error('unknown repository set: {}'.format(', '.join(sorted(unknown))))
+    selected = [repo for repo in repositorySets if not args.names or repo['Name'] in args.names]
+
+    if args.list:
+        for repo in selected:
+            print(' {}: {} -> {}'.format(repo['Name'], repo['SourcePath'], repo['TargetPath']))
+        sys.exit(0)
+
+    print('\n Start {}: {}'.format(os.path.basename(__file__), time.strftime('%Y %m %d %H:%M:%S %Z', time.localtime())))
+    failed = False
+    patterns = include_patterns(settings)
+    print_var('includes', patterns)
+    includes = name_matcher(patterns) if patterns else None
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        for repo in selected:
+            report = sync_set(repo, unresolved[repo['Name']], includes, pool, dryRun=args.dry_run, force=args.force)
+            print_report(report, args.dry_run)
+            failed = failed or bool(report['conflicts'] or report['errors'])
+    print(' End: {}\n'.format(time.strftime('%Y %m %d %H:%M:%S %Z', time.localtime())))
+    sys.exit(1 if failed else 0)
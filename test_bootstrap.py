@@ -0,0 +1,35 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : test_bootstrap.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : pytest tests for bootstrap.py: the host name check of the compiled snapshots
+# ===================================== #
+
+import socket
+
+import bootstrap
+
+# -- compiled_snapshot compiles the snapshots into tmp_path; returns (sh text, ps1 text)
+def compiled_snapshot(tmp_path):
+    shPath, psPath = bootstrap.compile_snapshot(bootstrap.get_fact('HostFacts'), tmp_path)
+    with open(shPath, encoding='utf-8') as shFile, open(psPath, encoding='utf-8') as psFile:
+        return shFile.read(), psFile.read()
+
+def test_node_name_is_gethostname():
+    # [System.Net.Dns]::GetHostName() in the ps1 snapshot, and $HOSTNAME / uname -n in the sh one, read gethostname()
+    assert bootstrap.node_name() == socket.gethostname()
+
+def test_ps_snapshot_checks_the_same_host_name_source(tmp_path):
+    shText, psText = compiled_snapshot(tmp_path)
+    assert '$bsNode = {}\n'.format(bootstrap.ps_quote(bootstrap.node_name())) in psText
+    assert '$bsStale = [System.Net.Dns]::GetHostName() -ne $bsNode' in psText
+    assert 'MachineName' not in psText
+    assert '_bs_node={}\n'.format(bootstrap.sh_quote(bootstrap.node_name())) in shText
+
+def test_compiled_fresh(tmp_path):
+    compiled_snapshot(tmp_path)
+    assert bootstrap.compiled_fresh(tmp_path.joinpath('hostfacts.sh'))
+    assert bootstrap.compiled_fresh(tmp_path.joinpath('hostfacts.ps1'))
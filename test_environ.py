@@ -0,0 +1,31 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : test_environ.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : pytest tests for environ.py: --filter, given before or after the command
+# ===================================== #
+
+import os
+import subprocess
+import sys
+
+ScriptRoot = os.path.dirname(os.path.abspath(__file__))
+
+# -- run_environ runs environ.py with arguments, in an environment of known variables; returns the variable names printed
+def run_environ(*arguments):
+    env = dict({'PATH': os.environ.get('PATH', ''), 'HOME': ScriptRoot, 'HOMEBREW_X': '1', 'TEST_ONLY': '1'})
+    result = subprocess.run([sys.executable, os.path.join(ScriptRoot, 'environ.py')] + list(arguments), env=env,
+                            stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    return sorted(line.split(' = ')[0].strip() for line in result.stdout.splitlines() if ' = ' in line)
+
+def test_filter_before_command():
+    assert run_environ('--filter', 'HOME*', 'show') == ['HOME', 'HOMEBREW_X']
+
+def test_filter_after_command():
+    assert run_environ('show', '--filter', 'HOME*') == ['HOME', 'HOMEBREW_X']
+
+def test_filters_before_and_after_command_are_merged():
+    assert run_environ('--filter', 'HOME', 'show', '--filter', 'TEST_*') == ['HOME', 'TEST_ONLY']
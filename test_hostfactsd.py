@@ -0,0 +1,30 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : test_hostfactsd.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : pytest tests for hostfactsd.py: claiming the socket path
+# ===================================== #
+
+import socket
+
+import pytest
+
+import hostfactsd
+
+def test_claim_socket_keeps_a_regular_file(tmp_path):
+    path = tmp_path.joinpath('notasock')
+    path.write_text('keep me')
+    with pytest.raises(FileExistsError, match='not a socket'):
+        hostfactsd.claim_socket(str(path))
+    assert path.read_text() == 'keep me'
+
+def test_claim_socket_removes_a_stale_socket(tmp_path):
+    path = tmp_path.joinpath('stale.sock')
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(path))
+    stale.close()
+    hostfactsd.claim_socket(str(path))
+    assert not path.exists()
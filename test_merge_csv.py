@@ -0,0 +1,36 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : test_merge_csv.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : pytest tests for merge_csv.py: inputs that cannot be merged are reported with their file and line
+# ===================================== #
+
+import io
+
+import pytest
+
+import merge_csv
+
+@pytest.mark.parametrize('keys', [(), ('id',)])
+def test_row_wider_than_header(tmp_path, keys):
+    path = tmp_path.joinpath('wide.csv')
+    path.write_text('id,name\n1,a\n2,b,extra\n', encoding='utf-8')
+    with pytest.raises(merge_csv.InputError, match=r'wide\.csv, line 3: 3 fields, but the header has 2'):
+        merge_csv.merge_csv([str(path)], io.StringIO(), keys, workers=1)
+
+@pytest.mark.parametrize('keys', [(), ('id',)])
+def test_malformed_csv(tmp_path, keys):
+    path = tmp_path.joinpath('big.csv')
+    path.write_text('id,name\n1,"{}"\n'.format('x' * 200000), encoding='utf-8')
+    with pytest.raises(merge_csv.InputError, match=r'big\.csv, line 2: field larger than field limit'):
+        merge_csv.merge_csv([str(path)], io.StringIO(), keys, workers=1)
+
+def test_short_row_is_padded(tmp_path):
+    path = tmp_path.joinpath('short.csv')
+    path.write_text('id,name\n1,a\n2\n', encoding='utf-8')
+    output = io.StringIO()
+    merge_csv.merge_csv([str(path)], output, ('id',), workers=1)
+    assert output.getvalue().splitlines() == ['"id","name"', '"1","a"', '"2",""']
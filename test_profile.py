@@ -0,0 +1,26 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : test_profile.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : pytest tests for profile.py, as the $PYTHONSTARTUP file of an interactive python
+# ===================================== #
+
+import os
+import subprocess
+import sys
+
+ScriptRoot = os.path.dirname(os.path.abspath(__file__))
+
+def test_startup_file_from_another_directory(tmp_path):
+    env = dict(os.environ)
+    env.update({'HOME': str(tmp_path), 'BOOTSTRAP_CACHE_DIR': str(tmp_path.joinpath('cache')),
+                'PYTHONSTARTUP': os.path.join(ScriptRoot, 'profile.py')})
+    env.pop('PYTHONPATH', None)
+    result = subprocess.run([sys.executable, '-i'], cwd=str(tmp_path), env=env, input="print('cd' in globals())\n",
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, timeout=60)
+    assert 'ModuleNotFoundError' not in result.stdout
+    assert ' # Ready in ' in result.stdout
+    assert 'True' in result.stdout
@@ -0,0 +1,19 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : test_show_sysconfig.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : pytest tests for show_sysconfig.py: comparing interpreters
+# ===================================== #
+
+import os
+
+import show_sysconfig
+
+def test_dangling_interpreter_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setenv('BOOTSTRAP_CACHE_DIR', str(tmp_path.joinpath('cache')))
+    dangling = tmp_path.joinpath('python3')
+    os.symlink(str(tmp_path.joinpath('removed-venv', 'bin', 'python3')), str(dangling))
+    assert show_sysconfig.collect_interpreters({str(dangling): str(dangling)}) == dict()
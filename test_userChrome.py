@@ -0,0 +1,61 @@
+#!/usr/local/bin/python3
+# ===================================== #
+# NAME      : test_userChrome.py
+# LANGUAGE  : Python
+# VERSION   : 3
+# AUTHOR    : Bryan Dady
+# UPDATED   : 10/18/2026 - Initial version
+# INTRO     : pytest tests for userChrome.py --all-users: a customized userChrome.css is kept, unless --force
+# ===================================== #
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+ScriptRoot = os.path.dirname(os.path.abspath(__file__))
+
+# -- user_profile creates a home under root with one Firefox profile (Linux layout); returns its chrome folder
+def user_profile(root, user):
+    firefoxRoot = root.joinpath(user, '.mozilla', 'firefox')
+    chromePath = firefoxRoot.joinpath('test.default', 'chrome')
+    chromePath.mkdir(parents=True)
+    firefoxRoot.joinpath('profiles.ini').write_text('[Profile0]\nName=default\nIsRelative=1\nPath=test.default\nDefault=1\n', encoding='utf-8')
+    return chromePath
+
+# -- deploy runs userChrome.py --all-users for the homes under root, with css as the stylesheet; returns its output
+def deploy(tmp_path, root, css, *arguments):
+    env = dict(os.environ)
+    env.update({'HOME': str(tmp_path), 'BOOTSTRAP_CACHE_DIR': str(tmp_path.joinpath('cache'))})
+    result = subprocess.run([sys.executable, os.path.join(ScriptRoot, 'userChrome.py'), '--all-users', '--home-root', str(root), '--css', str(css)] + list(arguments),
+                            env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, timeout=60)
+    assert result.returncode == 0, result.stdout
+    return result.stdout
+
+@pytest.mark.skipif(sys.platform == "win32", reason='Linux profile layout')
+def test_customized_target_is_kept_unless_force(tmp_path):
+    root = tmp_path.joinpath('home')
+    chromePath = user_profile(root, 'alice')
+    target = chromePath.joinpath('userChrome.css')
+    target.write_text('/* hand-written */\n', encoding='utf-8')
+    css = tmp_path.joinpath('deployed.css')
+    css.write_text('/* deployed 1 */\n', encoding='utf-8')
+
+    output = deploy(tmp_path, root, css)
+    assert ' kept ' in output
+    assert target.read_text(encoding='utf-8') == '/* hand-written */\n'
+    assert not chromePath.joinpath('userChrome.css.bak').exists()
+
+    output = deploy(tmp_path, root, css, '--force')
+    assert ' replaced ' in output
+    assert target.read_text(encoding='utf-8') == '/* deployed 1 */\n'
+    assert chromePath.joinpath('userChrome.css.bak').read_text(encoding='utf-8') == '/* hand-written */\n'
+
+    # a file this script deployed is simply updated
+    chromePath.joinpath('userChrome.css.bak').unlink()
+    css.write_text('/* deployed 2 */\n', encoding='utf-8')
+    output = deploy(tmp_path, root, css)
+    assert ' written ' in output
+    assert target.read_text(encoding='utf-8') == '/* deployed 2 */\n'
+    assert not chromePath.joinpath('userChrome.css.bak').exists()
@@ -4,7 +4,7 @@
 # LANGUAGE  : Python
 # VERSION   : 3
 # AUTHOR    : Bryan Dady
-# UPDATED   : 11/4/2019 - Enhance IsVerbose functionality, consistent with that of bootstrap.py
+# UPDATED   : 10/18/2026 - Add --watch, to rebuild the stylesheets when a fragment changes
 # INTRO     : Create and/or customize userChrome.css
 #             Firefox’s userChrome.css file is a cascading style sheet (CSS) that applies to Firefox’s user interface.
 #             Creating and customizing it allows you to change the appearance and layout of everything surrounding the webpage itself.
@@ -23,15 +23,24 @@ from bootstrap import hostOSCaption
 from bootstrap import IsWindows
 from bootstrap import IsLinux
 from bootstrap import IsMacOS
+from bootstrap import cache_dir
+from bootstrap import write_atomic
+from startup_trace import span
 
+import concurrent.futures
+import configparser
+import errno
+import hashlib
+import json
 import os
 #from os import path
 from pathlib import Path
 from pathlib import PurePath
-from pathlib import PosixPath
 import sys
+import threading
 import time
 import re
+import stat
 
 IsVerbose = False # True
 SleepTime = 5
@@ -49,6 +58,18 @@ def print_var(label, varname):
 
 # -- RFE!: create a similar function for dev/test, which takes 1 arg of a dictionary, and prints the keys and values
 
+parser = argparse.ArgumentParser(description='Create and/or customize userChrome.css in Firefox profiles')
+parser.add_argument('--all-users', action='store_true', help='apply the stylesheet to every profile of every user under the home roots')
+parser.add_argument('--home-root', action='append', type=Path, help='parent folder of user home directories, for --all-users (repeatable; default: /home, /Users or C:\\Users)')
+parser.add_argument('--workers', type=int, default=min(32, (os.cpu_count() or 1) * 4), help='concurrent profile writers, for --all-users (default: %(default)s)')
+parser.add_argument('--css', type=Path, help='stylesheet to deploy as userChrome.css, for --all-users (default: built from the fragments)')
+parser.add_argument('--fragments', type=Path, default=Path(__file__).resolve().parent.joinpath('chrome.d'), help='folder of userChrome/ and userContent/ CSS fragments (default: %(default)s)')
+parser.add_argument('--force', action='store_true', help='replace a userChrome.css or userContent.css that was not written by this script (it is kept as .bak)')
+parser.add_argument('--watch', action='store_true', help='keep running, and rebuild the stylesheets whenever a fragment changes')
+parser.add_argument('--interval', type=float, default=0.25, help='polling interval in seconds, for --watch without the watchdog package (default: %(default)s)')
+parser.add_argument('--debounce', type=float, default=0.03, help='quiet period in seconds that ends a burst of changes, for --watch (default: %(default)s)')
+args = parser.parse_args()
+
 # userChrome Pseudo-code
 
 print_var('hostOS', hostOS)
@@ -58,48 +79,575 @@ print_var('hostOS', hostOS)
 # -- 1. Detect/derive path to user's Firefox profile folder / example from Windows:  %APPDATA%\Mozilla\Firefox\Profiles\0y8i0p8f.default
 # -- confirm path is valid, with APPDATA derived from system/shell environment variable e.g. %APPDATA%\Mozilla\Firefox\Profiles\
 # -- Ideally, there's only one subfolder (e.g. '0y8i0p8f.default') -- set it as var $profileRoot
+# -- profiles.ini (and installs.ini) name the default profile directly; scanning the profile folders is only the fallback
+
+# -- firefox_root returns (firefoxRoot, profileBase, regExp) for the given home directory:
+#    firefoxRoot holds profiles.ini / installs.ini, profileBase holds the profile folders, and regExp matches a default profile folder name
+def firefox_root(home):
+    home = Path(home)
+    if IsWindows:
+        # On Windows Firefox\Profiles reside under APPDATA = os.environ['APPDATA']
+        if Path(os.environ.get('USERPROFILE', '')) == home and 'APPDATA' in os.environ:
+            firefoxRoot = Path(os.environ['APPDATA']).joinpath('Mozilla', 'Firefox')
+        else:
+            firefoxRoot = home.joinpath('AppData', 'Roaming', 'Mozilla', 'Firefox')
+        # Also, it seems the default Profile folder name syntax is different across platforms
+        return firefoxRoot, firefoxRoot.joinpath('Profiles'), r'\S+\.default$'
+
+    if IsMacOS:
+        # On macOS Firefox\Profiles reside under ~/Library/Application Support/Firefox/Profiles
+        firefoxRoot = home.joinpath('Library', 'Application Support', 'Firefox')
+        return firefoxRoot, firefoxRoot.joinpath('Profiles'), r'\S+\.default(-\S+)?$'
 
-if IsWindows:
-    # On Windows Firefox\Profiles reside under APPDATA = os.environ['APPDATA']
-    profileBase = os.path.expandvars('%APPDATA%\Mozilla\Firefox\Profiles')
-    # Also, it seems the default Profile folder name syntax is different across platforms
-    regExp = '\S+\.default$'
-
-if IsMacOS:
-    # On macOS Firefox\Profiles reside under ~/Library/Application Support/Firefox/
-    #profileBase = os.path.expandvars('~/Library/Application Support/Firefox/')
-    profileBase = PosixPath('~/Library/Application Support/Firefox/')
-    profileBase.expanduser()
-    # Also, it seems the default Profile folder name syntax is different across platforms
-    regExp = '\S+\.default-\d+'
-
-if IsLinux:
     # On Linux Firefox\Profiles reside under ~/.mozilla/firefox
-    profileBase = PosixPath('~/.mozilla/firefox')
-    profileBase.expanduser()
-    #profileBase = os.path.expandvars('~/.mozilla/firefox')
-    # Also, it seems the default Profile folder name syntax is different across platforms
-    regExp = '\S+\.default'
+    firefoxRoot = home.joinpath('.mozilla', 'firefox')
+    return firefoxRoot, firefoxRoot, r'\S+\.default'
 
-print_var('profileBase', profileBase)
+# -- read_ini parses an ini file, keeping the (case sensitive) key names Firefox writes; returns None when the file is absent or invalid
+def read_ini(iniPath):
+    parser = configparser.RawConfigParser(strict=False, interpolation=None)
+    parser.optionxform = str
+    try:
+        if not parser.read(str(iniPath), encoding='utf-8'):
+            return None
+    except configparser.Error:
+        return None
+    return parser
+
+# -- ini_profile_path resolves a profiles.ini / installs.ini Path value; relative paths use '/' and are relative to firefoxRoot
+def ini_profile_path(firefoxRoot, path, isRelative=True):
+    if isRelative:
+        return firefoxRoot.joinpath(*path.split('/'))
+    return Path(path)
+
+# -- profiles_from_ini returns (default profile, all profiles) as listed by profiles.ini and installs.ini
+#    The default is, in order of preference: the (locked) per-install default, the profile marked Default=1, the only profile
+def profiles_from_ini(firefoxRoot):
+    profiles = []
+    legacyDefault = None
+    installDefaults = []
+
+    profilesIni = read_ini(firefoxRoot.joinpath('profiles.ini'))
+    if profilesIni:
+        for section in profilesIni.sections():
+            if section.startswith('Profile') and profilesIni.has_option(section, 'Path'):
+                profile = ini_profile_path(firefoxRoot, profilesIni.get(section, 'Path'), profilesIni.get(section, 'IsRelative', fallback='1') == '1')
+                profiles.append(profile)
+                if profilesIni.get(section, 'Default', fallback='0') == '1':
+                    legacyDefault = profile
+            elif section.startswith('Install') and profilesIni.has_option(section, 'Default'):
+                installDefaults.append((profilesIni.get(section, 'Locked', fallback='0') == '1', profilesIni.get(section, 'Default')))
+
+    # installs.ini predates the [Install...] sections in profiles.ini, and lists the same per-install defaults
+    installsIni = read_ini(firefoxRoot.joinpath('installs.ini'))
+    if installsIni:
+        for section in installsIni.sections():
+            if installsIni.has_option(section, 'Default'):
+                installDefaults.append((installsIni.get(section, 'Locked', fallback='0') == '1', installsIni.get(section, 'Default')))
+
+    # Install defaults are relative paths, unless they are absolute
+    for locked, path in sorted(installDefaults, key=lambda item: not item[0]):
+        profile = ini_profile_path(firefoxRoot, path, not os.path.isabs(path))
+        if profile.is_dir():
+            return profile, profiles
+
+    if legacyDefault and legacyDefault.is_dir():
+        return legacyDefault, profiles
+    existing = [profile for profile in profiles if profile.is_dir()]
+    if len(existing) == 1:
+        return existing[0], profiles
+    return None, profiles
+
+# -- profiles_from_scan is the fallback, when there is no usable profiles.ini: (first matching profile folder, all profile folders)
+def profiles_from_scan(profileBase, regExp):
+    try:
+        children = sorted(child for child in profileBase.iterdir() if child.is_dir())
+    except OSError:
+        return None, []
+    profiles = []
+    for child in children:
+        print_var('child', child)
+        # evaluate the child directory name via RegExp (re)
+        if re.search(regExp, PurePath(child).name):
+            profiles.append(child)
+    # e.g. prefer 'xxxxxxxx.default-release' over the empty 'xxxxxxxx.default' a new Firefox install leaves behind
+    profiles.sort(key=lambda profile: not profile.name.endswith('-release'))
+    return (profiles[0] if profiles else None), profiles
+
+# -- discovery_stamp records the mtimes of the files and folder discovery results derive from
+def discovery_stamp(firefoxRoot, profileBase):
+    stamp = dict()
+    for source in (firefoxRoot.joinpath('profiles.ini'), firefoxRoot.joinpath('installs.ini'), profileBase):
+        try:
+            stamp[str(source)] = source.stat().st_mtime_ns
+        except OSError:
+            stamp[str(source)] = None
+    return stamp
+
+# -- load_discovery_cache / save_discovery_cache read and write the per-firefoxRoot discovery results
+def load_discovery_cache():
+    try:
+        return json.loads(cache_dir().joinpath('firefox-profiles.json').read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return dict()
+
+def save_discovery_cache(cache):
+    try:
+        write_atomic(cache_dir().joinpath('firefox-profiles.json'), json.dumps(cache, indent=1))
+    except OSError:
+        pass
+
+# -- find_profiles returns (default profile, all profiles) under firefoxRoot, cached (in the cache dictionary) against the
+#    mtimes of the ini files and the profile folder (so a new or removed profile folder is also noticed)
+def find_profiles(firefoxRoot, profileBase, regExp, cache, refresh=False):
+    stamp = discovery_stamp(firefoxRoot, profileBase)
+    entry = cache.get(str(firefoxRoot))
+    if not refresh and entry and entry.get('stamp') == stamp:
+        default = Path(entry['default']) if entry['default'] else None
+        if default is None or default.is_dir():
+            return default, [Path(profile) for profile in entry['profiles']]
+
+    default, profiles = profiles_from_ini(firefoxRoot)
+    if default is None:
+        default, scanned = profiles_from_scan(profileBase, regExp)
+        profiles = profiles or scanned
+
+    cache[str(firefoxRoot)] = dict({'stamp': stamp, 'default': str(default) if default else None, 'profiles': [str(profile) for profile in profiles]})
+    return default, profiles
+
+# Region Fragments
+# userChrome.css and userContent.css are assembled from the CSS fragments in chrome.d/userChrome/ and chrome.d/userContent/
+# (next to this script), in file name order, e.g. 00-header.css, 10-tabs.css, 20-toolbar.macos.css
+# A fragment named <name>.windows.css, <name>.macos.css or <name>.linux.css is only included on that platform.
+# The (size, mtime, sha256) of every fragment and output file is kept in a build manifest, so an unchanged fragment is not
+# re-read, and an output file is only written when its content actually changes; every write means restarting Firefox.
+ChromeFiles = ('userChrome.css', 'userContent.css')
+PlatformTags = ('windows', 'macos', 'linux')
+
+# -- platform_tag returns this host's fragment platform tag
+def platform_tag():
+    if IsWindows:
+        return 'windows'
+    if IsMacOS:
+        return 'macos'
+    return 'linux'
+
+# -- select_fragments returns the fragments in fragmentDir that apply to this platform, in order
+def select_fragments(fragmentDir):
+    fragments = []
+    try:
+        candidates = sorted(fragment for fragment in fragmentDir.iterdir() if fragment.suffix == '.css' and fragment.is_file())
+    except OSError:
+        return fragments
+    for fragment in candidates:
+        nameParts = fragment.name.split('.')
+        if len(nameParts) > 2 and nameParts[-2] in PlatformTags and nameParts[-2] != platform_tag():
+            continue
+        fragments.append(fragment)
+    return fragments
+
+# -- fragment_state returns [name, size, mtime, sha256] for each fragment, reusing the sha256 from known when the stat matches
+def fragment_state(fragments, known):
+    knownByName = dict((entry[0], entry) for entry in known)
+    state = []
+    for fragment in fragments:
+        fragmentStat = fragment.stat()
+        entry = knownByName.get(fragment.name)
+        if entry and entry[1:3] == [fragmentStat.st_size, fragmentStat.st_mtime_ns]:
+            state.append(entry)
+        else:
+            state.append([fragment.name, fragmentStat.st_size, fragmentStat.st_mtime_ns, file_digest(fragment)])
+    return state
+
+# -- build_stylesheet concatenates fragments into the content of one output file
+def build_stylesheet(fragments):
+    parts = []
+    for fragment in fragments:
+        content = fragment.read_text(encoding='utf-8')
+        parts.append('/* -- {} -- */\n{}{}'.format(fragment.name, content, '' if content.endswith('\n') else '\n'))
+    return '\n'.join(parts).encode('utf-8')
+
+# -- build_stylesheets returns {file name: content}, for each ChromeFiles entry that has fragments
+def build_stylesheets(fragmentsRoot):
+    stylesheets = dict()
+    for fileName in ChromeFiles:
+        fragments = select_fragments(fragmentsRoot.joinpath(Path(fileName).stem))
+        if fragments:
+            stylesheets[fileName] = build_stylesheet(fragments)
+    return stylesheets
+
+# -- load_build_manifest / save_build_manifest read and write the fragment and output state, per output file
+def load_build_manifest():
+    try:
+        return json.loads(cache_dir().joinpath('userChrome-build.json').read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return dict()
+
+def save_build_manifest(manifest):
+    manifestFile = cache_dir().joinpath('userChrome-build.json')
+    data = json.dumps(manifest, indent=1)
+    try:
+        if manifestFile.read_text(encoding='utf-8') == data:
+            return
+    except OSError:
+        pass
+    try:
+        write_atomic(manifestFile, data)
+    except OSError:
+        pass
+
+# -- guard_target applies the policy for a chrome file about to be (re)written, whose digest is targetHash (None when it is
+#    absent) and was recordedHash when this script last wrote it (None when it never did): a file this script did not write,
+#    or that was edited since, is 'kept', unless force, when it is first renamed to <name>.bak ('backed up'); otherwise
+#    'write'. name is relative to the folder dirFd, when given
+def guard_target(name, targetHash, recordedHash, force, dirFd=None):
+    if targetHash is None or targetHash == recordedHash:
+        return 'write'
+    if not force:
+        return 'kept'
+    os.replace(name, name + '.bak', src_dir_fd=dirFd, dst_dir_fd=dirFd)
+    return 'backed up'
+
+# -- build_chrome_file (re)builds target from the fragments in fragmentDir, only when a fragment or the target itself changed
+#    since the last build; returns 'written', 'unchanged', 'no fragments' or 'kept'. A target this script did not write (it
+#    is not in the manifest, or was edited since) is kept, unless force, when it is first backed up as <target>.bak
+def build_chrome_file(target, fragmentDir, manifest, force=False):
+    fragments = select_fragments(fragmentDir)
+    if not fragments:
+        return 'no fragments'
+    entry = manifest.get(str(target), dict())
+    state = fragment_state(fragments, entry.get('fragments', []))
+    try:
+        targetStat = target.stat()
+        targetState = [targetStat.st_size, targetStat.st_mtime_ns]
+    except OSError:
+        targetState = None
+    if state == entry.get('fragments') and targetState is not None and targetState == entry.get('output', [])[0:2]:
+        return 'unchanged'
+
+    data = build_stylesheet(fragments)
+    dataHash = hashlib.sha256(data).hexdigest()
+    result = 'unchanged'
+    targetHash = None
+    if targetState is not None:
+        targetHash = entry['output'][2] if targetState == entry.get('output', [])[0:2] else file_digest(target)
+    if targetHash != dataHash:
+        guard = guard_target(str(target), targetHash, entry.get('output', [None] * 3)[2], force)
+        if guard == 'kept':
+            return 'kept'
+        if guard == 'backed up':
+            print(' {:<12} {}'.format('backed up', target.with_name(target.name + '.bak')))
+        write_atomic(target, data, mode=0o644)
+        result = 'written'
+    targetStat = target.stat()
+    manifest[str(target)] = dict({'fragments': state, 'output': [targetStat.st_size, targetStat.st_mtime_ns, dataHash]})
+    return result
+
+#End Region
+
+# Region Watch
+# `userChrome.py --watch` resolves the profile once, then rebuilds the stylesheets whenever a fragment changes. Changes are
+# detected with the watchdog package (https://pypi.org/project/watchdog/), when it is installed, or else by polling, which
+# stats only the fragment folders and the fragments already in them. A burst of edits (e.g. an editor's save) is debounced
+# into a single rebuild.
+try:
+    import watchdog.events
+    import watchdog.observers
+except ImportError:
+    watchdog = None
+
+# -- watch_state returns {path: (mtime, size)} for the fragment folders and their CSS files
+def watch_state(fragmentsRoot):
+    state = dict()
+    for fileName in ChromeFiles:
+        fragmentDir = fragmentsRoot.joinpath(Path(fileName).stem)
+        try:
+            # a fragment folder's mtime changes when a fragment is added, removed or renamed (or replaced by an editor)
+            dirStat = fragmentDir.stat()
+        except OSError:
+            continue
+        state[str(fragmentDir)] = (dirStat.st_mtime_ns, dirStat.st_size)
+        for fragment in select_fragments(fragmentDir):
+            try:
+                fragmentStat = fragment.stat()
+            except OSError:
+                continue
+            state[str(fragment)] = (fragmentStat.st_mtime_ns, fragmentStat.st_size)
+    return state
 
-profilePath = Path(profileBase)
-
-# Iterate subdirectories')
-for child in profilePath.iterdir():
-    print_var('child', child)
-    folderName = PurePath(child).name
-    print_var('folderName', folderName)
-    # evaluate the child directory name via RegExp (re)
-    if re.search(regExp, folderName):
-        profileRoot = Path(child)
-        print_var('profileRoot', profileRoot)
+# -- rebuild rebuilds each ChromeFiles entry in chromePath, and prints what was written
+def rebuild(chromePath, fragmentsRoot, manifest, force=False):
+    started = time.perf_counter()
+    for fileName in ChromeFiles:
+        try:
+            result = build_chrome_file(chromePath.joinpath(fileName), fragmentsRoot.joinpath(Path(fileName).stem), manifest, force)
+        except OSError as err:
+            result = 'error: {}'.format(err)
+        if result != 'unchanged':
+            print(' {} {:<12} {} ({:.1f} ms)'.format(time.strftime('%H:%M:%S'), result, chromePath.joinpath(fileName), (time.perf_counter() - started) * 1000.0), flush=True)
+    save_build_manifest(manifest)
+
+# -- wait_for_events blocks until watchdog reports a change under fragmentsRoot, followed by debounce seconds of quiet
+def wait_for_events(changed, debounce):
+    changed.wait()
+    changed.clear()
+    while changed.wait(debounce):
+        changed.clear()
+
+# -- wait_for_poll blocks until watch_state differs from state, followed by debounce seconds without a further change
+def wait_for_poll(fragmentsRoot, state, interval, debounce):
+    while True:
+        time.sleep(interval)
+        current = watch_state(fragmentsRoot)
+        if current != state:
+            break
+    while True:
+        time.sleep(debounce)
+        settled = watch_state(fragmentsRoot)
+        if settled == current:
+            return settled
+        current = settled
+
+# -- watch rebuilds the stylesheets in chromePath on each (debounced) change to the fragments, until interrupted
+def watch(chromePath, fragmentsRoot, manifest, interval, debounce, force=False):
+    if watchdog is not None:
+        changed = threading.Event()
+        handler = watchdog.events.FileSystemEventHandler()
+        handler.on_any_event = lambda event: changed.set()
+        observer = watchdog.observers.Observer()
+        observer.schedule(handler, str(fragmentsRoot), recursive=True)
+        observer.start()
+        print(' Watching {} (events)'.format(fragmentsRoot), flush=True)
+        try:
+            while True:
+                wait_for_events(changed, debounce)
+                rebuild(chromePath, fragmentsRoot, manifest, force)
+        finally:
+            observer.stop()
+            observer.join()
+    else:
+        print(' Watching {} (polling every {:g} s)'.format(fragmentsRoot, interval), flush=True)
+        state = watch_state(fragmentsRoot)
+        while True:
+            state = wait_for_poll(fragmentsRoot, state, interval, debounce)
+            rebuild(chromePath, fragmentsRoot, manifest, force)
+
+#End Region
+
+# Region Batch deployment
+# `userChrome.py --all-users` applies the stylesheet to every profile of every user under the home roots (e.g. /home), with a
+# bounded thread pool. Each deployed file's (size, mtime, sha256) is kept in a manifest, so a file that has not changed since
+# the last run is skipped on a stat alone, without being read again. Run as root, each user's files are written through
+# the folder descriptors of open_chrome_dir, so paths the users control (symlinks, profiles.ini) cannot redirect them.
+
+# -- home_roots returns the platform's default parent folder(s) of user home directories
+def home_roots():
+    if IsWindows:
+        return [Path(HOME).parent]
+    if IsMacOS:
+        return [Path('/Users')]
+    return [Path('/home')]
+
+# -- all_user_profiles enumerates (home, profile) for every Firefox profile of every user under roots
+def all_user_profiles(roots, cache):
+    for root in roots:
+        try:
+            homes = sorted(home for home in Path(root).iterdir() if home.is_dir())
+        except OSError:
+            continue
+        for home in homes:
+            userRoot, userBase, userRegExp = firefox_root(home)
+            if not userRoot.is_dir():
+                continue
+            default, profiles = find_profiles(userRoot, userBase, userRegExp, cache)
+            for profile in profiles or ([default] if default else []):
+                if profile.is_dir():
+                    yield home, profile
+
+# -- file_digest returns the sha256 hex digest of a file's contents (path is relative to the directory dirFd, when given)
+def file_digest(path, dirFd=None):
+    digest = hashlib.sha256()
+    with os.fdopen(os.open(path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0), dir_fd=dirFd), 'rb') as stream:
+        for block in iter(lambda: stream.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# -- open_chrome_dir opens (creating when needed) the chrome folder of a profile in home, for root to write into: it walks
+#    from home one folder at a time, with O_NOFOLLOW, and requires each to be owned by home's owner, so neither a symlink
+#    nor an absolute profiles.ini Path can send the writes outside home; returns (directory fd, (uid, gid) of the owner)
+def open_chrome_dir(home, profile):
+    relative = os.path.relpath(str(profile), str(home))
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep) or os.path.isabs(relative):
+        raise PermissionError('profile is outside {}: {}'.format(home, profile))
+    flags = os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW
+    dirFd = os.open(str(home), flags)
+    try:
+        homeStat = os.fstat(dirFd)
+        owner = (homeStat.st_uid, homeStat.st_gid)
+        parts = [part for part in relative.split(os.sep) if part not in ('', os.curdir)] + ['chrome']
+        for number, part in enumerate(parts):
+            if number == len(parts) - 1:
+                try:
+                    os.mkdir(part, 0o755, dir_fd=dirFd)
+                    os.chown(part, owner[0], owner[1], dir_fd=dirFd, follow_symlinks=False)
+                except FileExistsError:
+                    pass
+            try:
+                childFd = os.open(part, flags, dir_fd=dirFd)
+            except OSError as err:
+                if err.errno in (errno.ELOOP, errno.ENOTDIR):
+                    raise PermissionError('not a folder (a symlink?): {}'.format(os.path.join(str(home), *parts[0:number + 1])))
+                raise
+            os.close(dirFd)
+            dirFd = childFd
+            if os.fstat(dirFd).st_uid != owner[0]:
+                raise PermissionError('not owned by the owner of {}: {}'.format(home, os.path.join(str(home), *parts[0:number + 1])))
+        return dirFd, owner
+    except BaseException:
+        os.close(dirFd)
+        raise
+
+# -- write_at replaces fileName in the folder dirFd with data, via a new temp file (O_EXCL and O_NOFOLLOW, so never
+#    through a symlink), owned by owner
+def write_at(dirFd, fileName, data, owner):
+    tmpName = '.{}.{}.tmp'.format(fileName, os.urandom(4).hex())
+    fd = os.open(tmpName, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o644, dir_fd=dirFd)
+    try:
+        with os.fdopen(fd, 'wb') as tmpFile:
+            tmpFile.write(data)
+            os.fchmod(tmpFile.fileno(), 0o644)
+            os.fchown(tmpFile.fileno(), owner[0], owner[1])
+        os.replace(tmpName, fileName, src_dir_fd=dirFd, dst_dir_fd=dirFd)
+    except BaseException:
+        try:
+            os.unlink(tmpName, dir_fd=dirFd)
+        except OSError:
+            pass
+        raise
+
+# -- deploy_file makes chromePath/fileName contain data (whose sha256 is dataHash), unless it already does; returns 'unchanged',
+#    'written', 'kept' or 'replaced', as guard_target decides for a file that was not deployed by this script (or was edited
+#    since): it is kept, unless force, when it is replaced, after being renamed to <name>.bak. Files are written atomically;
+#    when running as root, into the folder dirFd (from open_chrome_dir), owned by the profile's owner, so Firefox can read them
+def deploy_file(chromePath, fileName, data, dataHash, manifest, dirFd=None, owner=None, force=False):
+    key = str(chromePath.joinpath(fileName))
+    name = key if dirFd is None else fileName
+    try:
+        targetStat = os.stat(name, dir_fd=dirFd, follow_symlinks=False)
+    except OSError:
+        targetStat = None
+    known = manifest.get(key)
+    targetHash = None
+    if targetStat is not None and stat.S_ISREG(targetStat.st_mode):
+        if known and known[0:2] == [targetStat.st_size, targetStat.st_mtime_ns]:
+            targetHash = known[2]
+        else:
+            targetHash = file_digest(name, dirFd)
+        if targetHash == dataHash:
+            manifest[key] = [targetStat.st_size, targetStat.st_mtime_ns, dataHash]
+            return 'unchanged'
+    elif targetStat is not None:
+        # a symlink (or anything else) in place of the file is the user's doing too
+        targetHash = ''
+
+    guard = guard_target(name, targetHash, known[2] if known else None, force, dirFd)
+    if guard == 'kept':
+        return 'kept'
+    if dirFd is None:
+        chromePath.mkdir(exist_ok=True)
+        write_atomic(chromePath.joinpath(fileName), data, mode=0o644)
     else:
-        print('PANIC! unable to confirm Firefox default profile path for user.')
-        quit(89)
+        write_at(dirFd, fileName, data, owner)
+    targetStat = os.stat(name, dir_fd=dirFd, follow_symlinks=False)
+    manifest[key] = [targetStat.st_size, targetStat.st_mtime_ns, dataHash]
+    return 'replaced' if guard == 'backed up' else 'written'
+
+# -- deploy_profile applies stylesheets ({file name: bytes}) to the chrome folder of one profile in home; returns
+#    (profile, {file name: result}). Any error is reported per file, so one unusable profile does not stop the others.
+def deploy_profile(home, profile, stylesheets, manifest, force=False):
+    results = dict()
+    dirFd = None
+    owner = None
+    try:
+        if hasattr(os, 'geteuid') and os.geteuid() == 0:
+            dirFd, owner = open_chrome_dir(home, profile)
+    except OSError as err:
+        return profile, dict((fileName, 'error: {}'.format(err)) for fileName in stylesheets)
+    try:
+        for fileName, (data, dataHash) in stylesheets.items():
+            try:
+                results[fileName] = deploy_file(profile.joinpath('chrome'), fileName, data, dataHash, manifest, dirFd, owner, force)
+            except OSError as err:
+                results[fileName] = 'error: {}'.format(err)
+    finally:
+        if dirFd is not None:
+            os.close(dirFd)
+    return profile, results
+
+# -- deploy_all applies stylesheets to every profile of every user under roots, with up to workers threads, and
+#    returns [(home, profile, {file name: result})] in enumeration order; force replaces the files kept by deploy_file
+def deploy_all(roots, stylesheets, workers, force=False):
+    stylesheets = dict((fileName, (data, hashlib.sha256(data).hexdigest())) for fileName, data in stylesheets.items())
+    manifestFile = cache_dir().joinpath('userChrome-deploy.json')
+    try:
+        manifest = json.loads(manifestFile.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        manifest = dict()
+    cache = load_discovery_cache()
+
+    report = []
+    with span('userChrome: batch deployment'):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [(home, pool.submit(deploy_profile, home, profile, stylesheets, manifest, force)) for home, profile in all_user_profiles(roots, cache)]
+            for home, future in futures:
+                profile, results = future.result()
+                report.append((home, profile, results))
+
+    save_discovery_cache(cache)
+    try:
+        write_atomic(manifestFile, json.dumps(manifest))
+    except OSError:
+        pass
+    return report
+
+# -- print_report prints one line per profile, and the totals, for a deploy_all report; returns the number of errors
+def print_report(report):
+    totals = dict()
+    for home, profile, results in report:
+        for fileName, result in sorted(results.items()):
+            status = result.split(':')[0]
+            totals[status] = totals.get(status, 0) + 1
+            print(' {:<10} {}'.format(result if status != 'error' else 'ERROR', profile.joinpath('chrome', fileName)))
+            if status == 'error':
+                print('            {}'.format(result))
+    print(' {} profiles, files: {}'.format(len(report), ', '.join('{} {}'.format(count, status) for status, count in sorted(totals.items())) or 'nothing to do'))
+    if totals.get('kept'):
+        print(' kept: files not deployed by this script (use --force to replace them; each is kept as .bak)')
+    return totals.get('error', 0)
+
+#End Region
+
+if args.all_users:
+    stylesheets = dict({'userChrome.css': args.css.read_bytes()}) if args.css else build_stylesheets(args.fragments)
+    errorCount = print_report(deploy_all(args.home_root or home_roots(), stylesheets, max(1, args.workers), args.force))
+    print(' End: {}\n'.format(time.strftime('%Y %m %d %H:%M:%S %Z', time.localtime())))
+    sys.exit(1 if errorCount else 0)
+
+firefoxRoot, profileBase, regExp = firefox_root(HOME)
+print_var('profileBase', profileBase)
+
+with span('userChrome: profile discovery'):
+    discoveryCache = load_discovery_cache()
+    profileRoot, profileList = find_profiles(firefoxRoot, profileBase, regExp, discoveryCache)
+    save_discovery_cache(discoveryCache)
+print_var('profileRoot', profileRoot)
+
+if profileRoot is None:
+    print('PANIC! unable to confirm Firefox default profile path for user.')
+    quit(89)
 # #
 
-# -- 2. Look for $profileRoot\chrome\userChrome.css, if not exist, create it
+# -- 2. (Re)build $profileRoot\chrome\userChrome.css and userContent.css from the fragments, only when they changed
 
 # Determine if Firefox/Profiles/*.default/chrome/ exists, or needs to be created
 chromePath = profileRoot.joinpath('chrome')
@@ -107,39 +655,33 @@ if chromePath.exists():
     print_var('chromePath', chromePath)
 else:
     print_var('Make Dir chromePath', chromePath)
-    chromePath.mkdir(exist_ok=True)
+    with span('userChrome: chrome dir creation'):
+        chromePath.mkdir(exist_ok=True)
 
-# Finish establishing path to ../chrome/userChrome.css
-userChromePath = chromePath.joinpath('userChrome.css')
+buildManifest = load_build_manifest()
+for fileName in ChromeFiles:
+    # Finish establishing path to ../chrome/userChrome.css (or userContent.css)
+    chromeFilePath = chromePath.joinpath(fileName)
+    with span('userChrome: CSS write', file=fileName):
+        result = build_chrome_file(chromeFilePath, args.fragments.joinpath(Path(fileName).stem), buildManifest, args.force)
+    print(' {:<12} {}'.format(result, chromeFilePath))
+    if result == 'kept':
+        print('              not built from the fragments (use --force to replace it; it will be kept as .bak)')
 
-# if IsVersbose (testing), delete / remove / unlink it
-if IsVerbose:
-    print_var('[test step] Remove userChromePath', userChromePath)
-    userChromePath.unlink(missing_ok=True)
-    print_var('userChrome.css exist', userChromePath.exists())
-
-if userChromePath.exists():
-    print(' Found!: {}'.format(userChromePath))
-
-else:
-    print(' Creating {} ...'.format(userChromePath))
-    # specify userChrome.css file contents
-    userChromeData = '<!-- Firefox userChrome.css -->\n<!-- line 2 -->\n'
-    # write those contents into the file
-    userChromePath.write_text(userChromeData, encoding='utf-8') # , errors=None)
-    print_var('userChromePath', userChromePath)
+    # #
+    # if IsVersbose, read / print contents of file
+    if IsVerbose and chromeFilePath.exists():
+        print(' file contents:\n -----------------------------------------')
+        print(chromeFilePath.read_text())
+        print(' -----------------------------------------')
+    # #
+save_build_manifest(buildManifest)
 
-print_var('userChromePath exists', userChromePath.exists())
-
-# #
-# if IsVersbose, refresh, read / print contents of file
-if IsVerbose or userChromePath.exists():
-    #print(' Found!: {}'.format(userChromePath))
-    #userChromePath = Path(userChromePath)
-    print(' file contents:\n -----------------------------------------')
-    print(userChromePath.read_text())
-    print(' -----------------------------------------')
-# #
+if args.watch:
+    try:
+        watch(chromePath, args.fragments, buildManifest, args.interval, args.debounce, args.force)
+    except KeyboardInterrupt:
+        print('')
 
 # ! Whenever you edit your userChrome.css file, you will have to close all open Firefox windows and relaunch Firefox for your changes to take effect.
 # Firefox also has a userContent.css file you can edit/user, in the same 'chrome' folder